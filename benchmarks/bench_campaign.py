@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+
+# Last changed: 18/10/2026
+# Status: development
+#
+# Benchmarks of the esprsim orchestration layer, using the fake ESP-r
+# executables in benchmarks/stubs instead of ESP-r:
+#
+# def bench_scripts(n):
+#          Time building of menu scripts.
+# def bench_campaign(nvariants, workers, root):
+#          Time campaign of 'nvariants' variants on 'workers' processes.
+# def bench_parse(datfile, repeat=3):
+#          Time parsing of a res .dat file.
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+
+import esprsim
+from esprsim import espr_sim, espr_res, espr_campaign, espr_dat
+
+"""
+Usage.
+    python benchmarks/bench_campaign.py --variants 10 100 1000 --workers 8
+
+The size of the fake outputs is set by environment variables read by the
+stubs: ESPRSIM_STUB_RES_BYTES (size of .res/.mfr/.plr, default 1 MiB),
+ESPRSIM_STUB_DAT_ROWS (rows of .dat files, default 8760),
+ESPRSIM_STUB_SCRATCH_LINES (lines of module output, default 200) and
+ESPRSIM_STUB_DELAY (simulated bps run time in s, default 0).
+"""
+
+STUBS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stubs")
+
+CONFIG = "bench"
+
+
+def make_model(root):
+    r"""Create minimal model tree for the stubs in 'root'.
+
+    Returns
+    -------
+    Path of the model root.
+
+    """
+
+    model = os.path.join(root, "model")
+    for d in ("cfg", "ctl", "dbs", "nets", "zones", "tmp"):
+        os.makedirs(os.path.join(model, d), exist_ok=True)
+
+    with open(os.path.join(model, "cfg", CONFIG + ".cfg"), "w") as f:
+        f.write("* CONFIGURATION4.0\n"
+                "*ctl  ../ctl/" + CONFIG + ".ctl\n"
+                "*clm  ../dbs/" + CONFIG + ".clm\n"
+                "*year 2001\n")
+    with open(os.path.join(model, "ctl", CONFIG + ".ctl"), "w") as f:
+        f.write("no control description\n* Building\n")
+    for z in range(10):
+        with open(os.path.join(model, "zones", "zone%d.geo" % z), "w") as f:
+            f.write("*Geometry 1.1,GEN,zone%d\n" % z + "*vertex,0.0,0.0,0.0\n" * 100)
+    with open(os.path.join(model, "dbs", CONFIG + ".clm"), "wb") as f:
+        f.write(os.urandom(2**20))
+
+    return model
+
+
+def variant_spec(name):
+    r"""Return campaign variant specification of benchmark variant 'name'."""
+
+    return {"variant": name,
+            "edits": [("set_ctl", (CONFIG, "ctl_" + name))],
+            "simulate": {"dms": 1, "config": CONFIG, "BTSTEP": "4", "PTSTEP": "1",
+                         "FD": "1", "FM": "1", "TD": "31", "TM": "12", "PP": "7"},
+            "extract": [("res_supplied_energy", (name,)),
+                        ("res_PMV", (name, "zone0", "1.0", "1.2", "0.1"))]}
+
+
+def bench_scripts(n):
+    r"""Time building of menu scripts.
+
+    Returns
+    -------
+    Dict with time per call (us) of simulate_script, set_ctl_script and
+    res_PMV_script.
+
+    """
+
+    result = {}
+    for name, f, args in (
+            ("simulate_script", espr_sim.simulate_script,
+             (4, CONFIG, "v", "4", "1", "1", "1", "31", "12", "7")),
+            ("set_ctl_script", espr_sim.set_ctl_script, (CONFIG, "ctl")),
+            ("res_PMV_script", espr_res.res_PMV_script, ("v", "zone0", "1.0", "1.2", "0.1"))):
+        t0 = time.perf_counter()
+        for i in range(n):
+            f(*args)
+        result[name + "_us"] = (time.perf_counter() - t0) / n * 1e6
+
+    return result
+
+
+def bench_campaign(nvariants, workers, root):
+    r"""Time campaign of 'nvariants' variants on 'workers' processes.
+
+    Returns
+    -------
+    Dict with wall time, variants per second, summed wall time of the
+    (fake) ESP-r runs and the esprsim overhead per variant.
+
+    """
+
+    model = make_model(root)
+    sandboxes = os.path.join(root, "sandboxes_%d" % nvariants)
+    specs = [variant_spec("v%05d" % i) for i in range(nvariants)]
+
+    # Output of the campaign is not part of the measurement.
+    with open(os.devnull, "w") as null, redirect_stdout(null):
+        t0 = time.perf_counter()
+        status = espr_campaign.run_campaign(specs, model, sandboxes, workers=workers)
+        wall = time.perf_counter() - t0
+
+    failed = [s for s in status if s["status"] != "done"]
+    if failed:
+        raise RuntimeError(failed[0]["variant"] + ": " + str(failed[0]["error"]))
+
+    variant_time = sum(s["time"] for s in status)
+    module_time = sum(r["wall"] for s in status for r in s["runs"])
+
+    shutil.rmtree(sandboxes)
+
+    return {"variants": nvariants, "workers": workers, "wall_s": wall,
+            "variants_per_s": nvariants / wall,
+            "module_s": module_time,
+            "overhead_ms_per_variant": (variant_time - module_time) / nvariants * 1e3}
+
+
+def bench_parse(datfile, repeat=3):
+    r"""Time parsing of a res .dat file.
+
+    Returns
+    -------
+    Dict with rows and rows per second of read_dat().
+
+    """
+
+    best = None
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        df = espr_dat.read_dat(datfile)
+        t = time.perf_counter() - t0
+        best = t if best is None else min(best, t)
+
+    return {"rows": len(df), "rows_per_s": len(df) / best}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark esprsim with fake ESP-r.")
+    parser.add_argument("--variants", type=int, nargs="+", default=[10, 100],
+                        help="campaign sizes (default: 10 100)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="worker processes (default: number of CPUs)")
+    parser.add_argument("--scripts", type=int, default=10000,
+                        help="calls per menu script benchmark (default: 10000)")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    os.environ["PATH"] = STUBS + os.pathsep + os.environ["PATH"]
+
+    results = {"esprsim": esprsim.__file__, "scripts": bench_scripts(args.scripts),
+               "campaign": [], "parse": None}
+    print("menu scripts  : " + ", ".join("%s %.1f" % kv for kv in results["scripts"].items()))
+
+    root = tempfile.mkdtemp(prefix="esprsim_bench_")
+    try:
+        for n in args.variants:
+            r = bench_campaign(n, args.workers, root)
+            results["campaign"].append(r)
+            print("campaign %5d: %8.2f s, %7.1f variants/s, ESP-r %6.1f ms/variant,"
+                  " overhead %6.1f ms/variant"
+                  % (n, r["wall_s"], r["variants_per_s"], r["module_s"] / n * 1e3,
+                     r["overhead_ms_per_variant"]))
+
+        # .dat file as written by the res stub
+        cwd = os.path.join(make_model(root), "cfg")
+        with open(os.devnull, "w") as null, redirect_stdout(null):
+            espr_res.res_supplied_energy("parse", cwd=cwd)
+        results["parse"] = bench_parse(os.path.join(cwd, "parseen-deliv.dat"))
+        print("parse         : %d rows, %.0f rows/s" % (results["parse"]["rows"],
+                                                       results["parse"]["rows_per_s"]))
+    finally:
+        shutil.rmtree(root)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
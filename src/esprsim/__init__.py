@@ -8,42 +8,40 @@ Contents of __init__.py is based on SIA 380/1 package from mm
 from .espr_ms_sim import *
 from .espr_sim import *
 from .espr_res import *
+from .espr_run import *
+from .espr_files import *
+from .espr_cache import *
+from .espr_dat import *
+from .espr_store import *
+from .espr_plot import *
+from .espr_async import *
+from .espr_sandbox import *
+from .espr_template import *
+from .espr_archive import *
+from .espr_campaign import *
+from .espr_jobs import *
 
 import os
 import sys
 import builtins
 
-import pandas as pd
-import matplotlib.pyplot as plt
-
 # make sure we have python 3
 assert sys.version_info[0] == 3
 
-# setup some default values for matplotlib
-# described here https://matplotlib.org/stable/tutorials/introductory/customizing.html
-plt.rcParams["figure.figsize"] = (12, 6)
-plt.rcParams["figure.dpi"] = 300
-# do not set a font that might not exist, use default
-#plt.rcParams["font.family"] = "Inconsolata"
-#plt.rcParams["font.weight"] = "light"
-#plt.rcParams["font.size"] = 14
-plt.rcParams["figure.autolayout"] = True
-plt.rcParams["axes.grid"] = True
-plt.rcParams["axes.labelpad"] = 20
-plt.rcParams["axes.titlepad"] = 30
-plt.rcParams["axes.labelweight"] = "light"
-plt.rcParams["axes.labelsize"] = 'medium'
-plt.rcParams["legend.frameon"] = True
-plt.rcParams["legend.facecolor"] = "white"
-plt.rcParams["legend.edgecolor"] = "white"
-plt.rcParams["axes.axisbelow"] = True
-plt.rcParams["lines.markersize"] = 4
-
-
-# Define your own color map or use a named one,
-# see https://matplotlib.org/stable/tutorials/colors/colormaps.html
-# plt.rcParams["axes.prop_cycle"] = plt.cycler('color', ['#5d8aa8', '#e32636', '#ffbf00', '#87a96b'])
-# plt.rcParams["axes.prop_cycle"] = plt.cycler("color", plt.cm.Set1.colors)
+# pandas, numpy and matplotlib are imported by the functions using them, so
+# that processes only editing and simulating models start quickly. Plot
+# defaults are set by set_plot_defaults().
+
+
+def __getattr__(name):
+    """Import esprsim.pd and esprsim.plt on first use."""
+    if name == "pd":
+        import pandas
+        return pandas
+    if name == "plt":
+        return set_plot_defaults()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def running_in_ipython() -> bool:
     """Check if we are running in Jupyter."""
@@ -0,0 +1,7 @@
+"""
+Command line of esprsim, see espr_jobs.main().
+"""
+
+from .espr_jobs import main
+
+main()
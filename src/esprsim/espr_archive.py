@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+
+# Last changed: 18/10/2026
+# Status: development
+#
+# Module contains following functions for compressed archives of variant results:
+#
+# def archive_variant(archive, variant, cwd=None, remove=True, preset=6, block=BLOCK):
+#          Pack result libraries and scratch files of 'variant' into an archive.
+# def archive_index(path):
+#          Return members of archive file 'path', {member: {...}}.
+# def archive_iter(path, member, start=0, size=None):
+#          Yield decompressed chunks of (part of) an archive member.
+# def archive_read(path, member, start=0, size=None):
+#          Return (part of) an archive member as bytes.
+# def archive_extract(path, members=None, dest="."):
+#          Restore archive members as files, e.g. for re-extraction with res.
+import os
+import json
+import lzma
+import struct
+
+from .espr_run import in_dir
+from .espr_cache import RESULT_EXT
+
+"""
+Module contains functions to keep the results of finished variants in
+compressed archives instead of removing them (see remove_results).
+
+An archive '<archive>/<variant>.esa' holds the result libraries (.res, .mfr,
+.plr) and scratch files of a variant. Each member is compressed in blocks
+of BLOCK bytes, each block an independent xz stream, followed by a JSON
+index of the members and blocks. A part of a member is read by
+decompressing only the blocks it overlaps.
+
+Example usage.
+    archive_variant("/data/archive", "var01", cwd=wd)
+    head = archive_read("/data/archive/var01.esa", "var01.res", 0, 4096)
+    archive_extract("/data/archive/var01.esa", ["var01.res"], dest=wd)
+    res_PMV("var01", "Wohnen", "1.0", "1.2", "0.1", cwd=wd)
+"""
+
+# Extension of archive files.
+ARCHIVE_EXT = ".esa"
+
+# Uncompressed size of the independently compressed blocks (bytes).
+BLOCK = 16 * 2**20
+
+# Trailer: index length (8 bytes, little endian) and magic.
+_MAGIC = b"ESPRSIMA"
+_TRAILER = struct.Struct("<Q8s")
+
+
+def _members(variant, cwd):
+    r"""Return [(member name, path)] of result libraries and scratch files."""
+
+    vardir = in_dir(cwd, variant)
+    scrdir = in_dir(cwd, variant + "_scratchfiles")
+
+    members = []
+    for ext in RESULT_EXT:
+        for d in (vardir, in_dir(cwd, ".")):  # moved by move_files, or not
+            path = os.path.join(d, variant + "." + ext)
+            if os.path.exists(path):
+                members.append((variant + "." + ext, path))
+                break
+    if os.path.isdir(scrdir):
+        for f in sorted(os.listdir(scrdir)):
+            members.append(("scratch/" + f, os.path.join(scrdir, f)))
+
+    return members
+
+
+def archive_variant(archive, variant, cwd=None, remove=True, preset=6, block=BLOCK):
+    r"""Pack result libraries and scratch files of 'variant' into an archive.
+
+    Parameters
+    ----------
+    archive : str | Path
+        Archive directory, the archive file is '<archive>/<variant>.esa'.
+    variant : str
+        Simulation variant name.
+    cwd : str | Path, optional
+        Model cfg directory (default: current working directory). Results
+        are taken from '<cwd>/<variant>' (see move_files) or from 'cwd',
+        scratch files from '<cwd>/<variant>_scratchfiles'.
+    remove : bool, optional
+        Remove the packed files (default: True).
+    preset : int, optional
+        xz compression preset, 0 (fast) ... 9 (small) (default: 6).
+    block : int, optional
+        Block size in bytes (default: BLOCK).
+
+    Returns
+    -------
+    Path of the archive file.
+
+    """
+
+    os.makedirs(archive, exist_ok=True)
+    path = os.path.join(archive, variant + ARCHIVE_EXT)
+    tmp = path + ".tmp"
+
+    members = _members(variant, cwd)
+    index = {}
+    size = 0
+    try:
+        with open(tmp, "wb") as out:
+            for name, src in members:
+                frames = []
+                with open(src, "rb") as f:
+                    for data in iter(lambda: f.read(block), b""):
+                        z = lzma.compress(data, format=lzma.FORMAT_XZ, preset=preset)
+                        frames.append([out.tell(), len(z), len(data)])
+                        out.write(z)
+                index[name] = {"size": sum(fr[2] for fr in frames), "frames": frames}
+                size += index[name]["size"]
+            raw = json.dumps({"block": block, "members": index}).encode("utf-8")
+            out.write(raw)
+            out.write(_TRAILER.pack(len(raw), _MAGIC))
+        os.replace(tmp, path)
+    except BaseException:  # no partial archive is left behind
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+    if remove:
+        for name, src in members:
+            os.remove(src)
+        scrdir = in_dir(cwd, variant + "_scratchfiles")
+        if os.path.isdir(scrdir) and not os.listdir(scrdir):
+            os.rmdir(scrdir)
+
+    print("\tArchived          : " + variant + ARCHIVE_EXT + " (" + str(len(members))
+          + " files, " + "%.1f" % (size / 2**20) + " MiB -> "
+          + "%.1f" % (os.path.getsize(path) / 2**20) + " MiB)")
+
+    return path
+
+
+def archive_index(path):
+    r"""Return members of archive file 'path', {member: {...}}.
+
+    Parameters
+    ----------
+    path : str | Path
+        Archive file.
+
+    Returns
+    -------
+    Dict {member name: {"size": uncompressed size, "frames": [[offset,
+    compressed size, uncompressed size], ...]}}.
+
+    """
+
+    with open(path, "rb") as f:
+        f.seek(-_TRAILER.size, os.SEEK_END)
+        length, magic = _TRAILER.unpack(f.read(_TRAILER.size))
+        if magic != _MAGIC:
+            raise ValueError(str(path) + " is not an esprsim archive.")
+        f.seek(-_TRAILER.size - length, os.SEEK_END)
+        return json.loads(f.read(length))["members"]
+
+
+def archive_iter(path, member, start=0, size=None):
+    r"""Yield decompressed chunks of (part of) an archive member.
+
+    Only the blocks overlapping the requested range are read and
+    decompressed, one at a time.
+
+    Parameters
+    ----------
+    path : str | Path
+        Archive file.
+    member : str
+        Member name, e.g. 'var01.res' or 'scratch/var01_bps.scratch'.
+    start : int, optional
+        First byte (default: 0).
+    size : int, optional
+        Number of bytes (default: up to the end of the member).
+
+    Yields
+    ------
+    bytes
+
+    """
+
+    frames = archive_index(path)[member]["frames"]
+    end = None if size is None else start + size
+
+    with open(path, "rb") as f:
+        pos = 0  # uncompressed position of the frame
+        for offset, csize, usize in frames:
+            if pos + usize <= start:
+                pos += usize
+                continue
+            if end is not None and pos >= end:
+                break
+            f.seek(offset)
+            data = lzma.decompress(f.read(csize), format=lzma.FORMAT_XZ)
+            lo = max(start - pos, 0)
+            hi = usize if end is None else min(end - pos, usize)
+            yield data[lo:hi]
+            pos += usize
+
+
+def archive_read(path, member, start=0, size=None):
+    r"""Return (part of) an archive member as bytes.
+
+    Parameters
+    ----------
+    path : str | Path
+        Archive file.
+    member : str
+        Member name.
+    start : int, optional
+        First byte (default: 0).
+    size : int, optional
+        Number of bytes (default: up to the end of the member).
+
+    """
+
+    return b"".join(archive_iter(path, member, start, size))
+
+
+def archive_extract(path, members=None, dest="."):
+    r"""Restore archive members as files, e.g. for re-extraction with res.
+
+    Parameters
+    ----------
+    path : str | Path
+        Archive file.
+    members : list of str, optional
+        Members to restore (default: all).
+    dest : str | Path, optional
+        Directory the members are written to (scratch files without the
+        'scratch/' prefix) (default: current working directory).
+
+    Returns
+    -------
+    List of paths written.
+
+    """
+
+    if members is None:
+        members = list(archive_index(path))
+
+    written = []
+    for member in members:
+        target = os.path.join(dest, os.path.basename(member))
+        try:
+            with open(target + ".tmp", "wb") as f:
+                for chunk in archive_iter(path, member):
+                    f.write(chunk)
+            os.replace(target + ".tmp", target)
+        except BaseException:  # no partial member is left behind
+            if os.path.exists(target + ".tmp"):
+                os.remove(target + ".tmp")
+            raise
+        written.append(target)
+
+    return written
@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+
+# Last changed: 18/10/2026
+# Status: development
+#
+# Module contains awaitable counterparts of the espr_sim, espr_ms_sim and
+# espr_res functions:
+#
+# async def run_espr_async(args, cmd, scratch, cwd=None, timeout=None, on_output=None):
+#          Run ESP-r module in text mode as asyncio subprocess.
+# async def run_dialog_async(args, steps, scratch, cwd=None, timeout=None, prompt_timeout=30.0):
+#          Run ESP-r module answering its prompts (see espr_run.run_dialog).
+# async def gather_bounded(aws, limit):
+#          Await coroutines with at most 'limit' of them running at a time.
+# async def <function>_async(..., cwd=None, timeout=None):
+#          Awaitable counterpart of <function> for qa_report, simulate,
+#          set_ctl, set_clm, set_mgp, set_spm, set_afn, set_plant,
+#          set_obs_dim, set_con, set_ctl_temp_setpt, set_corecon, set_htc,
+#          set_lam_w6CFC, set_lam, set_abs_o, res_supplied_energy, res_PMV,
+#          res_zone_metrics, res_batch.
+import os
+import time
+import signal
+import asyncio
+from subprocess import PIPE, CompletedProcess
+
+from collections import deque
+
+from .espr_run import in_dir, log_run, run_record, classify_failure, EsprRunError
+from .espr_run import _answer, _reads_input
+from .espr_cache import cache_key, cache_restore, cache_store
+from . import espr_sim, espr_ms_sim, espr_res
+
+"""
+Module contains awaitable counterparts of the functions calling prj, bps and
+res. The menu commands are the same as for the blocking functions (see the
+<function>_script() and <function>_dialog() companions), the modules run as
+asyncio subprocesses.
+An orchestrator can therefore keep many ESP-r processes in flight from one
+event loop, and cancel or time out individual runs. If a run is cancelled or
+times out, the ESP-r process is killed.
+
+Example usage.
+    async def variant(v):
+        await set_ctl_async(cfg, "ctl_" + v, cwd=wd[v])
+        await simulate_async(1, cfg, v, "4", "1", "1", "1", "31", "12", "7",
+                             cwd=wd[v], timeout=3600)
+        await res_supplied_energy_async(v, cwd=wd[v])
+
+    asyncio.run(gather_bounded([variant(v) for v in variants], 60))
+"""
+
+
+async def run_espr_async(args, cmd, scratch, cwd=None, timeout=None, on_output=None):
+    r"""Run ESP-r module in text mode as asyncio subprocess.
+
+    Parameters
+    ----------
+    args : list of str
+        Command line of the ESP-r module.
+    cmd : bytes
+        Menu commands fed to the module via stdin.
+    scratch : str
+        Scratch file name (relative to 'cwd') for the module's output.
+    cwd : str | Path, optional
+        Directory to run in (default: current working directory).
+    timeout : float, optional
+        Time (s) after which the module is killed and TimeoutError is raised.
+    on_output : callable, optional
+        Called with every chunk (bytes) of output as it is read.
+
+    Returns
+    -------
+    subprocess.CompletedProcess of the run.
+
+    """
+
+    # Own process group, so that a timeout also kills processes started by the module.
+    proc = await asyncio.create_subprocess_exec(*args, stdin=PIPE, stdout=PIPE, cwd=cwd,
+                                                start_new_session=(os.name == "posix"))
+
+    async def feed():
+        try:
+            proc.stdin.write(cmd)
+            await proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # module exited before reading all commands
+        proc.stdin.close()
+
+    async def read():
+        with open(in_dir(cwd, scratch), "wb") as f:  # creates scratch file
+            while True:
+                chunk = await proc.stdout.read(65536)
+                if not chunk:
+                    break
+                f.write(chunk)
+                if on_output is not None:
+                    on_output(chunk)
+
+    async def communicate():
+        await asyncio.gather(feed(), read())
+        return await proc.wait()
+
+    t0 = time.time()
+    try:
+        returncode = await asyncio.wait_for(communicate(), timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        await _kill(proc)
+        raise
+
+    # Resource usage of the module is not available from asyncio.
+    log_run(run_record(args, scratch, returncode, t0), cwd=cwd)
+
+    return CompletedProcess(args, returncode)
+
+
+async def _kill(proc):
+    # Kill module and processes started by it (own process group), reap it.
+    if proc.returncode is None:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except (AttributeError, OSError):
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+        await proc.wait()
+
+
+async def run_dialog_async(args, steps, scratch, cwd=None, timeout=None, prompt_timeout=30.0):
+    r"""Run ESP-r module answering its prompts (see espr_run.run_dialog).
+
+    Parameters
+    ----------
+    args : list of str
+        Command line of the ESP-r module.
+    steps : list of tuple
+        Dialog, see espr_run.run_dialog().
+    scratch : str
+        Scratch file name (relative to 'cwd') for the module's output.
+    cwd : str | Path, optional
+        Directory to run in (default: current working directory).
+    timeout : float, optional
+        Time (s) after which the module is killed and TimeoutError is raised.
+    prompt_timeout : float, optional
+        Time (s) to wait for an expected prompt (default: 30), the 'timeout'
+        of run_dialog().
+
+    Returns
+    -------
+    subprocess.CompletedProcess of the run.
+
+    Notes
+    -----
+    EsprRunError is raised as by run_dialog() if a prompt does not appear
+    or the module exits before the dialog is finished.
+
+    """
+
+    for pattern, answer in steps:
+        if isinstance(pattern, dict) and answer is None:
+            raise ValueError("Prompt loop " + str(list(pattern)) + " has no end pattern.")
+
+    env = dict(os.environ, GFORTRAN_UNBUFFERED_ALL="y")
+    out = {"buf": "", "tail": deque(maxlen=20), "eof": False}
+
+    t0 = time.time()
+    with open(in_dir(cwd, scratch), "wb") as f:  # creates scratch file
+        proc = await asyncio.create_subprocess_exec(*args, stdin=PIPE, stdout=PIPE, cwd=cwd,
+                                                    env=env,
+                                                    start_new_session=(os.name == "posix"))
+
+        async def read(wait):
+            # Read available output (waiting up to 'wait' s), False if none.
+            if out["eof"]:
+                return False
+            try:
+                data = await asyncio.wait_for(proc.stdout.read(65536), wait)
+            except asyncio.TimeoutError:
+                return False
+            if not data:
+                out["eof"] = True
+                return False
+            f.write(data)
+            text = data.decode("utf-8", "replace")
+            out["buf"] += text
+            out["tail"].extend(text.splitlines())
+            return True
+
+        async def send(text):
+            # Answer, forget output up to the answered prompt.
+            out["buf"] = ""
+            try:
+                proc.stdin.write(text.encode("utf-8"))
+                await proc.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # detected as 'exit' by the next step
+
+        async def dialog():
+            # Kind of failure, None if the dialog finished.
+            for pattern, answer in steps:
+                if pattern is None:
+                    await send(answer)
+                    continue
+
+                loop = isinstance(pattern, dict)
+                rules = dict(pattern) if loop else {pattern: answer}
+                if loop:
+                    rules[answer] = None  # end of the loop
+                last = time.monotonic()
+                while True:
+                    if await read(0.05):  # module is still writing
+                        last = time.monotonic()
+                        continue
+                    if out["eof"]:
+                        return "exit"  # module quit before the dialog was finished
+                    if _reads_input(proc.pid) is False:
+                        continue  # module computes silently, input not yet consumed
+                    found, text = _answer(rules, out["buf"])
+                    if found:
+                        if text is None:
+                            break  # loop finished
+                        await send(text)
+                        last = time.monotonic()
+                        if not loop:
+                            break
+                    elif time.monotonic() - last >= prompt_timeout:
+                        return "prompt"  # module waits at an unexpected prompt
+
+            proc.stdin.close()
+            while await read(prompt_timeout):
+                pass
+            if not out["eof"]:
+                return "prompt"  # module waits for further input
+            return None
+
+        try:
+            failure = await asyncio.wait_for(dialog(), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            await _kill(proc)
+            raise
+        if failure is not None:
+            await _kill(proc)
+        returncode = await proc.wait()
+
+    if failure is not None:
+        failure = classify_failure(failure, list(out["tail"]))
+    log_run(run_record(args, scratch, returncode, t0, failure=failure), cwd=cwd)
+
+    if failure is not None:
+        raise EsprRunError(args, scratch, failure)
+
+    return CompletedProcess(args, returncode)
+
+
+async def gather_bounded(aws, limit):
+    r"""Await coroutines with at most 'limit' of them running at a time.
+
+    Parameters
+    ----------
+    aws : list of coroutines
+        Coroutines to be awaited.
+    limit : int
+        Maximum number of coroutines running at the same time.
+
+    Returns
+    -------
+    List of results (or exceptions raised) in the order of 'aws'.
+
+    """
+
+    sem = asyncio.Semaphore(limit)
+
+    async def bounded(aw):
+        async with sem:
+            return await aw
+
+    return await asyncio.gather(*(bounded(aw) for aw in aws), return_exceptions=True)
+
+
+async def qa_report_async(config, variant, cwd=None, timeout=None):
+    r"""Awaitable counterpart of espr_sim.qa_report()."""
+
+    return await run_espr_async(*espr_sim.qa_report_script(config, variant),
+                                cwd=cwd, timeout=timeout)
+
+
+async def simulate_async(dms, config, variant, BTSTEP, PTSTEP, FD, FM, TD, TM, PP,
+                         cwd=None, timeout=None, cache=None, hourly=False, save_level="*",
+                         save_filter="*"):
+    r"""Awaitable counterpart of espr_sim.simulate() (None if restored from cache).
+
+    Hashing the model, copying cache entries and moving the results run in
+    a worker thread, so that they do not block the event loop.
+    """
+
+    if cache is not None:
+        key = await asyncio.to_thread(cache_key, config, (dms, BTSTEP, PTSTEP, FD, FM, TD,
+                                                          TM, PP, hourly, save_level,
+                                                          save_filter), cwd=cwd)
+        if await asyncio.to_thread(cache_restore, cache, key, variant, cwd=cwd):
+            return None
+
+    p = await run_espr_async(*espr_sim.simulate_script(dms, config, variant, BTSTEP,
+                                                       PTSTEP, FD, FM, TD, TM, PP,
+                                                       hourly=hourly, save_level=save_level,
+                                                       save_filter=save_filter),
+                             cwd=cwd, timeout=timeout)
+
+    await asyncio.to_thread(espr_sim.simulate_post, variant, cwd=cwd)
+
+    if cache is not None and os.path.exists(in_dir(cwd, variant + ".res")):
+        await asyncio.to_thread(cache_store, cache, key, variant, cwd=cwd)
+
+    return p
+
+
+async def set_ctl_async(config, ctl_file, cwd=None, timeout=None):
+    r"""Awaitable counterpart of espr_sim.set_ctl()."""
+
+    return await run_espr_async(*espr_sim.set_ctl_script(config, ctl_file),
+                                cwd=cwd, timeout=timeout)
+
+
+async def set_clm_async(config, clm_file, cwd=None, timeout=None):
+    r"""Awaitable counterpart of espr_sim.set_clm() (does not run prj).
+
+    The .cfg is edited in a worker thread. TimeoutError is raised after
+    'timeout' s, the edit itself cannot be interrupted and may still finish.
+    """
+
+    await asyncio.wait_for(asyncio.to_thread(espr_sim.set_clm, config, clm_file, cwd=cwd),
+                           timeout)
+
+
+async def set_mgp_async(config, clm_file, gtp, cwd=None, timeout=None):
+    r"""Awaitable counterpart of espr_sim.set_mgp()."""
+
+    return await run_espr_async(*espr_sim.set_mgp_script(config, clm_file, gtp),
+                                cwd=cwd, timeout=timeout)
+
+
+async def set_spm_async(config, cnn_file, spm_file, cwd=None, timeout=None):
+    r"""Awaitable counterpart of espr_sim.set_spm()."""
+
+    return await run_espr_async(*espr_sim.set_spm_script(config, cnn_file, spm_file),
+                                cwd=cwd, timeout=timeout)
+
+
+async def set_afn_async(config, afn_file, cwd=None, timeout=None):
+    r"""Awaitable counterpart of espr_sim.set_afn()."""
+
+    return await run_espr_async(*espr_sim.set_afn_script(config, afn_file),
+                                cwd=cwd, timeout=timeout)
+
+
+async def set_plant_async(config, plant, plant_db, cwd=None, timeout=None):
+    r"""Awaitable counterpart of espr_sim.set_plant()."""
+
+    return await run_espr_async(*espr_sim.set_plant_script(config, plant, plant_db),
+                                cwd=cwd, timeout=timeout)
+
+
+async def set_obs_dim_async(config, zone, obs, width, depth, height, cwd=None,
+                            timeout=None):
+    r"""Awaitable counterpart of espr_sim.set_obs_dim()."""
+
+    return await run_espr_async(*espr_sim.set_obs_dim_script(config, zone, obs, width,
+                                                             depth, height),
+                                cwd=cwd, timeout=timeout)
+
+
+async def set_con_async(config, cnn_file, old_con_str, old_class, old_con, new_class,
+                        new_con, cwd=None, timeout=None):
+    r"""Awaitable counterpart of espr_sim.set_con().
+
+    prj's confirmations are answered as they appear (see set_con_dialog()),
+    'old_con_str' is not needed to count them.
+    """
+
+    return await run_dialog_async(*espr_sim.set_con_dialog(config, cnn_file, old_class,
+                                                           old_con, new_class, new_con),
+                                  cwd=cwd, timeout=timeout)
+
+
+async def set_ctl_temp_setpt_async(config, ctl_file, loop, h_setpoint, c_setpoint='99',
+                                   cwd=None, timeout=None):
+    r"""Awaitable counterpart of espr_sim.set_ctl_temp_setpt()."""
+
+    return await run_espr_async(*espr_sim.set_ctl_temp_setpt_script(config, ctl_file, loop,
+                                                                    h_setpoint,
+                                                                    c_setpoint),
+                                cwd=cwd, timeout=timeout)
+
+
+async def set_corecon_async(config, cnn_file, old_coreclass, old_corecon, new_coreclass,
+                            new_corecon, cwd=None, timeout=None):
+    r"""Awaitable counterpart of espr_ms_sim.set_corecon()."""
+
+    return await run_dialog_async(*espr_ms_sim.set_corecon_dialog(config, cnn_file,
+                                                                  old_coreclass, old_corecon,
+                                                                  new_coreclass, new_corecon),
+                                  cwd=cwd, timeout=timeout)
+
+
+async def set_htc_async(config, cnn_file, set_unset, cwd=None, timeout=None):
+    r"""Awaitable counterpart of espr_ms_sim.set_htc()."""
+
+    return await run_espr_async(*espr_ms_sim.set_htc_script(config, cnn_file, set_unset),
+                                cwd=cwd, timeout=timeout)
+
+
+async def set_lam_w6CFC_async(config, mat_class, mat_entry, lam, cwd=None, timeout=None):
+    r"""Awaitable counterpart of espr_ms_sim.set_lam_w6CFC()."""
+
+    return await run_dialog_async(*espr_ms_sim.set_lam_w6CFC_dialog(config, mat_class,
+                                                                    mat_entry, lam),
+                                  cwd=cwd, timeout=timeout)
+
+
+async def set_lam_async(config, matclass, material, lam, cwd=None, timeout=None):
+    r"""Awaitable counterpart of espr_ms_sim.set_lam()."""
+
+    return await run_espr_async(*espr_ms_sim.set_lam_script(config, matclass, material,
+                                                            lam),
+                                cwd=cwd, timeout=timeout)
+
+
+async def set_abs_o_async(config, matclass, material, abs, cwd=None, timeout=None):
+    r"""Awaitable counterpart of espr_ms_sim.set_abs_o()."""
+
+    return await run_espr_async(*espr_ms_sim.set_abs_o_script(config, matclass, material,
+                                                              abs),
+                                cwd=cwd, timeout=timeout)
+
+
+async def res_supplied_energy_async(resfile, cwd=None, timeout=None):
+    r"""Awaitable counterpart of espr_res.res_supplied_energy()."""
+
+    return await run_espr_async(*espr_res.res_supplied_energy_script(resfile),
+                                cwd=cwd, timeout=timeout)
+
+
+async def res_PMV_async(resfile, zone, clo, met, veloc, cwd=None, timeout=None):
+    r"""Awaitable counterpart of espr_res.res_PMV()."""
+
+    return await run_espr_async(*espr_res.res_PMV_script(resfile, zone, clo, met, veloc),
+                                cwd=cwd, timeout=timeout)
+
+
+async def res_zone_metrics_async(resfile, zone, metrics=("db", "mrt", "rh"), cwd=None,
+                                 timeout=None):
+    r"""Awaitable counterpart of espr_res.res_zone_metrics()."""
+
+    return await run_espr_async(*espr_res.res_zone_metrics_script(resfile, zone, metrics),
+                                cwd=cwd, timeout=timeout)
+
+
+async def res_batch_async(resfile, requests, cwd=None, timeout=None):
+    r"""Awaitable counterpart of espr_res.res_batch()."""
+
+    return await run_espr_async(*espr_res.res_batch_script(resfile, requests),
+                                cwd=cwd, timeout=timeout)
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+
+# Last changed: 18/10/2026
+# Status: development
+#
+# Module contains following functions for caching ESP-r simulation results:
+#
+# def file_digest(path, normalise=False):
+#          Return SHA-256 digest of file 'path'.
+# def model_inputs(config, cwd=None, exclude=()):
+#          Return sorted list of input files of model 'config'.
+# def cache_key(config, sim_args, cwd=None, exclude=()):
+#          Return cache key of model 'config' and simulation arguments.
+# def cache_restore(cache, key, variant, cwd=None):
+#          Restore results of cache entry 'key' as results of 'variant'.
+# def cache_store(cache, key, variant, cwd=None, max_size=None):
+#          Store results of 'variant' as cache entry 'key'.
+# def cache_evict(cache, max_size):
+#          Remove least recently used cache entries above 'max_size'.
+import os
+import re
+import glob
+import shutil
+import hashlib
+import tempfile
+from fnmatch import fnmatch
+
+from .espr_run import in_dir, RUN_LOG
+from .espr_sandbox import copy_file
+
+"""
+Module contains functions for a content-addressed cache of bps results. The
+cache key is a hash over all model input files (cfg, zones, ctl, nets,
+dbs, climate file and files referenced outside the model tree), the bps
+executable and the simulation arguments. The variant name is not part of
+the key, i.e. results of a variant are reused for any other variant with
+identical inputs (the result-set description stored in the .res file is
+then that of the first variant).
+
+Header lines which prj rewrites on every save ('*date', version and time
+stamp comments) are not hashed, so a model edited in a prj session has the
+same key as long as its contents are unchanged.
+
+A cache entry '<cache>/<key[:2]>/<key>' holds the .res, .mfr and .plr files
+and the bps scratch file of a run.
+"""
+
+# Default maximum cache size (bytes), see cache_evict().
+CACHE_SIZE = 20 * 2**30
+
+# Result files stored in a cache entry (extensions).
+RESULT_EXT = ("res", "mfr", "plr")
+
+# Directories of the model tree (relative to the model root) not holding inputs.
+SKIP_DIRS = ("tmp",)
+
+# Files in the cfg directory not being model inputs (results, reports, ...).
+SKIP_CFG_FILES = ("*.res", "*.mfr", "*.plr", "*.scratch", "*.dat", "*.csv",
+                  "*.txt", "*.log", "*.jsonl")
+
+# Text model files whose volatile header lines (VOLATILE) are not hashed.
+NORMALISE_FILES = ("*.cfg", "*.cnn", "*.geo", "*.con", "*.tmc", "*.ctl", "*.afn",
+                   "*.obs", "*.htc", "*.pln", "*.cfc")
+
+# Lines rewritten by prj on every save: '*date' records and comments with
+# the ESP-r version or a time stamp.
+VOLATILE = re.compile(rb"^\s*(\*date\b|#.*(\bversion\b|\b\d{1,2}:\d{2}:\d{2}\b))",
+                      re.IGNORECASE)
+
+# Stores between full scans of the cache size by cache_store().
+EVICT_EVERY = 100
+
+# File digests by (device, inode, size, mtime, normalise), shared by hard
+# linked sandboxes.
+_digests = {}
+
+# Cache size by cache directory as of the last scan plus the entries stored
+# since, and number of stores since the last scan.
+_sizes = {}
+
+
+def file_digest(path, normalise=False):
+    r"""Return SHA-256 digest (hex) of file 'path'.
+
+    Digests are memoised per process by inode, size and modification time,
+    files hard linked into several sandboxes are therefore read once.
+
+    Parameters
+    ----------
+    path : str | Path
+        File to hash.
+    normalise : bool, optional
+        Skip lines matching VOLATILE (default: False).
+
+    """
+
+    st = os.stat(path)
+    memo = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, normalise)
+    if memo in _digests:
+        return _digests[memo]
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        if normalise:
+            for line in f:
+                if VOLATILE.match(line) is None:
+                    h.update(line)
+        else:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    _digests[memo] = h.hexdigest()
+
+    return _digests[memo]
+
+
+def model_inputs(config, cwd=None, exclude=()):
+    r"""Return sorted list of input files of model 'config'.
+
+    All files of the model tree (the parent directory of the cfg
+    directory) except those in tmp/, in subdirectories of the cfg directory
+    (moved results, see move_files) and results or reports in the cfg
+    directory (SKIP_CFG_FILES), run logs (espr_run.RUN_LOG) and the files
+    and directories in 'exclude'. Files referenced in the .cfg file which
+    are outside of the model tree (e.g. standard databases, climate files)
+    are added.
+
+    Parameters
+    ----------
+    config : str
+        Configuration file name without extension.
+    cwd : str | Path, optional
+        Model cfg directory (default: current working directory).
+    exclude : list of str | Path, optional
+        Files and directories written during a campaign which are not model
+        inputs, e.g. a job database or sandboxes within the model tree.
+
+    Returns
+    -------
+    List of (name, path) tuples, 'name' being relative to the model root
+    for files within the model tree, absolute otherwise.
+
+    """
+
+    cfg_dir = os.path.abspath(in_dir(cwd, "."))
+    root = os.path.dirname(cfg_dir)
+    exclude = set(os.path.abspath(p) for p in exclude)
+
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        if dirpath == root:
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        if dirpath == cfg_dir:
+            dirnames[:] = []
+            filenames = [f for f in filenames
+                         if not any(fnmatch(f, p) for p in SKIP_CFG_FILES)]
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")
+                       and os.path.join(dirpath, d) not in exclude]
+        for f in filenames:
+            if not f.startswith(".") and f != RUN_LOG \
+                    and os.path.join(dirpath, f) not in exclude:
+                path = os.path.join(dirpath, f)
+                files.append((os.path.relpath(path, root), path))
+
+    # References to files outside of the model tree.
+    with open(os.path.join(cfg_dir, config + ".cfg")) as f:
+        for word in f.read().split():
+            if "/" not in word:
+                continue
+            path = os.path.normpath(os.path.join(cfg_dir, word))
+            if not path.startswith(root + os.sep) and os.path.isfile(path):
+                files.append((path, path))
+
+    return sorted(set(files))
+
+
+def cache_key(config, sim_args, cwd=None, exclude=()):
+    r"""Return cache key of model 'config' and simulation arguments.
+
+    Parameters
+    ----------
+    config : str
+        Configuration file name without extension.
+    sim_args : tuple
+        Simulation arguments (dms, BTSTEP, PTSTEP, FD, FM, TD, TM, PP, hourly,
+        save_level, save_filter).
+    cwd : str | Path, optional
+        Model cfg directory (default: current working directory).
+    exclude : list of str | Path, optional
+        Files and directories not hashed (see model_inputs).
+
+    Returns
+    -------
+    Key (hex string).
+
+    """
+
+    h = hashlib.sha256()
+    h.update(b"esprsim-cache-2\n")
+    h.update((config + "\n" + " ".join(str(a) for a in sim_args) + "\n").encode("utf-8"))
+
+    bps = shutil.which("bps")
+    if bps is not None:
+        h.update(("bps " + file_digest(bps) + "\n").encode("utf-8"))
+
+    for name, path in model_inputs(config, cwd=cwd, exclude=exclude):
+        normalise = any(fnmatch(os.path.basename(name), p) for p in NORMALISE_FILES)
+        h.update((name + " " + file_digest(path, normalise) + "\n").encode("utf-8"))
+
+    return h.hexdigest()
+
+
+def cache_restore(cache, key, variant, cwd=None):
+    r"""Restore results of cache entry 'key' as results of 'variant'.
+
+    Parameters
+    ----------
+    cache : str | Path
+        Cache directory.
+    key : str
+        Cache key (see cache_key).
+    variant : str
+        Simulation variant name.
+    cwd : str | Path, optional
+        Model cfg directory (default: current working directory).
+
+    Returns
+    -------
+    True if the results were restored, False if there is no such entry.
+
+    Notes
+    -----
+    Files are copied to temporary names and renamed when all are copied,
+    an entry evicted meanwhile leaves no partial results.
+
+    """
+
+    entry = os.path.join(cache, key[:2], key)
+    copied = []
+    try:
+        names = os.listdir(entry)
+        if "res" not in names:
+            return False
+        for name in names:
+            if name == "bps.scratch":
+                target = in_dir(cwd, variant + "_bps.scratch")
+            else:
+                target = in_dir(cwd, variant + "." + name)
+            copied.append(target)
+            copy_file(os.path.join(entry, name), target + ".restore")
+    except FileNotFoundError:  # no entry, or evicted meanwhile
+        for target in copied:
+            if os.path.exists(target + ".restore"):
+                os.remove(target + ".restore")
+        return False
+
+    for target in copied:
+        os.replace(target + ".restore", target)
+    try:
+        os.utime(entry)  # mark as recently used
+    except FileNotFoundError:
+        pass
+
+    return True
+
+
+def cache_store(cache, key, variant, cwd=None, max_size=None):
+    r"""Store results of 'variant' as cache entry 'key'.
+
+    The entry is written to a temporary directory and then renamed, i.e.
+    processes sharing the cache never see incomplete entries. Entries are
+    evicted (see cache_evict) when the cache size, scanned on the first
+    store and every EVICT_EVERY stores and counted up in between, exceeds
+    'max_size'.
+
+    Parameters
+    ----------
+    cache : str | Path
+        Cache directory.
+    key : str
+        Cache key (see cache_key).
+    variant : str
+        Simulation variant name.
+    cwd : str | Path, optional
+        Model cfg directory (default: current working directory).
+    max_size : int, optional
+        Maximum cache size in bytes (default: CACHE_SIZE).
+
+    """
+
+    entry = os.path.join(cache, key[:2], key)
+    if os.path.exists(entry):
+        return
+
+    os.makedirs(os.path.dirname(entry), exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=os.path.dirname(entry), prefix=".esprsim_")
+    for ext in RESULT_EXT:
+        if os.path.exists(in_dir(cwd, variant + "." + ext)):
+            copy_file(in_dir(cwd, variant + "." + ext), os.path.join(tmp, ext))
+    if os.path.exists(in_dir(cwd, variant + "_bps.scratch")):
+        copy_file(in_dir(cwd, variant + "_bps.scratch"), os.path.join(tmp, "bps.scratch"))
+
+    size = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp))
+    try:
+        os.rename(tmp, entry)
+    except OSError:  # stored by another process meanwhile
+        shutil.rmtree(tmp, ignore_errors=True)
+        return
+
+    max_size = CACHE_SIZE if max_size is None else max_size
+    total, stores = _sizes.get(cache, (None, 0))
+    if total is None or stores + 1 >= EVICT_EVERY or total + size > max_size:
+        cache_evict(cache, max_size)
+    else:
+        _sizes[cache] = (total + size, stores + 1)
+
+
+def cache_evict(cache, max_size):
+    r"""Remove least recently used cache entries above 'max_size'.
+
+    Parameters
+    ----------
+    cache : str | Path
+        Cache directory.
+    max_size : int
+        Maximum cache size in bytes.
+
+    Returns
+    -------
+    Number of entries removed.
+
+    """
+
+    entries = []
+    total = 0
+    for entry in glob.glob(os.path.join(cache, "??", "*")):
+        try:
+            size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+            entries.append((os.stat(entry).st_mtime, size, entry))
+        except FileNotFoundError:  # removed by another process
+            continue
+        total += size
+
+    removed = 0
+    for mtime, size, entry in sorted(entries):
+        if total <= max_size:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
+        removed += 1
+
+    _sizes[cache] = (total, 0)
+
+    return removed
@@ -0,0 +1,1142 @@
+#!/usr/bin/env python3
+
+# Last changed: 18/10/2026
+# Status: development
+#
+# Module contains following functions for running campaigns of ESP-r variants:
+#
+# def espr_function(name):
+#          Return esprsim function by name.
+# def call_steps(steps, cwd):
+#          Call list of esprsim functions in working directory 'cwd'.
+# def run_variant(spec, model, sandbox_root, cfg="cfg", jobs=None):
+#          Edit, simulate and evaluate one variant in its own sandbox.
+# def variant_edit(spec, model, sandbox_root, cfg="cfg", jobs=None):
+#          Stage 1 of a variant: create sandbox, apply edits, QA report.
+# def variant_simulate(spec, status, cfg="cfg", jobs=None):
+#          Stage 2 of a variant: simulate with bps.
+# def variant_extract(spec, status, cfg="cfg", jobs=None):
+#          Stage 3 of a variant: extract results with res.
+# def variant_archive(spec, status, cfg="cfg", jobs=None):
+#          Stage 4 of a variant: move results, add them to the store and archive.
+# def run_campaign(variants, model, sandbox_root, workers=None, cfg="cfg", jobs=None,
+#                  schedule=None, runtime=None):
+#          Run variants on 'workers' processes in parallel.
+# def run_pipeline(variants, model, sandbox_root, workers=None, edit_workers=None,
+#                  extract_workers=None, archive_workers=None, queue=None, cfg="cfg",
+#                  jobs=None, schedule=None, runtime=None):
+#          Run variants in a pipeline of stages, each with its own workers.
+# def config_zones(model, config, cfg="cfg"):
+#          Return number of zones of model 'config'.
+# def runtime_work(spec, zones):
+#          Return work units (zone time steps) of the simulation of a variant.
+# def runtime_estimate(rtm, spec, zones):
+#          Return expected bps run time (s) of a variant.
+# def runtime_update(rtm, spec, zones, seconds):
+#          Add measured bps run time of a variant to the runtime model.
+# def runtime_load(path):
+#          Load runtime model (empty if the file does not exist).
+# def split_period(FD, FM, TD, TM, chunks=None):
+#          Split simulation period into months or 'chunks' sub-periods.
+# def chunk_specs(spec, chunks=None, warmup=None):
+#          Return variant specifications of the time chunks of 'spec'.
+# def stitch_dat(files, outfile):
+#          Join .dat / .csv files of consecutive time chunks.
+# def sum_dat(files, outfile):
+#          Join per-period summaries of consecutive time chunks by summing.
+# def boundary_report(files):
+#          Report discontinuities of time series at chunk boundaries.
+# def run_chunked(spec, model, sandbox_root, chunks=None, warmup=None, workers=None, cfg="cfg"):
+#          Simulate variant in parallel time chunks and stitch the results.
+import os
+import json
+import time
+import shutil
+import traceback
+from fnmatch import fnmatch
+from contextlib import contextmanager, nullcontext, ExitStack
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from . import espr_sim, espr_ms_sim, espr_res
+from .espr_run import prj_session, run_label, read_run_log, watchdog
+from .espr_sandbox import (make_sandbox, remove_sandbox, tmpfs_sandbox, persist_sandbox,
+                           TMPFS_MIN_FREE)
+from .espr_cache import cache_key, file_digest
+from .espr_jobs import jobs_add, job_state, jobs_status
+from .espr_store import store_variant
+from .espr_template import template_variant
+from .espr_archive import archive_variant
+from .espr_files import write_file
+from .espr_dat import dat_header, read_dat
+
+"""
+Module contains functions to run campaigns of ESP-r simulation variants in
+parallel. Each variant is edited, simulated and evaluated in its own sandbox
+(see espr_sandbox), variants are distributed over a pool of worker processes.
+
+A variant is specified by a dict, e.g.
+
+    {"variant"     : "var01",
+     "edits"       : [("set_ctl", (cfg, "ctl_var01")),
+                      ("set_lam", (cfg, "a", "b", "0.04"))],
+     "batch_edits" : True,
+     "qa"          : True,
+     "simulate"    : {"dms": 1, "config": cfg, "BTSTEP": "4", "PTSTEP": "1",
+                      "FD": "1", "FM": "1", "TD": "31", "TM": "12", "PP": "7",
+                      "hourly": True, "save_level": "2"},
+     "extract"     : [("res_supplied_energy", ("var01",)),
+                      ("res_PMV", ("var01", "Wohnen", "1.0", "1.2", "0.1"))],
+     "store"       : "/data/study",
+     "params"      : {"ctl": "ctl_var01", "lam": 0.04},
+     "watchdog"    : {"timeout": 7200, "stall": 900, "loop": 50},
+     "archive"     : "/data/archive",
+     "tmpfs"       : "/dev/shm"}
+
+Edits and extractions are given as (function name, args) or (function name,
+args, kwargs), the function names being those of espr_sim, espr_ms_sim and
+espr_res. The 'cwd' argument is supplied by the campaign. With 'batch_edits'
+set, all prj edits are applied in one prj session (see prj_session). With
+'store' set, the extracted outputs are added to that columnar store together
+with the variant's 'params' (see espr_store). With 'watchdog' set, all ESP-r
+runs of the variant are supervised and hung runs killed, failing the variant
+(see espr_run.watchdog). With 'archive' set, the result libraries and
+scratch files are packed into a compressed archive in that directory and
+removed from the sandbox (see espr_archive). With 'tmpfs' set, the variant
+runs in a copy of its sandbox in that tmpfs directory, moved back to the
+sandbox when the variant is finished; with less free memory than
+'tmpfs_min_free' (bytes, default TMPFS_MIN_FREE) the variant runs in the
+sandbox (see espr_sandbox.tmpfs_sandbox). With 'template' set (a template
+file recorded by espr_template.template_record), the sandbox is generated
+from the template with the variant's 'params' as parameter values, further
+'edits' are applied afterwards. With a job database (see
+espr_jobs), the state of every variant is recorded and an interrupted
+campaign is resumed by running it again (or by resume_campaign()).
+"""
+
+
+def espr_function(name):
+    r"""Return esprsim function by name.
+
+    Parameters
+    ----------
+    name : str
+        Name of a function in espr_sim, espr_ms_sim or espr_res.
+
+    Returns
+    -------
+    Function object.
+
+    """
+
+    for module in (espr_sim, espr_ms_sim, espr_res):
+        if hasattr(module, name):
+            return getattr(module, name)
+    raise ValueError("Unknown esprsim function '" + name + "'.")
+
+
+def call_steps(steps, cwd):
+    r"""Call list of (function name, args[, kwargs]) in working directory 'cwd'.
+
+    Parameters
+    ----------
+    steps : list of tuple
+        Function calls as (name, args) or (name, args, kwargs).
+    cwd : str | Path
+        Model cfg directory to run in.
+
+    """
+
+    for step in steps:
+        name, args = step[0], step[1]
+        kwargs = dict(step[2]) if len(step) > 2 else {}
+        espr_function(name)(*args, cwd=cwd, **kwargs)
+
+
+def run_variant(spec, model, sandbox_root, cfg="cfg", jobs=None):
+    r"""Edit, simulate and evaluate one variant in its own sandbox.
+
+    Parameters
+    ----------
+    spec : dict
+        Variant specification (see module documentation).
+    model : str | Path
+        Root directory of the ESP-r base model.
+    sandbox_root : str | Path
+        Directory in which the sandbox '<sandbox_root>/<variant>' is created.
+    cfg : str, optional
+        Name of the cfg directory of the model (default: 'cfg').
+    jobs : str | Path, optional
+        Job database recording the state of the variant (see espr_jobs).
+        An existing sandbox of the variant is removed first.
+
+    Returns
+    -------
+    Dict with keys 'variant', 'status' ('done' or 'failed'), 'error',
+    'sandbox', 'workdir' (working tree, the sandbox or its copy in tmpfs
+    while running), 'results' (list of result file paths), 'time' (s) and
+    'runs' (run log records of the ESP-r runs, see espr_run.log_run).
+
+    Notes
+    -----
+    Results and scratch files are moved to '<cfg>/<variant>' and
+    '<cfg>/<variant>_scratchfiles' in the sandbox (see move_files).
+
+    The stages variant_edit, variant_simulate, variant_extract and
+    variant_archive are run one after the other (see run_pipeline for
+    running them concurrently for different variants).
+
+    """
+
+    status = variant_edit(spec, model, sandbox_root, cfg=cfg, jobs=jobs)
+    for stage in (variant_simulate, variant_extract, variant_archive):
+        status = stage(spec, status, cfg=cfg, jobs=jobs)
+
+    return status
+
+
+@contextmanager
+def _stage(spec, status, state, cfg, jobs, last=False, **fields):
+    r"""Context of a stage of a variant: label, watchdog, errors, job state.
+
+    Records job 'state' (and further job 'fields'), yields the cfg
+    directory of the working tree. An exception raised within
+    marks the variant as failed, the variant is finished (working tree
+    moved to the sandbox, run log read, final job state recorded) on
+    failure or after the 'last' stage.
+    """
+
+    supervised = nullcontext() if spec.get("watchdog") is None \
+        else watchdog(**spec["watchdog"])
+
+    t0 = time.time()
+    if jobs is not None:
+        job_state(jobs, status["variant"], state, **fields)
+    try:
+        with run_label(status["variant"]), supervised:
+            yield os.path.join(status["workdir"], cfg)
+        if last:
+            status["status"] = "done"
+    except Exception as err:
+        status["error"] = "".join(traceback.format_exception_only(type(err), err)).strip()
+    status["time"] += time.time() - t0
+
+    if status["error"] is not None or last:
+        if status["workdir"] != status["sandbox"]:
+            status["workdir"] = persist_sandbox(status["workdir"], status["sandbox"])
+        wd = os.path.join(status["sandbox"], cfg)
+        if os.path.isdir(wd):
+            status["runs"] = read_run_log(wd)
+        if jobs is not None:
+            job_state(jobs, status["variant"], status["status"], results=status["results"],
+                      error=status["error"], finished=time.time(), time=status["time"])
+
+
+def variant_edit(spec, model, sandbox_root, cfg="cfg", jobs=None):
+    r"""Stage 1 of a variant: create sandbox, apply edits, QA report.
+
+    Parameters
+    ----------
+    spec : dict
+        Variant specification (see module documentation).
+    model : str | Path
+        Root directory of the ESP-r base model.
+    sandbox_root : str | Path
+        Directory in which the sandbox '<sandbox_root>/<variant>' is created.
+    cfg : str, optional
+        Name of the cfg directory of the model (default: 'cfg').
+    jobs : str | Path, optional
+        Job database (see run_variant).
+
+    Returns
+    -------
+    Status dict (see run_variant), passed on to variant_simulate.
+
+    """
+
+    variant = spec["variant"]
+    edits = spec.get("edits", ())
+    sandbox = os.path.join(os.path.abspath(sandbox_root), variant)
+
+    status = {"variant": variant, "status": "failed", "error": None,
+              "sandbox": sandbox, "workdir": sandbox, "results": [], "time": 0.0,
+              "runs": []}
+
+    with _stage(spec, status, "editing", cfg, jobs, sandbox=sandbox, started=time.time(),
+                error=None):
+        if jobs is not None and os.path.isdir(sandbox):
+            remove_sandbox(sandbox)
+        if spec.get("template") is not None:
+            wd = template_variant(spec["template"], model, sandbox,
+                                  spec.get("params", {}), edits=[e[0] for e in edits])
+        else:
+            wd = make_sandbox(model, sandbox, edits=[e[0] for e in edits], cfg=cfg)
+
+        if spec.get("tmpfs") is not None:
+            status["workdir"] = tmpfs_sandbox(sandbox, spec["tmpfs"],
+                                              spec.get("tmpfs_min_free", TMPFS_MIN_FREE))
+            wd = os.path.join(status["workdir"], cfg)
+
+        if spec.get("batch_edits", False) is True:
+            with prj_session(spec["simulate"]["config"], cwd=wd):
+                call_steps(edits, wd)
+        else:
+            call_steps(edits, wd)
+
+        if spec.get("qa", False) is True:
+            espr_sim.qa_report(spec["simulate"]["config"], variant, cwd=wd)
+
+    return status
+
+
+def variant_simulate(spec, status, cfg="cfg", jobs=None):
+    r"""Stage 2 of a variant: simulate with bps.
+
+    Parameters
+    ----------
+    spec : dict
+        Variant specification (see module documentation).
+    status : dict
+        Status dict of the previous stage (not run if it failed).
+    cfg : str, optional
+        Name of the cfg directory of the model (default: 'cfg').
+    jobs : str | Path, optional
+        Job database (see run_variant).
+
+    Returns
+    -------
+    Status dict, passed on to variant_extract.
+
+    """
+
+    if status["error"] is not None:
+        return status
+
+    variant = status["variant"]
+    with _stage(spec, status, "simulating", cfg, jobs) as wd:
+        if jobs is not None:
+            sim = spec["simulate"]
+            job_state(jobs, variant, "simulating", inputs=cache_key(sim["config"], (
+                sim["dms"], sim["BTSTEP"], sim["PTSTEP"], sim["FD"], sim["FM"],
+                sim["TD"], sim["TM"], sim["PP"], sim.get("hourly", False),
+                sim.get("save_level", "*"), sim.get("save_filter", "*")), cwd=wd))
+
+        espr_sim.simulate(variant=variant, cwd=wd, **spec["simulate"])
+
+        if os.path.exists(os.path.join(wd, variant + ".res")) is False:
+            raise RuntimeError("bps did not write " + variant + ".res, see "
+                               + variant + "_bps.scratch")
+
+    return status
+
+
+def variant_extract(spec, status, cfg="cfg", jobs=None):
+    r"""Stage 3 of a variant: extract results with res.
+
+    Parameters
+    ----------
+    spec : dict
+        Variant specification (see module documentation).
+    status : dict
+        Status dict of the previous stage (not run if it failed).
+    cfg : str, optional
+        Name of the cfg directory of the model (default: 'cfg').
+    jobs : str | Path, optional
+        Job database (see run_variant).
+
+    Returns
+    -------
+    Status dict, passed on to variant_archive.
+
+    """
+
+    if status["error"] is not None:
+        return status
+
+    with _stage(spec, status, "extracting", cfg, jobs) as wd:
+        call_steps(spec.get("extract", ()), wd)
+
+    return status
+
+
+def variant_archive(spec, status, cfg="cfg", jobs=None):
+    r"""Stage 4 of a variant: move results, add them to the store and archive.
+
+    Parameters
+    ----------
+    spec : dict
+        Variant specification (see module documentation).
+    status : dict
+        Status dict of the previous stage (not run if it failed).
+    cfg : str, optional
+        Name of the cfg directory of the model (default: 'cfg').
+    jobs : str | Path, optional
+        Job database (see run_variant).
+
+    Returns
+    -------
+    Final status dict (see run_variant).
+
+    """
+
+    if status["error"] is not None:
+        return status
+
+    variant = status["variant"]
+    with _stage(spec, status, "archiving", cfg, jobs, last=True) as wd:
+        espr_sim.move_files(1, variant, cwd=wd)
+
+        if spec.get("store") is not None:
+            store_variant(spec["store"], variant, spec.get("params"), cwd=wd)
+
+        results = []
+        if spec.get("archive") is not None:
+            results.append(archive_variant(spec["archive"], variant, cwd=wd))
+
+        vardir = os.path.join(status["sandbox"], cfg, variant)  # after persisting
+        status["results"] = sorted(os.path.join(vardir, f)
+                                   for f in os.listdir(os.path.join(wd, variant))) + results
+
+    return status
+
+
+def run_campaign(variants, model, sandbox_root, workers=None, cfg="cfg", jobs=None,
+                 schedule=None, runtime=None):
+    r"""Run variants on 'workers' processes in parallel.
+
+    At most 'workers' variants are in flight at any time, further variants
+    are submitted as running ones finish.
+
+    Parameters
+    ----------
+    variants : list of dict
+        Variant specifications (see module documentation).
+    model : str | Path
+        Root directory of the ESP-r base model.
+    sandbox_root : str | Path
+        Directory in which the variant sandboxes are created.
+    workers : int, optional
+        Number of worker processes (default: number of CPUs).
+    cfg : str, optional
+        Name of the cfg directory of the model (default: 'cfg').
+    jobs : str | Path, optional
+        Job database (see espr_jobs). Variants are added to it, variants
+        already done are not run again (their recorded status is returned).
+    schedule : str | None, optional
+        None (default): submit the variants in the order of 'variants',
+        'ljf': submit the variant with the longest expected run time first
+        (see runtime_estimate).
+    runtime : str | Path, optional
+        Runtime model file, updated with every finished variant (default:
+        '<sandbox_root>/RUNTIME_MODEL').
+
+    Returns
+    -------
+    List of status dicts (see run_variant), in the order of 'variants'.
+
+    Notes
+    -----
+    Example usage.
+        status = run_campaign(variants, "..", "/scratch/campaign", workers=60)
+        failed = [s["variant"] for s in status if s["status"] == "failed"]
+
+    Longest job first (schedule='ljf') keeps long variants (e.g. dms 4 with
+    small time steps) from starting last and extending the campaign while
+    other workers idle.
+
+    """
+
+    workers = workers or os.cpu_count() or 1
+    names = [v["variant"] for v in variants]
+    if len(set(names)) != len(names):
+        raise ValueError("Variant names must be unique.")
+    _check_schedule(schedule)
+
+    print("\tCampaign          : " + str(len(variants)) + " variants on "
+          + str(workers) + " workers")
+
+    os.makedirs(sandbox_root, exist_ok=True)
+
+    results = _jobs_done(jobs, variants, model, cfg, sandbox_root, runtime)
+    pending = [(i, spec) for i, spec in enumerate(variants) if i not in results]
+    running = {}
+
+    rt = _runtime(pending, model, sandbox_root, cfg, runtime)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            while pending and len(running) < workers:
+                # Estimates change as the runtime model learns, choose anew each time.
+                k = 0 if schedule is None else _longest(pending, rt)
+                i, spec = pending.pop(k)
+                running[pool.submit(run_variant, spec, model, sandbox_root, cfg, jobs)] = i
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = running.pop(future)
+                _finished(results, i, future.result(), variants, rt)
+
+    return [results[i] for i in range(len(variants))]
+
+
+def run_pipeline(variants, model, sandbox_root, workers=None, edit_workers=None,
+                 extract_workers=None, archive_workers=None, queue=None, cfg="cfg",
+                 jobs=None, schedule=None, runtime=None):
+    r"""Run variants in a pipeline of stages, each with its own workers.
+
+    The stages edit (variant_edit), simulate (variant_simulate), extract
+    (variant_extract) and archive (variant_archive) run concurrently for
+    different variants, e.g. prj edits of variant N+1, bps of variant N and
+    res extraction of variant N-1. Edited variants wait in a bounded queue
+    for bps, simulated ones in a bounded queue for extraction.
+
+    Parameters
+    ----------
+    variants : list of dict
+        Variant specifications (see module documentation).
+    model : str | Path
+        Root directory of the ESP-r base model.
+    sandbox_root : str | Path
+        Directory in which the variant sandboxes are created.
+    workers : int, optional
+        Number of bps worker processes (default: number of CPUs).
+    edit_workers : int, optional
+        Number of edit worker processes (default: workers / 4, at least 1).
+    extract_workers : int, optional
+        Number of extraction worker processes (default: workers / 4, at
+        least 1).
+    archive_workers : int, optional
+        Number of archive worker processes (default: 1).
+    queue : int, optional
+        Maximum number of variants edited ahead of bps, and of simulated
+        variants waiting for extraction (default: 2 * workers).
+    cfg : str, optional
+        Name of the cfg directory of the model (default: 'cfg').
+    jobs : str | Path, optional
+        Job database (see run_campaign).
+    schedule : str | None, optional
+        Order in which edited variants are simulated (see run_campaign).
+    runtime : str | Path, optional
+        Runtime model file (see run_campaign).
+
+    Returns
+    -------
+    List of status dicts (see run_variant), in the order of 'variants'.
+
+    Notes
+    -----
+    bps waits for extraction only if extraction falls behind by more than
+    'queue' variants, i.e. the result files waiting are bounded.
+
+    Example usage.
+        status = run_pipeline(variants, "..", "/scratch/campaign", workers=56,
+                              edit_workers=4, extract_workers=8)
+
+    """
+
+    workers = workers or os.cpu_count() or 1
+    nworkers = [edit_workers or max(workers // 4, 1), workers,
+                extract_workers or max(workers // 4, 1), archive_workers or 1]
+    queue = queue or 2 * workers
+    names = [v["variant"] for v in variants]
+    if len(set(names)) != len(names):
+        raise ValueError("Variant names must be unique.")
+    _check_schedule(schedule)
+
+    print("\tPipeline          : " + str(len(variants)) + " variants on "
+          + "/".join(str(n) for n in nworkers) + " edit/bps/res/archive workers")
+
+    os.makedirs(sandbox_root, exist_ok=True)
+
+    results = _jobs_done(jobs, variants, model, cfg, sandbox_root, runtime)
+    # Variants ready for each stage, (index, spec) for the first, (index, status) else.
+    ready = [[(i, spec) for i, spec in enumerate(variants) if i not in results], [], [], []]
+    nrun = [0, 0, 0, 0]
+    running = {}
+
+    rt = _runtime(ready[0], model, sandbox_root, cfg, runtime)
+
+    stages = (variant_edit, variant_simulate, variant_extract, variant_archive)
+    with ExitStack() as stack:
+        pools = [stack.enter_context(ProcessPoolExecutor(max_workers=n)) for n in nworkers]
+        while any(ready) or running:
+            # Later stages first, they make room in the queues.
+            for k in (3, 2, 1, 0):
+                while ready[k] and nrun[k] < nworkers[k] \
+                        and (k > 1 or len(ready[k + 1]) + nrun[k] < queue):
+                    if k == 0:
+                        i, spec = ready[0].pop(0)
+                        f = pools[0].submit(variant_edit, spec, model, sandbox_root, cfg, jobs)
+                    else:
+                        n = _longest(ready[1], rt, variants) \
+                            if k == 1 and schedule is not None else 0
+                        i, status = ready[k].pop(n)
+                        f = pools[k].submit(stages[k], variants[i], status, cfg, jobs)
+                    running[f] = (k, i)
+                    nrun[k] += 1
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                k, i = running.pop(future)
+                nrun[k] -= 1
+                status = future.result()
+                if k == 3 or status["error"] is not None:
+                    _finished(results, i, status, variants, rt)
+                else:
+                    ready[k + 1].append((i, status))
+
+    return [results[i] for i in range(len(variants))]
+
+
+def _jobs_done(jobs, variants, model, cfg, sandbox_root, runtime):
+    r"""Add variants to job database 'jobs', return {index: status} of those done.
+
+    Jobs whose specification or base model (inputs of the config and the
+    template) changed are reset and run again. Files written by the
+    campaign (job database, runtime model, sandboxes) are not hashed as
+    inputs, if they are located in the model tree.
+    """
+
+    results = {}
+    if jobs is None:
+        return results
+
+    jobs = os.path.abspath(jobs)
+    written = [jobs + s for s in ("", "-wal", "-shm", "-journal")] \
+        + [runtime or os.path.join(sandbox_root, RUNTIME_MODEL), sandbox_root]
+
+    def base(spec):
+        # template dicts are part of the specification itself
+        template = spec.get("template")
+        return spec["simulate"]["config"], None if isinstance(template, dict) else template
+
+    keys = {}
+    for spec in variants:
+        config, template = base(spec)
+        if (config, template) not in keys:
+            extra = () if template is None else (file_digest(template),)
+            keys[config, template] = cache_key(config, extra, cwd=os.path.join(model, cfg),
+                                               exclude=written)
+    jobs_add(jobs, variants, [keys[base(spec)] for spec in variants])
+    done = {j["variant"]: j for j in jobs_status(jobs, states=["done"])}
+    for i, spec in enumerate(variants):
+        if spec["variant"] in done:
+            j = done[spec["variant"]]
+            results[i] = {"variant": j["variant"], "status": "done", "error": None,
+                          "sandbox": j["sandbox"], "results": j["results"],
+                          "time": j["time"], "runs": []}
+    print("\tJob database      : " + str(len(results)) + " variants done, "
+          + str(len(variants) - len(results)) + " to run")
+
+    return results
+
+
+def _runtime(pending, model, sandbox_root, cfg, runtime):
+    r"""Return runtime model state of a campaign: model, file, zones per config."""
+
+    rt = {"path": runtime or os.path.join(sandbox_root, RUNTIME_MODEL), "zones": {}}
+    rt["model"] = runtime_load(rt["path"])
+    for i, spec in pending:
+        config = spec["simulate"]["config"]
+        if config not in rt["zones"]:
+            rt["zones"][config] = config_zones(model, config, cfg=cfg)
+
+    return rt
+
+
+def _check_schedule(schedule):
+    r"""Raise ValueError for unknown 'schedule' (see run_campaign)."""
+
+    if schedule not in (None, "ljf"):
+        raise ValueError("Unknown schedule '" + str(schedule) + "', use None or 'ljf'.")
+
+
+def _longest(pending, rt, variants=None):
+    r"""Return position of the variant with the longest expected run time."""
+
+    def expected(item):
+        spec = item[1] if variants is None else variants[item[0]]
+        return runtime_estimate(rt["model"], spec, rt["zones"][spec["simulate"]["config"]])
+
+    return pending.index(max(pending, key=expected))
+
+
+def _finished(results, i, status, variants, rt):
+    r"""Record status of finished variant 'i', update the runtime model."""
+
+    results[i] = status
+    print("\t" + status["variant"] + " " + status["status"]
+          + " (" + str(len(results)) + "/" + str(len(variants)) + ")")
+
+    bps = [r["wall"] for r in status["runs"] if r["module"] == "bps"]
+    if status["status"] == "done" and bps:
+        spec = variants[i]
+        runtime_update(rt["model"], spec, rt["zones"][spec["simulate"]["config"]], sum(bps))
+        write_file(rt["path"], [json.dumps(rt["model"], indent=1)])
+
+
+# Runtime model file in the sandbox root, see run_campaign().
+RUNTIME_MODEL = "esprsim_runtime.json"
+
+# Prior bps run time per zone time step (s) by domain mode, used until runs of
+# the mode have been measured.
+RUNTIME_PRIOR = {1: 2e-4, 2: 5e-4, 3: 1e-3, 4: 2e-3}
+
+
+def config_zones(model, config, cfg="cfg"):
+    r"""Return number of zones of model 'config'.
+
+    Parameters
+    ----------
+    model : str | Path
+        Root directory of the ESP-r model.
+    config : str
+        Configuration file name without extension.
+    cfg : str, optional
+        Name of the cfg directory of the model (default: 'cfg').
+
+    Returns
+    -------
+    Number of '*geo' entries of the .cfg file (at least 1).
+
+    """
+
+    with open(os.path.join(model, cfg, config + ".cfg"), "r") as f:
+        n = sum(1 for line in f if line.split()[:1] == ["*geo"])
+
+    return max(n, 1)
+
+
+def runtime_work(spec, zones):
+    r"""Return work units (zone time steps) of the simulation of a variant.
+
+    Parameters
+    ----------
+    spec : dict
+        Variant specification (see module documentation).
+    zones : int
+        Number of zones of the model (see config_zones).
+
+    Returns
+    -------
+    Zones times building time steps of period and start-up days, times
+    plant time steps per building time step for dms 3 and 4.
+
+    """
+
+    sim = spec["simulate"]
+    days = (_day_of_year(sim["TD"], sim["TM"]) - _day_of_year(sim["FD"], sim["FM"]) + 1
+            + int(sim["PP"]))
+    steps = days * 24 * int(sim["BTSTEP"])
+    if int(sim["dms"]) in (3, 4):
+        steps *= int(sim["PTSTEP"])
+
+    return steps * zones
+
+
+def runtime_estimate(rtm, spec, zones):
+    r"""Return expected bps run time (s) of a variant.
+
+    The run time is modelled as proportional to the work units (see
+    runtime_work), with one factor per domain mode fitted to the measured
+    runs (least squares through the origin), RUNTIME_PRIOR before.
+
+    Parameters
+    ----------
+    rtm : dict
+        Runtime model (see runtime_load).
+    spec : dict
+        Variant specification (see module documentation).
+    zones : int
+        Number of zones of the model (see config_zones).
+
+    """
+
+    dms = int(spec["simulate"]["dms"])
+    fit = rtm.get(str(dms))
+    if fit is not None and fit["ww"] > 0:
+        factor = fit["tw"] / fit["ww"]
+    else:
+        factor = RUNTIME_PRIOR.get(dms, max(RUNTIME_PRIOR.values()))
+
+    return factor * runtime_work(spec, zones)
+
+
+def runtime_update(rtm, spec, zones, seconds):
+    r"""Add measured bps run time of a variant to the runtime model.
+
+    Parameters
+    ----------
+    rtm : dict
+        Runtime model (see runtime_load), updated in place.
+    spec : dict
+        Variant specification (see module documentation).
+    zones : int
+        Number of zones of the model (see config_zones).
+    seconds : float
+        Measured bps run time (s).
+
+    """
+
+    w = float(runtime_work(spec, zones))
+    fit = rtm.setdefault(str(int(spec["simulate"]["dms"])), {"n": 0, "tw": 0.0, "ww": 0.0})
+    fit["n"] += 1
+    fit["tw"] += seconds * w
+    fit["ww"] += w * w
+
+
+def runtime_load(path):
+    r"""Load runtime model (empty if the file does not exist).
+
+    Parameters
+    ----------
+    path : str | Path
+        Runtime model file (JSON).
+
+    Returns
+    -------
+    Dict {dms: {"n": runs, "tw": sum of time * work, "ww": sum of work^2}}.
+
+    """
+
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+# Days per month (ESP-r simulates years of 365 days).
+MONTH_DAYS = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+def _day_of_year(day, month):
+    r"""Return day of year of 'day'.'month'."""
+
+    return sum(MONTH_DAYS[:int(month) - 1]) + int(day)
+
+
+def _day_month(doy):
+    r"""Return (day, month) of day of year 'doy' as strings."""
+
+    month = 1
+    while doy > MONTH_DAYS[month - 1]:
+        doy -= MONTH_DAYS[month - 1]
+        month += 1
+    return str(doy), str(month)
+
+
+def split_period(FD, FM, TD, TM, chunks=None):
+    r"""Split simulation period into months or 'chunks' sub-periods.
+
+    Parameters
+    ----------
+    FD, FM, TD, TM : str
+        Start day and month, end day and month of the period.
+    chunks : int, optional
+        Number of sub-periods of (about) equal length (default: one
+        sub-period per calendar month).
+
+    Returns
+    -------
+    List of (FD, FM, TD, TM) tuples of strings.
+
+    """
+
+    first = _day_of_year(FD, FM)
+    last = _day_of_year(TD, TM)
+
+    if chunks is None:
+        starts = [first] + [_day_of_year(1, m) for m in range(int(FM) + 1, int(TM) + 1)]
+    else:
+        ndays = last - first + 1
+        chunks = min(chunks, ndays)
+        starts = [first + (ndays * k) // chunks for k in range(chunks)]
+
+    ends = [s - 1 for s in starts[1:]] + [last]
+
+    return [_day_month(s) + _day_month(e) for s, e in zip(starts, ends)]
+
+
+def chunk_specs(spec, chunks=None, warmup=None):
+    r"""Return variant specifications of the time chunks of 'spec'.
+
+    Each chunk is a variant '<variant>_cNN' simulating one sub-period (see
+    split_period) with its own start-up period. Arguments of edits and
+    extractions equal to the variant name are replaced by the chunk name.
+
+    Parameters
+    ----------
+    spec : dict
+        Variant specification (see module documentation).
+    chunks : int, optional
+        Number of chunks (default: one per calendar month).
+    warmup : str, optional
+        Start-up days of the second and further chunks (default: start-up
+        days 'PP' of 'spec').
+
+    Returns
+    -------
+    List of variant specifications.
+
+    """
+
+    variant = spec["variant"]
+    sim = spec["simulate"]
+    periods = split_period(sim["FD"], sim["FM"], sim["TD"], sim["TM"], chunks)
+
+    def rename(steps, name):
+        return [(s[0], tuple(name if a == variant else a for a in s[1])) + tuple(s[2:])
+                for s in steps]
+
+    specs = []
+    for k, (FD, FM, TD, TM) in enumerate(periods):
+        name = variant + "_c%02d" % (k + 1)
+        c = dict(spec, variant=name, store=None)
+        c["edits"] = rename(spec.get("edits", ()), name)
+        c["extract"] = rename(spec.get("extract", ()), name)
+        c["simulate"] = dict(sim, FD=FD, FM=FM, TD=TD, TM=TM)
+        if k > 0 and warmup is not None:
+            c["simulate"]["PP"] = warmup
+        specs.append(c)
+
+    return specs
+
+
+# Outputs being per-period summaries (e.g. energy delivered), joined by
+# summing (see sum_dat) instead of stitching by run_chunked().
+CHUNK_SUMMARIES = ("*en-deliv.dat",)
+
+
+def _time_series(files):
+    r"""True if 'files' hold one time series (first column increasing throughout)."""
+
+    last = None
+    for f in files:
+        try:
+            h = dat_header(f)
+        except ValueError:  # no numeric data lines
+            return False
+        with open(f, "r") as src:
+            for i, line in enumerate(src):
+                if i < h["skip"] or not line.strip():
+                    continue
+                fields = line.split(h["sep"]) if h["sep"] else line.split()
+                try:
+                    t = float(fields[0])
+                except ValueError:
+                    return False
+                if last is not None and t <= last:
+                    return False
+                last = t
+
+    return last is not None
+
+
+def stitch_dat(files, outfile):
+    r"""Join .dat / .csv files of consecutive time chunks.
+
+    The header of the first file is kept, the data lines of all files are
+    appended in the given order.
+
+    Parameters
+    ----------
+    files : list of str | Path
+        Files of the chunks, in time order.
+    outfile : str | Path
+        Joined file.
+
+    """
+
+    with open(outfile, "w") as out:
+        for k, f in enumerate(files):
+            skip = 0 if k == 0 else dat_header(f)["skip"]
+            with open(f, "r") as src:
+                for i, line in enumerate(src):
+                    if i >= skip:
+                        out.write(line)
+
+
+def sum_dat(files, outfile):
+    r"""Join per-period summaries of consecutive time chunks by summing.
+
+    The files must have the same lines apart from the values. Numeric
+    fields of lines holding numbers (after a first label field, e.g. the
+    zone name) are summed over the files, all other fields and lines are
+    those of the first file (e.g. a period in the title is that of the
+    first chunk).
+
+    Parameters
+    ----------
+    files : list of str | Path
+        Files of the chunks, in time order.
+    outfile : str | Path
+        Joined file.
+
+    """
+
+    def number(field):
+        try:
+            return float(field)
+        except ValueError:
+            return None
+
+    chunks = []
+    for f in files:
+        with open(f, "r") as src:
+            chunks.append(src.read().splitlines())
+    if len({len(lines) for lines in chunks}) > 1:
+        raise ValueError("Summaries " + ", ".join(str(f) for f in files)
+                         + " differ in their number of lines.")
+
+    out = []
+    for rows in zip(*chunks):
+        sep = "," if "," in rows[0] else "\t" if "\t" in rows[0] else None
+        split = [r.split(sep) for r in rows]
+        if len({len(s) for s in split}) > 1 \
+                or all(number(x) is None for x in split[0][1:]):
+            out.append(rows[0] + "\n")  # title, column names
+            continue
+        fields = []
+        for values in zip(*split):
+            numbers = [number(x) for x in values]
+            if None in numbers:
+                fields.append(values[0])
+            else:
+                fields.append(format(sum(numbers), ".10g"))
+        out.append((sep or "  ").join(fields) + "\n")
+
+    write_file(outfile, out)
+
+
+def boundary_report(files):
+    r"""Report discontinuities of time series at chunk boundaries.
+
+    For each boundary and numeric column, the change from the last value of
+    a chunk to the first value of the next chunk ('jump') is compared with
+    the median change between time steps within the two chunks ('typical').
+
+    Parameters
+    ----------
+    files : list of str | Path
+        Files of the chunks, in time order.
+
+    Returns
+    -------
+    DataFrame with columns 'boundary' (first time of the later chunk),
+    'column', 'jump', 'typical' and 'ratio' (jump / typical).
+
+    """
+
+    import pandas as pd
+
+    dfs = [read_dat(f) for f in files]
+
+    rows = []
+    for a, b in zip(dfs[:-1], dfs[1:]):
+        if len(a) == 0 or len(b) == 0:
+            continue
+        for c in a.columns:
+            if isinstance(a[c].dtype, pd.CategoricalDtype):
+                continue
+            jump = abs(float(b[c].iloc[0]) - float(a[c].iloc[-1]))
+            typical = float(pd.concat([a[c].diff(), b[c].diff()]).abs().median())
+            if typical > 0:
+                ratio = jump / typical
+            else:
+                ratio = float("inf") if jump > 0 else 0.0
+            rows.append({"boundary": b.index[0], "column": c, "jump": jump,
+                         "typical": typical, "ratio": ratio})
+
+    return pd.DataFrame(rows, columns=["boundary", "column", "jump", "typical", "ratio"])
+
+
+def run_chunked(spec, model, sandbox_root, chunks=None, warmup=None, workers=None,
+                cfg="cfg"):
+    r"""Simulate variant in parallel time chunks and stitch the results.
+
+    The simulation period of 'spec' is split into chunks (see chunk_specs),
+    which are edited, simulated and evaluated as variants of a campaign
+    (see run_campaign). The extracted .dat / .csv files of the chunks are
+    then joined into '<sandbox_root>/<variant>/', named as for a single run:
+    time series (first column increasing through all chunks) are stitched
+    (see stitch_dat), summaries matching CHUNK_SUMMARIES are summed (see
+    sum_dat). Other outputs (e.g. the bps .csv output) are not joined,
+    they remain in the chunk sandboxes.
+
+    Parameters
+    ----------
+    spec : dict
+        Variant specification (see module documentation).
+    model : str | Path
+        Root directory of the ESP-r base model.
+    sandbox_root : str | Path
+        Directory in which the chunk sandboxes are created.
+    chunks : int, optional
+        Number of chunks (default: one per calendar month).
+    warmup : str, optional
+        Start-up days of the second and further chunks (default: 'PP').
+    workers : int, optional
+        Number of worker processes (default: number of CPUs).
+    cfg : str, optional
+        Name of the cfg directory of the model (default: 'cfg').
+
+    Returns
+    -------
+    Dict with keys 'variant', 'status', 'chunks' (status dicts of the
+    chunks), 'results' (joined files), 'boundaries' (see boundary_report,
+    one report per stitched time series) and 'unjoined' ({name: chunk
+    files} of the outputs not joined).
+
+    Notes
+    -----
+    The .res files of the chunks are not joined, they remain in the chunk
+    sandboxes. Results of the start-up days are not saved by bps, the
+    chunks therefore join without overlap.
+
+    Example usage.
+        r = run_chunked(spec, "..", "/scratch/chunks", workers=12)
+        for f, report in r["boundaries"].items():
+            print(f, report["ratio"].max())
+
+    """
+
+    variant = spec["variant"]
+    specs = chunk_specs(spec, chunks, warmup)
+    status = run_campaign(specs, model, sandbox_root, workers=workers, cfg=cfg)
+
+    result = {"variant": variant, "status": "failed", "chunks": status,
+              "results": [], "boundaries": {}, "unjoined": {}}
+    if any(s["status"] != "done" for s in status):
+        return result
+
+    outdir = os.path.join(os.path.abspath(sandbox_root), variant)
+    shutil.rmtree(outdir, ignore_errors=True)
+    os.makedirs(outdir)
+
+    # Output files of the chunks by name of the joined file.
+    names = {}
+    for c, s in zip(specs, status):
+        for f in s["results"]:
+            if f.endswith((".dat", ".csv")):
+                name = os.path.basename(f).replace(c["variant"], variant)
+                names.setdefault(name, []).append(f)
+
+    for name, files in sorted(names.items()):
+        outfile = os.path.join(outdir, name)
+        if any(fnmatch(name, p) for p in CHUNK_SUMMARIES):
+            sum_dat(files, outfile)
+            print("\tSummed            : " + name + " (" + str(len(files)) + " chunks)")
+        elif _time_series(files):
+            stitch_dat(files, outfile)
+            result["boundaries"][outfile] = boundary_report(files)
+            print("\tJoined            : " + name + " (" + str(len(files)) + " chunks)")
+        else:
+            result["unjoined"][name] = files
+            print("\tNot joined        : " + name + " (no time series)")
+            continue
+        result["results"].append(outfile)
+
+    if spec.get("store") is not None:
+        store_variant(spec["store"], variant, spec.get("params"), vardir=outdir)
+
+    result["status"] = "done"
+
+    return result
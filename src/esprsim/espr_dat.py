@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+
+# Last changed: 18/10/2026
+# Status: development
+#
+# Module contains following functions for reading res / bps text output:
+#
+# def dat_header(datfile, cwd=None):
+#          Return title lines, column names and layout of .dat / .csv file.
+# def iter_dat(datfile, chunksize=100000, dtype="float32", year=None, cwd=None):
+#          Read .dat / .csv file in chunks of typed DataFrames.
+# def read_dat(datfile, chunksize=100000, dtype="float32", year=None, cwd=None):
+#          Read .dat / .csv file into a typed DataFrame.
+# def dat_records(datfile, chunksize=100000, dtype="float32", year=None, cwd=None):
+#          Read .dat / .csv file into a NumPy record array.
+import re
+
+from .espr_run import in_dir
+
+"""
+Module contains functions to read the delimited text files written by res
+(see res_supplied_energy, res_PMV, res_batch) and bps (H3K-output.csv renamed
+to <variant>.csv by move_files) into pandas / NumPy.
+
+Files are read in chunks, numeric columns are stored as float32 (or 'dtype'),
+text columns (e.g. zone names) as categoricals. A decimal day-of-year time
+column (as written by res) becomes a DatetimeIndex if the year is known
+(argument 'year', or '(YYYY)' in the header). Otherwise the index stays the
+float64 decimal day of year, as are time columns of other formats.
+
+Example usage.
+    df = read_dat("var01_Wohnen_PMV_1.0_1.2_0.1.dat", cwd=wd)
+    for chunk in iter_dat("var01.csv", cwd=wd):
+        total += chunk.sum()
+"""
+
+
+def _split(line, sep):
+    r"""Split line of data file into fields."""
+
+    if sep is None:
+        return line.split()
+    return [f.strip() for f in line.rstrip("\r\n").split(sep)]
+
+
+def _is_number(field):
+    r"""True if 'field' is a number (or empty)."""
+
+    try:
+        float(field)
+        return True
+    except ValueError:
+        return field == ""
+
+
+def dat_header(datfile, cwd=None):
+    r"""Return title lines, column names and layout of .dat / .csv file.
+
+    Header lines are all lines before the first line whose fields are
+    (mostly) numbers. The column names are taken from the last header line
+    with as many fields as the data lines.
+
+    Parameters
+    ----------
+    datfile : str | Path
+        File name (including extension).
+    cwd : str | Path, optional
+        Directory of the file (default: current working directory).
+
+    Returns
+    -------
+    Dict with keys 'title' (list of header lines), 'columns', 'skip'
+    (number of header lines), 'sep' (delimiter, None for whitespace),
+    'numeric' (list of bool per column) and 'year' (simulation year found
+    in the header, None if not found).
+
+    """
+
+    title = []
+    with open(in_dir(cwd, datfile), "r") as f:
+        for line in f:
+            sep = "," if "," in line else "\t" if "\t" in line else None
+            fields = _split(line, sep)
+            numeric = [_is_number(x) for x in fields]
+            # data line: first field and the majority of fields numeric
+            if fields and numeric[0] and sum(numeric) > len(fields) / 2:
+                break
+            title.append(line.rstrip("\r\n"))
+        else:
+            raise ValueError(str(datfile) + " has no data lines.")
+
+    columns = None
+    for line in reversed(title):
+        names = _split(line.lstrip("#"), sep)
+        if len(names) == len(fields):
+            columns = names
+            break
+    if columns is None:
+        columns = ["c" + str(i) for i in range(len(fields))]
+
+    year = None
+    for line in title:
+        m = re.search(r"\((\d{4})\)", line)
+        if m is not None:
+            year = int(m.group(1))
+            break
+
+    return {"title": title, "columns": columns, "skip": len(title), "sep": sep,
+            "numeric": numeric, "year": year}
+
+
+def iter_dat(datfile, chunksize=100000, dtype="float32", year=None, cwd=None):
+    r"""Read .dat / .csv file in chunks of typed DataFrames.
+
+    Parameters
+    ----------
+    datfile : str | Path
+        File name (including extension).
+    chunksize : int, optional
+        Number of lines per chunk (default: 100000).
+    dtype : str, optional
+        Type of numeric columns (default: 'float32').
+    year : int, optional
+        Simulation year for the DatetimeIndex (default: year found in the
+        header, see dat_header). Without a year, the index is the decimal
+        day of year (float64).
+    cwd : str | Path, optional
+        Directory of the file (default: current working directory).
+
+    Yields
+    ------
+    DataFrame per chunk, indexed by the first (time) column.
+
+    """
+
+    import pandas as pd
+
+    h = dat_header(datfile, cwd=cwd)
+    year = year or h["year"]
+    columns = h["columns"]
+
+    # Time column is kept in full precision.
+    types = {c: ("float64" if i == 0 else dtype if num else "category")
+             for i, (c, num) in enumerate(zip(columns, h["numeric"]))}
+
+    reader = pd.read_csv(in_dir(cwd, datfile), sep=h["sep"] or r"\s+", header=None,
+                         names=columns, skiprows=h["skip"], dtype=types,
+                         chunksize=chunksize, skipinitialspace=True,
+                         engine="c" if h["sep"] else "python")
+
+    for chunk in reader:
+        time = chunk.pop(columns[0])
+        if year is not None:
+            # decimal day of year (1.0 = 1 January, 00:00)
+            time = (pd.Timestamp(year, 1, 1)
+                    + pd.to_timedelta(time - 1.0, unit="D").dt.round("s"))
+        chunk.index = pd.Index(time, name=columns[0])
+        yield chunk
+
+
+def read_dat(datfile, chunksize=100000, dtype="float32", year=None, cwd=None):
+    r"""Read .dat / .csv file into a typed DataFrame.
+
+    Parameters
+    ----------
+    datfile : str | Path
+        File name (including extension).
+    chunksize : int, optional
+        Number of lines per chunk (default: 100000).
+    dtype : str, optional
+        Type of numeric columns (default: 'float32').
+    year : int, optional
+        Simulation year for the DatetimeIndex (default: year found in the
+        header, see dat_header). Without a year, the index is the decimal
+        day of year (float64).
+    cwd : str | Path, optional
+        Directory of the file (default: current working directory).
+
+    Returns
+    -------
+    DataFrame indexed by the first (time) column.
+
+    """
+
+    import pandas as pd
+    from pandas.api.types import union_categoricals
+
+    chunks = list(iter_dat(datfile, chunksize=chunksize, dtype=dtype, year=year, cwd=cwd))
+
+    # Categories differ between chunks, unite them before joining the chunks.
+    for c in chunks[0].columns:
+        if isinstance(chunks[0][c].dtype, pd.CategoricalDtype):
+            u = union_categoricals([ch[c] for ch in chunks]).categories
+            for ch in chunks:
+                ch[c] = ch[c].cat.set_categories(u)
+
+    return pd.concat(chunks)
+
+
+def dat_records(datfile, chunksize=100000, dtype="float32", year=None, cwd=None):
+    r"""Read .dat / .csv file into a NumPy record array.
+
+    Parameters
+    ----------
+    datfile : str | Path
+        File name (including extension).
+    chunksize : int, optional
+        Number of lines per chunk (default: 100000).
+    dtype : str, optional
+        Type of numeric columns (default: 'float32').
+    year : int, optional
+        Simulation year (see read_dat).
+    cwd : str | Path, optional
+        Directory of the file (default: current working directory).
+
+    Returns
+    -------
+    numpy.recarray, the time column being the first field.
+
+    """
+
+    return read_dat(datfile, chunksize=chunksize, dtype=dtype, year=year,
+                    cwd=cwd).to_records()
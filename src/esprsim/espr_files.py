@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+
+# Last changed: 18/10/2026
+# Status: development
+#
+# Module contains following functions for editing ESP-r model files directly:
+#
+# def read_file(path):
+#          Read text file into list of lines.
+# def write_file(path, lines):
+#          Write list of lines to text file (atomic replace).
+# def find_tag(lines, tag):
+#          Return index of first line starting with 'tag'.
+# def cfg_get(cfg_file, key):
+#          Return file reference for 'key' ('clm', 'ctl', ...) in .cfg.
+# def cfg_set(cfg_file, key, value):
+#          Set file reference for 'key' ('clm', 'ctl', ...) in .cfg.
+# def cfg_set_gtp(cfg_file, gtp):
+#          Set user defined monthly ground temperature profiles in .cfg.
+# def ctl_set_setpoints(ctl_file, loop, h_setpoint, c_setpoint='99', day_type=1, period=1):
+#          Set heating / cooling setpoint of building control function.
+# def geo_surfaces(geo_file):
+#          Return zone name and (surface, construction) list of .geo file.
+# def con_index(zones="../zones", cwd=None):
+#          Return index of construction usage, {construction: [(zone, surface)]}.
+# def con_surfaces(con, zones="../zones", cwd=None):
+#          Return (zone, surface) list of surfaces using construction 'con'.
+import os
+import re
+import glob
+import tempfile
+
+"""
+Module contains functions to read and rewrite ESP-r model files (.cfg, .ctl)
+and to index the constructions of the zone geometry files (.geo) in Python,
+without starting prj. Only the addressed lines are changed, all
+other lines are written back unchanged.
+
+The tags and comments identifying the entries are those written by prj
+(ESP-r 13.3), see CFG_TAGS.
+"""
+
+# Tags of file references and ground temperature profiles in .cfg files.
+CFG_TAGS = {
+    "clm": "*clm",   # climate file
+    "ctl": "*ctl",   # control file
+    "spm": "*spf",   # special materials file
+    "afn": "*afn",   # air flow network file
+    "pln": "*pnt",   # plant network file
+    "gtp": "*mgp",   # user defined monthly ground temperature profiles
+}
+
+# Parsed .geo files by path: ((inode, size, mtime), zone, surfaces).
+_geo_cache = {}
+
+
+def read_file(path):
+    r"""Read text file into list of lines.
+
+    Parameters
+    ----------
+    path : str | Path
+        File to read.
+
+    Returns
+    -------
+    List of lines (including line endings).
+
+    """
+
+    with open(path, "r", newline="") as f:
+        return f.readlines()
+
+
+def write_file(path, lines):
+    r"""Write list of lines to text file (atomic replace).
+
+    The file is written to a temporary file in the same directory which then
+    replaces 'path'. A hard link to the old file (e.g. in a sandbox, see
+    espr_sandbox) is therefore not modified.
+
+    Parameters
+    ----------
+    path : str | Path
+        File to write.
+    lines : list of str
+        Lines (including line endings).
+
+    """
+
+    d = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=d, prefix=".esprsim_")
+    try:
+        with os.fdopen(fd, "w", newline="") as f:
+            f.writelines(lines)
+        if os.path.exists(path):
+            os.chmod(tmp, os.stat(path).st_mode & 0o7777)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def find_tag(lines, tag):
+    r"""Return index of first line starting with 'tag' (None if not found).
+
+    Parameters
+    ----------
+    lines : list of str
+        Lines of file.
+    tag : str
+        Tag, e.g. '*clm'.
+
+    """
+
+    for i, line in enumerate(lines):
+        words = line.split()
+        if words and words[0] == tag:
+            return i
+    return None
+
+
+def cfg_get(cfg_file, key):
+    r"""Return file reference for 'key' ('clm', 'ctl', ...) in .cfg.
+
+    Parameters
+    ----------
+    cfg_file : str | Path
+        Configuration file name *including* extension.
+    key : str
+        Key of CFG_TAGS, e.g. 'clm' or 'ctl'.
+
+    Returns
+    -------
+    File reference as written in .cfg (e.g. '../ctl/base.ctl'), None if the
+    model has no such entry.
+
+    """
+
+    lines = read_file(cfg_file)
+    i = find_tag(lines, CFG_TAGS[key])
+    if i is None:
+        return None
+    return lines[i].split()[1]
+
+
+def cfg_set(cfg_file, key, value):
+    r"""Set file reference for 'key' ('clm', 'ctl', ...) in .cfg.
+
+    The reference following the tag is replaced, spacing and any trailing
+    comment of the line are kept.
+
+    Parameters
+    ----------
+    cfg_file : str | Path
+        Configuration file name *including* extension.
+    key : str
+        Key of CFG_TAGS, e.g. 'clm' or 'ctl'.
+    value : str
+        New file reference, e.g. '../dbs/new.clm'.
+
+    """
+
+    tag = CFG_TAGS[key]
+    lines = read_file(cfg_file)
+    i = find_tag(lines, tag)
+    if i is None:
+        raise ValueError(str(cfg_file) + " has no " + tag + " entry, set it with prj.")
+
+    m = re.match(r"(\s*" + re.escape(tag) + r"\s+)(\S+)(.*)", lines[i], flags=re.S)
+    lines[i] = m.group(1) + value + m.group(3)
+
+    write_file(cfg_file, lines)
+
+
+def cfg_set_gtp(cfg_file, gtp):
+    r"""Set user defined monthly ground temperature profiles in .cfg.
+
+    The profiles follow the CFG_TAGS['gtp'] line (holding the number of
+    profiles), one line of 12 monthly values per profile. Existing profiles
+    not in 'gtp' are kept, profiles beyond the existing ones are appended
+    and the number of profiles is updated.
+
+    Parameters
+    ----------
+    cfg_file : str | Path
+        Configuration file name *including* extension.
+    gtp : Nested dict
+        Ground temperature profiles as for espr_sim.set_mgp(), i.e.
+        {1 : {'JanJun' : "...", 'JulDez' : "..."}, 2 : ...}. Profiles are
+        numbered consecutively, new profiles must follow the existing ones
+        without gaps.
+
+    """
+
+    tag = CFG_TAGS["gtp"]
+    lines = read_file(cfg_file)
+    i = find_tag(lines, tag)
+    if i is None:
+        raise ValueError(str(cfg_file) + " has no " + tag + " entry, set it with prj.")
+
+    words = lines[i].split()
+    nold = int(words[1])
+    nnew = max([nold] + [int(n) for n in gtp])
+
+    if any(int(n) < 1 for n in gtp):
+        raise ValueError("Ground temperature profiles are numbered from 1.")
+    missing = [str(n) for n in range(nold + 1, nnew + 1) if n not in gtp]
+    if missing:
+        raise ValueError(str(cfg_file) + " has " + str(nold) + " ground temperature "
+                         + "profiles, profiles " + ", ".join(missing) + " are not defined.")
+
+    new = {}
+    for n in gtp:
+        values = (gtp[n]['JanJun'] + " " + gtp[n]['JulDez']).split()
+        if len(values) != 12:
+            raise ValueError("Ground temperature profile " + str(n)
+                             + " needs 12 monthly values.")
+        new[int(n)] = "".join("%7.2f" % float(v) for v in values) + "\n"
+
+    # Replace existing profiles in place, insert the new ones after them.
+    for n in range(1, nold + 1):
+        if n in new:
+            lines[i + n] = new[n]
+    lines[i + 1 + nold:i + 1 + nold] = [new[n] for n in range(nold + 1, nnew + 1)]
+
+    m = re.match(r"(\s*" + re.escape(tag) + r"\s+)(\S+)(.*)", lines[i], flags=re.S)
+    lines[i] = m.group(1) + str(nnew) + m.group(3)
+
+    write_file(cfg_file, lines)
+
+
+def ctl_set_setpoints(ctl_file, loop, h_setpoint, c_setpoint='99', day_type=1, period=1):
+    r"""Set heating / cooling setpoint of building control function.
+
+    Sets data items 5 (heating setpoint) and 6 (cooling setpoint) of a basic
+    controller period, as prj does with set_ctl_temp_setpt().
+
+    Parameters
+    ----------
+    ctl_file : str | Path
+        Control file name *including* extension.
+    loop : int | str
+        Building control function (number, or menu key 'a', 'b', ...).
+    h_setpoint : str
+        Heating setpoint temperature value as string
+    c_setpoint : str (optional, default: '99')
+        Cooling setpoint temperature value as string
+    day_type : int, optional
+        Day type of the control function (default: 1).
+    period : int, optional
+        Period in day type (default: 1).
+
+    Notes
+    -----
+    Control functions, day types and periods are found by the comments prj
+    writes to .ctl files ('* Control function', '# No. of periods in day',
+    '# ctl type', '# No. of data items'). Only the two values are replaced,
+    spacing and comments of the data lines are kept.
+
+    """
+
+    if str(loop).isdigit():
+        loop = int(loop)
+    else:
+        loop = ord(str(loop).lower()) - ord("a") + 1
+
+    lines = read_file(ctl_file)
+
+    # Locate control function 'loop' in the building section.
+    funcs = []
+    building = False
+    for i, line in enumerate(lines):
+        if line.startswith("* Building"):
+            building = True
+        elif line.startswith("* Control function"):
+            if building:
+                funcs.append(i)
+        elif line.startswith("* "):
+            building = False
+    if loop < 1 or loop > len(funcs):
+        raise ValueError(str(ctl_file) + " has no building control function "
+                         + str(loop) + ".")
+    start = funcs[loop - 1]
+    end = len(lines)
+    for i in range(start + 1, len(lines)):
+        if lines[i].startswith("* "):
+            end = i
+            break
+
+    # Locate day type and period.
+    ndt = 0
+    nper = 0
+    items = None
+    for i in range(start, end):
+        if "# No. of periods in day" in lines[i]:
+            ndt += 1
+            nper = 0
+        elif "# ctl type" in lines[i] and ndt == day_type:
+            nper += 1
+            if nper == period:
+                items = i + 1
+                break
+    if items is None:
+        raise ValueError(str(ctl_file) + ", function " + str(loop) + ": no day type "
+                         + str(day_type) + " / period " + str(period) + ".")
+
+    # Data items may be continued over several lines.
+    nitems = int(float(lines[items].split()[0]))
+    if nitems < 6:
+        raise ValueError(str(ctl_file) + ", function " + str(loop)
+                         + ": period has no setpoint data items.")
+    setpoints = {4: "%.3f" % float(h_setpoint), 5: "%.3f" % float(c_setpoint)}
+    k = 0
+    i = items + 1
+    while k < nitems:
+        # Replace the setpoint tokens in place, spacing and comments are kept.
+        line = lines[i]
+        spans = [m.span() for m in re.finditer(r"\S+", line.split("#")[0])]
+        for n, (a, b) in reversed(list(enumerate(spans, k))):
+            if n in setpoints:
+                line = line[:a] + setpoints[n] + line[b:]
+        lines[i] = line
+        k += len(spans)
+        i += 1
+
+    write_file(ctl_file, lines)
+
+
+def geo_surfaces(geo_file):
+    r"""Return zone name and (surface, construction) list of .geo file.
+
+    Parsed files are cached per process and parsed again only if inode,
+    size or modification time changed (e.g. rewritten by prj).
+
+    Parameters
+    ----------
+    geo_file : str | Path
+        Zone geometry file (ESP-r 11+ format, '*surf' lines).
+
+    Returns
+    -------
+    Tuple (zone, surfaces), 'surfaces' being a list of (surface name,
+    construction name) tuples in file order.
+
+    """
+
+    st = os.stat(geo_file)
+    key = (st.st_ino, st.st_size, st.st_mtime_ns)
+    cached = _geo_cache.get(geo_file)
+    if cached is not None and cached[0] == key:
+        return cached[1], cached[2]
+
+    zone = os.path.splitext(os.path.basename(geo_file))[0]
+    surfaces = []
+    with open(geo_file, "r") as f:
+        for line in f:
+            fields = [x.strip() for x in line.split("#")[0].split(",")]
+            if fields[0].startswith("*Geometry") and len(fields) > 2:
+                zone = fields[2]
+            elif fields[0] == "*surf" and len(fields) > 6:
+                # *surf,name,orientation,parent,usage,usage,construction,optics,...
+                surfaces.append((fields[1], fields[6]))
+
+    _geo_cache[geo_file] = (key, zone, surfaces)
+
+    return zone, surfaces
+
+
+def con_index(zones="../zones", cwd=None):
+    r"""Return index of construction usage, {construction: [(zone, surface)]}.
+
+    Parameters
+    ----------
+    zones : str | Path, optional
+        Directory of the .geo files, relative to 'cwd' (default: '../zones').
+    cwd : str | Path, optional
+        Model cfg directory (default: current working directory).
+
+    Returns
+    -------
+    Dict {construction name: list of (zone, surface) tuples}.
+
+    Notes
+    -----
+    Example usage.
+        index = con_index(cwd=wd)
+        walls = index["extern_wall"]
+
+    """
+
+    path = zones if cwd is None else os.path.join(cwd, zones)
+
+    index = {}
+    for geo_file in sorted(glob.glob(os.path.join(path, "*.geo"))):
+        zone, surfaces = geo_surfaces(geo_file)
+        for surface, con in surfaces:
+            index.setdefault(con, []).append((zone, surface))
+
+    return index
+
+
+def con_surfaces(con, zones="../zones", cwd=None):
+    r"""Return (zone, surface) list of surfaces using construction 'con'.
+
+    Parameters
+    ----------
+    con : str
+        Construction name.
+    zones : str | Path, optional
+        Directory of the .geo files, relative to 'cwd' (default: '../zones').
+    cwd : str | Path, optional
+        Model cfg directory (default: current working directory).
+
+    Returns
+    -------
+    List of (zone, surface) tuples, empty if 'con' is not used.
+
+    """
+
+    return con_index(zones=zones, cwd=cwd).get(con, [])
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+
+# Last changed: 18/10/2026
+# Status: development
+#
+# Module contains following functions for the job database of campaigns:
+#
+# def jobs_open(db):
+#          Open (and create) job database 'db'.
+# def jobs_add(db, variants, models=None):
+#          Add variants to the job database as pending jobs.
+# def job_state(db, variant, state, **fields):
+#          Set state (and further fields) of job 'variant'.
+# def jobs_status(db, states=None):
+#          Return jobs (status dicts) of the job database.
+# def jobs_summary(db):
+#          Return number of jobs per state.
+# def resume_campaign(db, model, sandbox_root, workers=None, cfg="cfg", pipeline=False):
+#          Run all jobs of the job database which are not done.
+# def main():
+#          Command line 'python -m esprsim' (status / resume).
+import json
+import time
+import sqlite3
+import argparse
+
+"""
+Module contains functions for a persistent job database (SQLite) of
+campaigns (see espr_campaign). With run_campaign(..., jobs=db) or
+run_pipeline(..., jobs=db), the state of
+each variant (pending, editing, simulating, extracting, archiving, done,
+failed), the hash of its inputs (see espr_cache.cache_key), timings and
+output locations are recorded. After a crash, resume_campaign() runs all variants which are
+not done, from the variant specifications stored in the database (in a
+pipeline with --pipeline).
+
+Command line usage.
+    python -m esprsim status campaign.db
+    python -m esprsim resume campaign.db <model> <sandbox_root> --workers 60
+    python -m esprsim resume campaign.db <model> <sandbox_root> --workers 56 --pipeline
+"""
+
+# States of a job, in order.
+JOB_STATES = ("pending", "editing", "simulating", "extracting", "archiving", "done",
+              "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    variant   TEXT PRIMARY KEY,
+    state     TEXT NOT NULL,
+    spec      TEXT NOT NULL,
+    inputs    TEXT,
+    model     TEXT,
+    sandbox   TEXT,
+    results   TEXT,
+    error     TEXT,
+    started   REAL,
+    finished  REAL,
+    time      REAL,
+    updated   REAL
+)
+"""
+
+
+def jobs_open(db):
+    r"""Open (and create) job database 'db'.
+
+    Parameters
+    ----------
+    db : str | Path
+        SQLite database file.
+
+    Returns
+    -------
+    sqlite3.Connection (to be closed by the caller).
+
+    """
+
+    con = sqlite3.connect(db, timeout=60)
+    con.execute("PRAGMA journal_mode=WAL")  # workers write concurrently
+    con.execute(_SCHEMA)
+
+    return con
+
+
+def jobs_add(db, variants, models=None):
+    r"""Add variants to the job database as pending jobs.
+
+    Variants already in the database keep their state, unless their
+    specification or the inputs of their base model changed: these jobs
+    are reset to pending (and run again, even if done).
+
+    Parameters
+    ----------
+    db : str | Path
+        SQLite database file.
+    variants : list of dict
+        Variant specifications (see espr_campaign), JSON serialisable.
+    models : list of str, optional
+        Hash of the base model inputs per variant (see espr_cache.cache_key),
+        not compared if None.
+
+    Returns
+    -------
+    List of variants reset to pending.
+
+    """
+
+    models = models or [None] * len(variants)
+    rows = [(v["variant"], json.dumps(v), m, time.time()) for v, m in zip(variants, models)]
+
+    con = jobs_open(db)
+    with con:
+        old = dict(((r[0], r[1:]) for r in con.execute(
+            "SELECT variant, spec, model, state FROM jobs")))
+        con.executemany(
+            "INSERT INTO jobs (variant, state, spec, model, updated) "
+            "VALUES (?, 'pending', ?, ?, ?) "
+            "ON CONFLICT(variant) DO UPDATE SET state = 'pending', spec = excluded.spec, "
+            "model = excluded.model, inputs = NULL, sandbox = NULL, results = NULL, "
+            "error = NULL, started = NULL, finished = NULL, time = NULL, "
+            "updated = excluded.updated "
+            "WHERE jobs.spec != excluded.spec "
+            "OR (excluded.model IS NOT NULL AND jobs.model IS NOT excluded.model)",
+            rows)
+    con.close()
+
+    reset = [v for v, spec, m, t in rows if v in old
+             and (old[v][0] != spec or (m is not None and old[v][1] != m))]
+    if reset:
+        print("\tJobs reset        : " + str(len(reset))
+              + " variants (specification or model changed)")
+
+    return reset
+
+
+def job_state(db, variant, state, **fields):
+    r"""Set state (and further fields) of job 'variant'.
+
+    Parameters
+    ----------
+    db : str | Path
+        SQLite database file.
+    variant : str
+        Simulation variant name.
+    state : str
+        New state, one of JOB_STATES.
+    **fields
+        Further columns: inputs, sandbox, results (list), error, started,
+        finished, time.
+
+    """
+
+    if state not in JOB_STATES:
+        raise ValueError("Unknown job state '" + state + "'.")
+    if "results" in fields:
+        fields["results"] = json.dumps(fields["results"])
+
+    names = ["state", "updated"] + list(fields)
+    values = [state, time.time()] + list(fields.values())
+
+    con = jobs_open(db)
+    with con:
+        con.execute("UPDATE jobs SET " + ", ".join(n + " = ?" for n in names)
+                    + " WHERE variant = ?", values + [variant])
+    con.close()
+
+
+def jobs_status(db, states=None):
+    r"""Return jobs (status dicts) of the job database.
+
+    Parameters
+    ----------
+    db : str | Path
+        SQLite database file.
+    states : list of str, optional
+        Return jobs in these states only (default: all).
+
+    Returns
+    -------
+    List of dicts with keys 'variant', 'status' (state), 'spec', 'inputs',
+    'sandbox', 'results', 'error', 'time' (as run_variant, plus the job
+    columns).
+
+    """
+
+    con = jobs_open(db)
+    con.row_factory = sqlite3.Row
+    rows = con.execute("SELECT * FROM jobs ORDER BY rowid").fetchall()
+    con.close()
+
+    jobs = []
+    for r in rows:
+        if states is not None and r["state"] not in states:
+            continue
+        job = dict(r)
+        job["status"] = job.pop("state")
+        job["spec"] = json.loads(job["spec"])
+        job["results"] = json.loads(job["results"]) if job["results"] else []
+        jobs.append(job)
+
+    return jobs
+
+
+def jobs_summary(db):
+    r"""Return number of jobs per state.
+
+    Parameters
+    ----------
+    db : str | Path
+        SQLite database file.
+
+    Returns
+    -------
+    Dict {state: number of jobs} for all JOB_STATES.
+
+    """
+
+    con = jobs_open(db)
+    counts = dict(con.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"))
+    con.close()
+
+    return {s: counts.get(s, 0) for s in JOB_STATES}
+
+
+def resume_campaign(db, model, sandbox_root, workers=None, cfg="cfg", pipeline=False):
+    r"""Run all jobs of the job database which are not done.
+
+    Jobs interrupted in any state (or failed) are run again from scratch,
+    in a new sandbox.
+
+    Parameters
+    ----------
+    db : str | Path
+        SQLite database file.
+    model : str | Path
+        Root directory of the ESP-r base model.
+    sandbox_root : str | Path
+        Directory in which the variant sandboxes are created.
+    workers : int, optional
+        Number of worker processes (default: number of CPUs).
+    cfg : str, optional
+        Name of the cfg directory of the model (default: 'cfg').
+    pipeline : bool, optional
+        If True, run the jobs with run_pipeline() (stage workers derived
+        from 'workers'), else with run_campaign() (default).
+
+    Returns
+    -------
+    List of status dicts of all jobs (see run_campaign).
+
+    """
+
+    from .espr_campaign import run_campaign, run_pipeline
+
+    specs = [job["spec"] for job in jobs_status(db)]
+    run = run_pipeline if pipeline is True else run_campaign
+
+    return run(specs, model, sandbox_root, workers=workers, cfg=cfg, jobs=db)
+
+
+def main():
+    r"""Command line 'python -m esprsim' (status / resume of job database)."""
+
+    parser = argparse.ArgumentParser(prog="python -m esprsim",
+                                     description="Job database of esprsim campaigns.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("status", help="show number of jobs per state")
+    p.add_argument("db")
+    p.add_argument("--failed", action="store_true", help="list failed jobs")
+
+    p = sub.add_parser("resume", help="run all jobs which are not done")
+    p.add_argument("db")
+    p.add_argument("model", help="root directory of the ESP-r base model")
+    p.add_argument("sandbox_root", help="directory for the variant sandboxes")
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--cfg", default="cfg")
+    p.add_argument("--pipeline", action="store_true",
+                   help="run edit, bps, res and archive stages in a pipeline")
+
+    args = parser.parse_args()
+
+    if args.command == "status":
+        for state, n in jobs_summary(args.db).items():
+            print("\t" + state.ljust(18) + ": " + str(n))
+        if args.failed:
+            for job in jobs_status(args.db, states=["failed"]):
+                print("\t" + job["variant"] + ": " + str(job["error"]))
+    else:
+        resume_campaign(args.db, args.model, args.sandbox_root, workers=args.workers,
+                        cfg=args.cfg, pipeline=args.pipeline)
@@ -6,26 +6,39 @@
 # Module contains following model specific / dependant functions for ESP-r:
 #
 #  27: def set_corecon(config, cnn_file, old_coreclass, old_corecon, new_coreclass, new_corecon):
-#            Switch ...
+#            Switch ... (answering prj's prompts, see espr_run.run_dialog)
 #  96: def set_htc(config, cnn_file, set_unset):
 #            Set / unset? convection coefficients file.
 # 156: def set_lam_w6CFC(config, mat_class, mat_entry, lam):
 #            Set thermal conductivity for specific material in materials
-#            database for model w/ 6 zones featuring CFC(!).
+#            database for model w/ 6 zones featuring CFC(!), answering the
+#            CFC prompts of any model (see espr_run.run_dialog).
 # 210: def set_lam(config, matclass, material, lam):
 #            Set thermal conductivity for materials in model w/o CFC
 #            constructions(!).
 # 261: def set_abs_o(config, matclass, material, abs):
 #            Set outside solar absorption for materials in model w/o CFC
 #            constructions(!).
-    from subprocess import run
+#
+# All functions take an optional keyword 'cwd' (the model's cfg directory)
+# and default to the current working directory if it is not given. Each has a
+# companion <function>_script() returning arguments, commands and scratch file
+# name for run_espr() (see espr_run, espr_async).
+from .espr_run import run_espr, run_dialog, in_session
+from .espr_sim import APPLY_CON_PROMPT, MENU_PROMPT
 
 """
 Module contains model specific functions using ESP-r project manager
 in text mode.
 """
 
-def set_corecon(config, cnn_file, old_coreclass, old_corecon, new_coreclass, new_corecon):
+# Prompt of prj to continue after (re)building a CFC file: a line naming
+# the .cfc file followed by the 'continue' choice, prj waiting for the answer
+# (regex, status output mentioning .cfc files does not match).
+CFC_PROMPT = r"(?im)^[^\n]*\b\w+\.cfc\b[^\n]*(\n[^\n]*){0,3}?\bcontinue\b[^\n]*(\n[^\n?]*)?\Z"
+
+def set_corecon(config, cnn_file, old_coreclass, old_corecon, new_coreclass, new_corecon,
+                cwd=None):
     r"""Function to change construction globally for "movable" rooms.
 
     Parameters
@@ -42,6 +55,8 @@ def set_corecon(config, cnn_file, old_coreclass, old_corecon, new_coreclass, new
         New construction category.
     new_corecon : str
         New construction name.
+    cwd : str | Path, optional
+        Model cfg directory to run in (default: current working directory).
 
     """
 
@@ -55,6 +70,97 @@ def set_corecon(config, cnn_file, old_coreclass, old_corecon, new_coreclass, new
     print("search for " + old_coreclass + " / " + old_corecon)
     print("replace it by " + new_coreclass + " / " + new_corecon)
 
+    dialog = set_corecon_dialog(config, cnn_file, old_coreclass, old_corecon,
+                                new_coreclass, new_corecon)
+
+    if in_session(dialog[0], cwd) is None:
+        # Run prj, answer its prompts, write scratch file.
+        run_dialog(*dialog, cwd=cwd)
+    else:
+        # Collected by prj_session(), answers of the 6 zone model.
+        run_espr(*set_corecon_script(config, cnn_file, old_coreclass, old_corecon,
+                                     new_coreclass, new_corecon), cwd=cwd)
+
+
+def set_corecon_dialog(config, cnn_file, old_coreclass, old_corecon, new_coreclass,
+                       new_corecon):
+    r"""Return prj arguments, dialog and scratch file name for set_corecon().
+
+    The confirmations per zone and CFC file are answered as prj asks for
+    them, i.e. the dialog does not depend on the model.
+
+    Parameters
+    ----------
+    config : str
+        Configuration file name without extension.
+    cnn_file : str
+        Connections file name without extension.
+    old_core_class : int
+        Old construction category.
+    old_corecon : str
+        Old construction name.
+    new_coreclass : int
+        New construction category.
+    new_corecon : str
+        New construction name.
+
+    Returns
+    -------
+    Tuple (args, steps, scratch) to be passed to run_dialog().
+
+    """
+
+    args, _, scratch = set_corecon_script(config, cnn_file, old_coreclass, old_corecon,
+                                          new_coreclass, new_corecon)
+
+    steps = [(None, "m\n"  # browse/ edit/ simulate
+                    "c\n"  # composition
+                    "*\n"  # global tasks
+                    "f\n"  # search & replace
+                    "c\n"  # continue
+                    + old_coreclass + "\n"  # old construction category
+                    + old_corecon + "\n"  # old construction name
+                    + new_coreclass + "\n"  # new construction category
+                    + new_corecon + "\n"  # new construction name
+                    "*\n"  # search zones (* all zones)
+                    "-\n"),  # exit this menu
+             ({APPLY_CON_PROMPT: "Y\n",  # apply construction to <zone>? [Y/N]
+               CFC_PROMPT: "b\n"},  # continue (<zone>.cfc)
+              MENU_PROMPT),  # ... until back in the search & replace menu
+             (None, "-\n"  # exit this menu
+                    "!\n"  # save model
+                    + config + ".cfg\n"  # Update system configuration file?
+                    + cnn_file + ".cnn\n"  # Surface connections file name?
+                    "-\n"  # exit this menu
+                    "-\n")]  # exit Project Manager
+
+    return args, steps, scratch
+
+
+def set_corecon_script(config, cnn_file, old_coreclass, old_corecon, new_coreclass, new_corecon):
+    r"""Return prj arguments, commands and scratch file name for set_corecon().
+
+    Parameters
+    ----------
+    config : str
+        Configuration file name without extension.
+    cnn_file : str
+        Connections file name without extension.
+    old_core_class : int
+        Old construction category.
+    old_corecon : str
+        Old construction name.
+    new_coreclass : int
+        New construction category.
+    new_corecon : str
+        New construction name.
+
+    Returns
+    -------
+    Tuple (args, cmd, scratch) to be passed to run_espr().
+
+    """
+
     # Changing construction
     args = [
             "prj",
@@ -96,12 +202,10 @@ def set_corecon(config, cnn_file, old_coreclass, old_corecon, new_coreclass, new
                 "-\n",  # exit Project Manager
                 encoding="utf-8")
 
-    f = open(config + "_set_corecon_" + new_corecon + ".scratch", "w")  # creates scratch file
-
-    run(args, input=cmd, stdout=f)  # runs prj (args), executes commands (cmd), writes scratch file (f)
+    return args, cmd, config + "_set_corecon_" + new_corecon + ".scratch"
 
 
-def set_htc(config, cnn_file, set_unset):
+def set_htc(config, cnn_file, set_unset, cwd=None):
     r"""Function to set heat transfer coefficients.
 
     Parameters
@@ -113,6 +217,8 @@ def set_htc(config, cnn_file, set_unset):
     set_unset : str
         Zone convection file selection key (must be last part of to-be-switched zone
         convection file name).
+    cwd : str | Path, optional
+        Model cfg directory to run in (default: current working directory).
 
     """
 
@@ -124,6 +230,29 @@ def set_htc(config, cnn_file, set_unset):
     print("\nin " + config + ".cfg\n"
           "setting heat transfer coefficients")
 
+    # Run prj, execute commands, write scratch file.
+    run_espr(*set_htc_script(config, cnn_file, set_unset), cwd=cwd)
+
+
+def set_htc_script(config, cnn_file, set_unset):
+    r"""Return prj arguments, commands and scratch file name for set_htc().
+
+    Parameters
+    ----------
+    config : str
+        Configuration file name without extension.
+    cnn_file : str
+        Connections file name without extension.
+    set_unset : str
+        Zone convection file selection key (must be last part of to-be-switched zone
+        convection file name).
+
+    Returns
+    -------
+    Tuple (args, cmd, scratch) to be passed to run_espr().
+
+    """
+
     # Setting htc-files
     args = [
         "prj",
@@ -160,14 +289,13 @@ def set_htc(config, cnn_file, set_unset):
                 + config + ".cfg\n"  # update system configuration file?
                 + cnn_file + ".cnn\n"  # surface connections file name? 
                 "-\n"  # exit this menu
-                "-\n-",  # exit Project Manager
+                "-\n",  # exit Project Manager
                 encoding="utf-8")
 
-    f = open(config + "_set_htc.scratch", "w")  # creates scratch file
+    return args, cmd, config + "_set_htc.scratch"
 
-    run(args, input=cmd, stdout=f)  # runs prj (args), executes commands (cmd), writes scratch file (f)
 
-def set_lam_w6CFC(config, mat_class, mat_entry, lam):
+def set_lam_w6CFC(config, mat_class, mat_entry, lam, cwd=None):
     r"""Set thermal conductivity for specific material in materials database - for model
     w/ six (6) zones featuring CFC constructions(!).
 
@@ -181,12 +309,92 @@ def set_lam_w6CFC(config, mat_class, mat_entry, lam):
         Database entry letter for material of interest.
     lam : str
         Thermal conductivity value to be used in W/(m K) as string.
+    cwd : str | Path, optional
+        Model cfg directory to run in (default: current working directory).
 
     """
 
     print("   Setting new conductivity in materials database of" + config + ":")
-    print("      New value for material class" + mat_class +
-          ", material index ", + mat_entry + " is " + lam + " W/(m K).")
+    print("      New value for material class " + mat_class +
+          ", material index " + mat_entry + " is " + lam + " W/(m K).")
+
+    dialog = set_lam_w6CFC_dialog(config, mat_class, mat_entry, lam)
+
+    if in_session(dialog[0], cwd) is None:
+        # Run prj, answer its prompts, write scratch file.
+        run_dialog(*dialog, cwd=cwd)
+    else:
+        # Collected by prj_session(), answers of the 6 zone model.
+        run_espr(*set_lam_w6CFC_script(config, mat_class, mat_entry, lam), cwd=cwd)
+
+
+def set_lam_w6CFC_dialog(config, mat_class, mat_entry, lam):
+    r"""Return prj arguments, dialog and scratch file name for set_lam_w6CFC().
+
+    The CFC files rebuilt by prj are confirmed as prj asks for them, i.e.
+    the dialog does not depend on the number of CFC zones.
+
+    Parameters
+    ----------
+    config : str | Path
+        Configuration file name (with relative path!).
+    mat_class : str
+        Database materials class of interest.
+    mat_entry : str
+        Database entry letter for material of interest.
+    lam : str
+        Thermal conductivity value to be used in W/(m K) as string.
+
+    Returns
+    -------
+    Tuple (args, steps, scratch) to be passed to run_dialog().
+
+    """
+
+    args, _, scratch = set_lam_w6CFC_script(config, mat_class, mat_entry, lam)
+
+    steps = [(None, "b\n"  # database maintenance
+                    "c\n"  # materials db
+                    "a\n"  # browse / edit
+                    + mat_class + "\n"
+                    + mat_entry + "\n"
+                    "c\n"  # conductivity (W/(m K))
+                    + lam + "\n"
+                    "-\n"  # exit material details
+                    "Y\n"  # accept changes
+                    "!\n"  # save materials file
+                    "Y\n"  # overwrite file
+                    "-\n"  # exit material class
+                    "-\n"  # exit materials classes
+                    "-\n"  # exit database maintenance
+                    "Y\n"  # update model NAME LIST
+                    "Y\n"),  # rebuild .con files
+             ({CFC_PROMPT: "b\n"},  # <zone>.cfc => continue
+              MENU_PROMPT),  # ... until back in the main menu
+             (None, "-\n")]  # exit prj
+
+    return args, steps, scratch
+
+
+def set_lam_w6CFC_script(config, mat_class, mat_entry, lam):
+    r"""Return prj arguments, commands and scratch file name for set_lam_w6CFC().
+
+    Parameters
+    ----------
+    config : str | Path
+        Configuration file name (with relative path!).
+    mat_class : str
+        Database materials class of interest.
+    mat_entry : str
+        Database entry letter for material of interest.
+    lam : str
+        Thermal conductivity value to be used in W/(m K) as string.
+
+    Returns
+    -------
+    Tuple (args, cmd, scratch) to be passed to run_espr().
+
+    """
 
     # Setting lam for mat
     args = [
@@ -222,11 +430,10 @@ def set_lam_w6CFC(config, mat_class, mat_entry, lam):
 
     #<< TODO: make model-independant ... scan for CFC? >>
 
-    f = open(config + "_set_" + mat_class + "_" + mat_entry + "_" + lam + "_con.scratch", "w")  # creates scratch file
+    return args, cmd, config + "_set_" + mat_class + "_" + mat_entry + "_" + lam + "_con.scratch"
 
-    run(args, input=cmd, stdout=f)  # runs prj (args), executes commands (cmd), writes scratch file (f)
 
-def set_lam(config, matclass, material, lam):
+def set_lam(config, matclass, material, lam, cwd=None):
     """Set thermal conductivity for materials in model w/o CFC constructions(!).
 
     Parameters
@@ -239,6 +446,8 @@ def set_lam(config, matclass, material, lam):
         Material selection letter in materials database.
     lam : str
         Thermal conductivity value in (W/(m K)) as string.
+    cwd : str | Path, optional
+        Model cfg directory to run in (default: current working directory).
 
     """
 
@@ -257,6 +466,30 @@ def set_lam(config, matclass, material, lam):
     # nf = run(cmd, shell=True, cwd=wd, capture_output=True).stdout.strip()
     # nf = nf.decode('utf-8')
 
+    # Run prj (args), execute commands (cmd), write scratch file
+    run_espr(*set_lam_script(config, matclass, material, lam), cwd=cwd)
+
+
+def set_lam_script(config, matclass, material, lam):
+    r"""Return prj arguments, commands and scratch file name for set_lam().
+
+    Parameters
+    ----------
+    config : str | Path
+        Configuration file name (with relative path).
+    matclass : str
+        Material class in materials database.
+    material : str
+        Material selection letter in materials database.
+    lam : str
+        Thermal conductivity value in (W/(m K)) as string.
+
+    Returns
+    -------
+    Tuple (args, cmd, scratch) to be passed to run_espr().
+
+    """
+
     # Setting lam for mat
     args = [
             "prj",
@@ -302,15 +535,10 @@ def set_lam(config, matclass, material, lam):
     #
     # cmd = cmd.encode('utf-8')
 
-    # Create scratch file.
-    f = open(config + "_set_" + matclass + "_" + material + "_" \
-                                             + lam + "_lam.scratch", "w")
+    return args, cmd, config + "_set_" + matclass + "_" + material + "_" + lam + "_lam.scratch"
 
-    # Run prj (args), execute commands (cmd), write scratch file (f)
-    run(args, input=cmd, stdout=f)
 
-
-def set_abs_o(config, matclass, material, abs):
+def set_abs_o(config, matclass, material, abs, cwd=None):
     """Set outside solar absorption for materials in model w/o CFC constructions(!).
 
     Parameters
@@ -323,6 +551,8 @@ def set_abs_o(config, matclass, material, abs):
         Material key in materials database.
     abs : str
         Solar absorption outside value (-) as string.
+    cwd : str | Path, optional
+        Model cfg directory to run in (default: current working directory).
 
     """
 
@@ -331,6 +561,30 @@ def set_abs_o(config, matclass, material, abs):
     print("\t\tNew value for material class" + matclass + ", material index " \
                                  + material + " is " + abs + " (-).")
 
+    # Run prj (args), execute commands (cmd), write scratch file
+    run_espr(*set_abs_o_script(config, matclass, material, abs), cwd=cwd)
+
+
+def set_abs_o_script(config, matclass, material, abs):
+    r"""Return prj arguments, commands and scratch file name for set_abs_o().
+
+    Parameters
+    ----------
+    config : str | Path
+        Configuration file name (with relative path).
+    matclass : str
+        Material class key in materials database.
+    material : str
+        Material key in materials database.
+    abs : str
+        Solar absorption outside value (-) as string.
+
+    Returns
+    -------
+    Tuple (args, cmd, scratch) to be passed to run_espr().
+
+    """
+
     # Setting lam for mat
     args = [
             "prj",
@@ -357,10 +611,4 @@ def set_abs_o(config, matclass, material, abs):
                 "-\n", # quite module
                 encoding="utf-8")
 
-    # Create scratch file.
-    f = open(config + "_set_" + matclass + "_" + material + "_" \
-                                             + abs + "_abs-o.scratch", "w")
-
-    # Run prj (args), execute commands (cmd), write scratch file (f)
-    run(args, input=cmd, stdout=f)
-
+    return args, cmd, config + "_set_" + matclass + "_" + material + "_" + abs + "_abs-o.scratch"
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+# Last changed: 18/10/2026
+# Status: development
+#
+# Module contains following functions for plotting:
+#
+# def set_plot_defaults():
+#          Import matplotlib.pyplot and set esprsim plot defaults.
+
+"""
+Module contains the plotting entry point of esprsim. matplotlib is imported
+(and its defaults are set) on the first call of set_plot_defaults(), not on
+import of esprsim.
+
+Example usage.
+    plt = set_plot_defaults()
+    df.plot()
+"""
+
+
+def set_plot_defaults():
+    r"""Import matplotlib.pyplot and set esprsim plot defaults.
+
+    Returns
+    -------
+    The matplotlib.pyplot module.
+
+    """
+
+    import matplotlib.pyplot as plt
+
+    # setup some default values for matplotlib
+    # described here https://matplotlib.org/stable/tutorials/introductory/customizing.html
+    plt.rcParams["figure.figsize"] = (12, 6)
+    plt.rcParams["figure.dpi"] = 300
+    # do not set a font that might not exist, use default
+    #plt.rcParams["font.family"] = "Inconsolata"
+    #plt.rcParams["font.weight"] = "light"
+    #plt.rcParams["font.size"] = 14
+    plt.rcParams["figure.autolayout"] = True
+    plt.rcParams["axes.grid"] = True
+    plt.rcParams["axes.labelpad"] = 20
+    plt.rcParams["axes.titlepad"] = 30
+    plt.rcParams["axes.labelweight"] = "light"
+    plt.rcParams["axes.labelsize"] = 'medium'
+    plt.rcParams["legend.frameon"] = True
+    plt.rcParams["legend.facecolor"] = "white"
+    plt.rcParams["legend.edgecolor"] = "white"
+    plt.rcParams["axes.axisbelow"] = True
+    plt.rcParams["lines.markersize"] = 4
+
+    # Define your own color map or use a named one,
+    # see https://matplotlib.org/stable/tutorials/colors/colormaps.html
+    # plt.rcParams["axes.prop_cycle"] = plt.cycler('color', ['#5d8aa8', '#e32636', '#ffbf00', '#87a96b'])
+    # plt.rcParams["axes.prop_cycle"] = plt.cycler("color", plt.cm.Set1.colors)
+
+    return plt
@@ -3,25 +3,59 @@
 # Last changed: 07/11/2022
 # Status: development
 #
-# Module contains following functions calling res for ESP-r:
+# Module contains following functions calling res for ESP-r (each with a
+# companion <function>_script() returning arguments, commands and scratch file
+# name for run_espr()):
 #
 # 17:  def res_supplied_energy(resfile):
 #          """ Extract summary of energy delivered.
 #
 # 55:  def res_PMV(resfile, zone, PMVdat):
 #          """Function extracts PMV data from simulation results.
-from subprocess import run
+#
+# def res_zone_metrics(resfile, zone, metrics=("db", "mrt", "rh"), cwd=None):
+#          Extract time series of zone temperatures and humidity.
+#
+# def res_batch(resfile, requests, cwd=None):
+#          Run several extractions in one res session.
+#
+# Comfort evaluation of extracted time series (no res process):
+#
+# def pmv_ppd(ta, tr, veloc, rh, met, clo, wme=0.0):
+#          PMV and PPD according to ISO 7730 (vectorised).
+# def pmv_grid(ta, tr, rh, clo, met, veloc, occupied=None):
+#          PMV and PPD for all combinations of clo, met and veloc.
+#
+# Functions reading records of .res result libraries with a known layout
+# (no res process, the library header is not decoded):
+#
+# def res_records(resfile, width, dtype="<f4", header=0, cwd=None):
+#          Memory-map .res file as array of fixed width records.
+# def res_series(records, start, step, column, count=None):
+#          Return time series of one record column (lazy view).
+# def res_variables(resfile, layout, cwd=None):
+#          Return zone variables of .res file as lazy arrays.
+import os
+
+from .espr_run import in_dir, run_espr, join_scripts
 
 """
-Module contains functions for ESP-r res module text mode scripts.
+Module contains functions for ESP-r res module text mode scripts, and
+functions reading the records of .res result libraries via memory mapping.
+The latter do not decode the library header (zones, time steps, record
+length, period), the record layout has to be supplied by the caller. They
+are a fast path for repeated reads of libraries with a known layout, not a
+replacement of res extractions.
 """
-def res_supplied_energy(resfile):
+def res_supplied_energy(resfile, cwd=None):
     r"""Extract summary of energy delivered.
 
     Parameters
     ----------
     resfile : str | Path
         results file name (with relative path w/o extension)
+    cwd : str | Path, optional
+        Directory to run res in (default: current working directory).
 
     """
 
@@ -30,6 +64,26 @@ def res_supplied_energy(resfile):
     print("\twriting to")
     print("\t\t" + resfile + "_en-deliv.dat ...", end='')
     
+    # Run res, execute commands, write scratch file.
+    run_espr(*res_supplied_energy_script(resfile), cwd=cwd)
+
+    print(" done.")
+
+
+def res_supplied_energy_script(resfile):
+    r"""Return res arguments, commands and scratch file name for res_supplied_energy().
+
+    Parameters
+    ----------
+    resfile : str | Path
+        results file name (with relative path w/o extension)
+
+    Returns
+    -------
+    Tuple (args, cmd, scratch) to be passed to run_espr().
+
+    """
+
     args = [
             "res",
             "-file", resfile + ".res", # executable file
@@ -48,14 +102,10 @@ def res_supplied_energy(resfile):
                 "-\n", # exit res
                 encoding="utf-8")
 
-    f = open(resfile + "en-deliv_res.scratch", "w")  # creates scratch file
+    return args, cmd, resfile + "en-deliv_res.scratch"
 
-    run(args, input=cmd, stdout=f)  # runs prj (args), executes commands (cmd), writes scratch file (f)
 
-    print(" done.")
-
-
-def res_PMV(resfile, zone, clo, met, veloc):
+def res_PMV(resfile, zone, clo, met, veloc, cwd=None):
     r"""Extract PMV data from simulation results.
 
     Parameters
@@ -70,6 +120,8 @@ def res_PMV(resfile, zone, clo, met, veloc):
         Value of metabolic rate for PMV calculation ($4).
     veloc : float
         Value of relative air velocity for PMV calculation ($5).
+    cwd : str | Path, optional
+        Directory to run res in (default: current working directory).
 
     Notes
     -----
@@ -84,6 +136,36 @@ def res_PMV(resfile, zone, clo, met, veloc):
     print("\tWriting PMV for zone " + zone + " to")
     print("\t\t" + thefile + " ...", end='')
 
+    # Run res, execute commands, write scratch file.
+    run_espr(*res_PMV_script(resfile, zone, clo, met, veloc), cwd=cwd)
+
+    print(" done.")
+
+
+def res_PMV_script(resfile, zone, clo, met, veloc):
+    r"""Return res arguments, commands and scratch file name for res_PMV().
+
+    Parameters
+    ----------
+    resfile : str | Path
+        results file name (with relative path w/o extension) ($1).
+    zone : str
+        Zone name for which evaluation is desired ($2).
+    clo : float
+        Value of clothing level for PMV calculation ($3).
+    met : float
+        Value of metabolic rate for PMV calculation ($4).
+    veloc : float
+        Value of relative air velocity for PMV calculation ($5).
+
+    Returns
+    -------
+    Tuple (args, cmd, scratch) to be passed to run_espr().
+
+    """
+
+    thefile = resfile + "_" + zone + "_PMV_" + clo + "_" + met + "_" + veloc + ".dat"
+
     args = [
             "res",
             "-file", resfile + ".res", # executable file
@@ -119,9 +201,470 @@ def res_PMV(resfile, zone, clo, met, veloc):
                 "-\n", # Quit res analysis
                 encoding="utf-8")
 
-    f = open(thefile + "_res.scratch", "w")  # creates scratch file
+    return args, cmd, thefile + "_res.scratch"
+
+
+# Menu keys (performance metrics menu of time step reports, then sub-menu if
+# any) of the time series extracted by res_zone_metrics(), by name.
+RES_ZONE_METRICS = {
+    "db": ("b", "a"),         # Temperatures: zone db T
+    "resultant": ("b", "e"),  # Temperatures: zone resultant T
+    "mrt": ("b", "f"),        # Temperatures: mean radiant T (area weighted)
+    "rh": ("h",),             # Zone RH
+}
+
+
+def res_zone_metrics(resfile, zone, metrics=("db", "mrt", "rh"), cwd=None):
+    r"""Extract time series of zone temperatures and humidity.
+
+    Parameters
+    ----------
+    resfile : str | Path
+        results file name (with relative path w/o extension)
+    zone : str
+        Zone name for which evaluation is desired.
+    metrics : tuple of str, optional
+        Time series to extract, keys of RES_ZONE_METRICS, in column order
+        (default: air temperature, mean radiant temperature and relative
+        humidity, i.e. the inputs of pmv_grid()).
+    cwd : str | Path, optional
+        Directory to run res in (default: current working directory).
+
+    Notes
+    -----
+    Example usage (PMV of several comfort settings without further res runs).
+        res_zone_metrics("var01", "Wohnen", cwd=wd)
+        df = read_dat("var01_Wohnen_db_mrt_rh.dat", cwd=wd)
+        pmv, ppd = pmv_grid(df.iloc[:, 0], df.iloc[:, 1], df.iloc[:, 2],
+                            [0.5, 1.0], [1.0, 1.2], [0.1, 0.2])
+
+    """
+
+    thefile = resfile + "_" + zone + "_" + "_".join(metrics) + ".dat"
+
+    print("	Writing " + ", ".join(metrics) + " for zone " + zone + " to")
+    print("		" + thefile + " ...", end='')
+
+    # Run res, execute commands, write scratch file.
+    run_espr(*res_zone_metrics_script(resfile, zone, metrics), cwd=cwd)
+
+    print(" done.")
+
+
+def res_zone_metrics_script(resfile, zone, metrics=("db", "mrt", "rh")):
+    r"""Return res arguments, commands and scratch file name for res_zone_metrics().
+
+    Parameters
+    ----------
+    resfile : str | Path
+        results file name (with relative path w/o extension)
+    zone : str
+        Zone name for which evaluation is desired.
+    metrics : tuple of str, optional
+        Time series to extract, keys of RES_ZONE_METRICS.
+
+    Returns
+    -------
+    Tuple (args, cmd, scratch) to be passed to run_espr().
+
+    """
+
+    unknown = [m for m in metrics if m not in RES_ZONE_METRICS]
+    if not metrics:
+        raise ValueError("No zone metric to extract.")
+    if unknown:
+        raise ValueError("Unknown zone metric(s) " + ", ".join(unknown) + ", use "
+                         + ", ".join(RES_ZONE_METRICS) + ".")
+
+    thefile = resfile + "_" + zone + "_" + "_".join(metrics) + ".dat"
+
+    args = [
+            "res",
+            "-file", resfile + ".res", # executable file
+            "-mode", "text",           # opens file in mode text
+            ]
+
+    select = ""
+    for m in metrics:
+        keys = RES_ZONE_METRICS[m]
+        select += "".join(k + "\n" for k in keys)  # metric (in sub-menu)
+        if len(keys) > 1:
+            select += "-\n"  # exit sub-menu
+
+    cmd = bytes("\n"   # confirm res file
+                "c\n"  # Timestep reports
+                "4\n"  # Select zones
+                + zone + "\n"
+                "-\n"  # exit zone select menu
+                ">\n"  # switch output to file
+                + thefile + "\n"
+                "File:" + thefile + "\n"  # title for 3rd party graphic
+                "^\n"  # change delimiter
+                "e\n"  # e comma, c tabulator
+                "g\n"  # performance metrics
+                + select +
+                "*\n"  # toggle time format
+                "a\n"  # no mark between days
+                "!\n"  # list data
+                ">\n"  # switch display to screen ("flush")
+                "-\n"  # exit perf metrics
+                "-\n"  # exit tab output
+                "-\n", # Quit res analysis
+                encoding="utf-8")
+
+    return args, cmd, thefile + "_res.scratch"
+
 
-    run(args, input=cmd, stdout=f)  # runs prj (args), executes commands (cmd), writes scratch file (f)
+def res_batch(resfile, requests, cwd=None):
+    r"""Run several extractions in one res session.
+
+    The results library is loaded once, the extractions write the same
+    files as the respective single functions (see res_batch_script()).
+
+    Parameters
+    ----------
+    resfile : str | Path
+        results file name (with relative path w/o extension)
+    requests : list of tuple
+        Extractions as (name, args), 'name' being a key of RES_REQUESTS and
+        'args' the arguments of the respective function following 'resfile'.
+    cwd : str | Path, optional
+        Directory to run res in (default: current working directory).
+
+    Notes
+    -----
+    Example usage (PMV for all zones and comfort settings, air temperature,
+    mean radiant temperature and humidity of all zones, energy delivered).
+        requests = [("PMV", (z, PMV[var]["clo"], PMV[var]["met"], PMV[var]["veloc"]))
+                    for z in zones for var in var_list]
+        requests += [("zone_metrics", (z,)) for z in zones]
+        requests.append(("supplied_energy", ()))
+        res_batch("var01", requests, cwd=wd)
+
+    """
+
+    print("\n\tExtracting " + str(len(requests)) + " reports from")
+    print("\t\t" + resfile + ".res ...", end='')
+
+    # Run res, execute commands, write scratch file.
+    run_espr(*res_batch_script(resfile, requests), cwd=cwd)
 
     print(" done.")
 
+
+def res_batch_script(resfile, requests):
+    r"""Return res arguments, commands and scratch file name for res_batch().
+
+    Parameters
+    ----------
+    resfile : str | Path
+        results file name (with relative path w/o extension)
+    requests : list of tuple
+        Extractions as (name, args), see res_batch().
+
+    Returns
+    -------
+    Tuple (args, cmd, scratch) to be passed to run_espr().
+
+    Notes
+    -----
+    Each script starts in the res main menu and returns to it before its
+    final quit command, which join_scripts() drops from all but the last
+    script: res_PMV_script() and res_zone_metrics_script() leave the
+    performance metrics and the time step reports menus,
+    res_supplied_energy_script() the enquiry menu. The res file is confirmed on start-up only, the confirmation
+    (leading empty line) is therefore kept for the first script only.
+
+    """
+
+    cmds = []
+    for name, req_args in requests:
+        if name not in RES_REQUESTS:
+            raise ValueError("Unknown res request '" + name + "'.")
+        args, cmd, scratch = RES_REQUESTS[name](resfile, *req_args)
+        if cmds:
+            cmd = cmd.lstrip(b"\n")  # res file is confirmed once, on start-up
+        cmds.append(cmd)
+
+    # Each script returns to the res main menu before quitting res.
+    return args, join_scripts(cmds), resfile + "_batch_res.scratch"
+
+
+# Extractions available for res_batch(), by name.
+RES_REQUESTS = {
+    "supplied_energy": res_supplied_energy_script,
+    "PMV": res_PMV_script,
+    "zone_metrics": res_zone_metrics_script,
+}
+
+
+def pmv_ppd(ta, tr, veloc, rh, met, clo, wme=0.0):
+    r"""PMV and PPD according to ISO 7730 (vectorised).
+
+    All arguments may be scalars or arrays, they are broadcast against each
+    other.
+
+    Parameters
+    ----------
+    ta : float | array
+        Air temperature (degC).
+    tr : float | array
+        Mean radiant temperature (degC).
+    veloc : float | array
+        Relative air velocity (m/s).
+    rh : float | array
+        Relative humidity (%).
+    met : float | array
+        Metabolic rate (met).
+    clo : float | array
+        Clothing insulation (clo).
+    wme : float | array, optional
+        External work (met, default: 0).
+
+    Returns
+    -------
+    Tuple (PMV, PPD) of arrays, PPD in %.
+
+    Notes
+    -----
+    Algorithm of ISO 7730:2005, Annex D. The clothing surface temperature
+    is iterated for all elements at once until all have converged.
+
+    """
+
+    import numpy as np
+
+    ta, tr, veloc, rh, met, clo, wme = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (ta, tr, veloc, rh, met, clo, wme)))
+
+    pa = rh * 10.0 * np.exp(16.6536 - 4030.183 / (ta + 235.0))  # water vapour pressure (Pa)
+    icl = 0.155 * clo  # clothing insulation (m2K/W)
+    m = met * 58.15  # metabolic rate (W/m2)
+    mw = m - wme * 58.15  # internal heat production (W/m2)
+    fcl = np.where(icl <= 0.078, 1.0 + 1.29 * icl, 1.05 + 0.645 * icl)
+    hcf = 12.1 * np.sqrt(veloc)  # forced convection
+    taa = ta + 273.0
+    tra = tr + 273.0
+
+    # Clothing surface temperature (iteration).
+    tcla = taa + (35.5 - ta) / (3.5 * icl + 0.1)
+    p1 = icl * fcl
+    p2 = p1 * 3.96
+    p3 = p1 * 100.0
+    p4 = p1 * taa
+    p5 = 308.7 - 0.028 * mw + p2 * (tra / 100.0) ** 4
+    xn = tcla / 100.0
+    xf = tcla / 50.0
+    for i in range(150):
+        if np.all(np.abs(xn - xf) <= 0.00015):
+            break
+        xf = (xf + xn) / 2.0
+        hc = np.maximum(hcf, 2.38 * np.abs(100.0 * xf - taa) ** 0.25)
+        xn = (p5 + p4 * hc - p2 * xf ** 4) / (100.0 + p3 * hc)
+    tcl = 100.0 * xn - 273.0
+
+    # Heat losses (W/m2).
+    hl1 = 3.05e-3 * (5733.0 - 6.99 * mw - pa)  # skin diffusion
+    hl2 = np.where(mw > 58.15, 0.42 * (mw - 58.15), 0.0)  # sweating
+    hl3 = 1.7e-5 * m * (5867.0 - pa)  # latent respiration
+    hl4 = 0.0014 * m * (34.0 - ta)  # dry respiration
+    hl5 = 3.96 * fcl * (xn ** 4 - (tra / 100.0) ** 4)  # radiation
+    hl6 = fcl * hc * (tcl - ta)  # convection
+
+    ts = 0.303 * np.exp(-0.036 * m) + 0.028
+    pmv = ts * (mw - hl1 - hl2 - hl3 - hl4 - hl5 - hl6)
+    ppd = 100.0 - 95.0 * np.exp(-0.03353 * pmv ** 4 - 0.2179 * pmv ** 2)
+
+    return pmv, ppd
+
+
+def pmv_grid(ta, tr, rh, clo, met, veloc, occupied=None):
+    r"""PMV and PPD for all combinations of clo, met and veloc.
+
+    Parameters
+    ----------
+    ta : array
+        Air temperature time series (degC).
+    tr : array
+        Mean radiant temperature time series (degC).
+    rh : array
+        Relative humidity time series (%).
+    clo : float | list of float
+        Clothing insulation values (clo).
+    met : float | list of float
+        Metabolic rate values (met).
+    veloc : float | list of float
+        Relative air velocity values (m/s).
+    occupied : array of bool, optional
+        Occupied time steps. Unoccupied time steps are NaN in the results,
+        as res_PMV() evaluates occupied time steps only.
+
+    Returns
+    -------
+    Tuple (PMV, PPD) of arrays of shape (len(clo), len(met), len(veloc),
+    len(ta)).
+
+    Notes
+    -----
+    Example usage (mean PMV of each combination over occupied hours).
+        pmv, ppd = pmv_grid(ta, tr, rh, [0.5, 1.0], [1.0, 1.2], [0.1, 0.2],
+                            occupied=occ)
+        mean_pmv = np.nanmean(pmv, axis=-1)
+
+    """
+
+    import numpy as np
+
+    clo = np.atleast_1d(np.asarray(clo, dtype=float))[:, None, None, None]
+    met = np.atleast_1d(np.asarray(met, dtype=float))[None, :, None, None]
+    veloc = np.atleast_1d(np.asarray(veloc, dtype=float))[None, None, :, None]
+
+    pmv, ppd = pmv_ppd(np.asarray(ta), np.asarray(tr), veloc, np.asarray(rh), met, clo)
+
+    if occupied is not None:
+        occupied = np.asarray(occupied, dtype=bool)
+        pmv = np.where(occupied, pmv, np.nan)
+        ppd = np.where(occupied, ppd, np.nan)
+
+    return pmv, ppd
+
+
+def res_records(resfile, width, dtype="<f4", header=0, cwd=None):
+    r"""Memory-map .res file as array of fixed width records.
+
+    ESP-r writes result libraries as Fortran direct access files, i.e. as a
+    sequence of records of 'width' 4 byte words without record markers. The
+    file is mapped read-only, data are read from disk when accessed. The
+    header records are not decoded, 'width' and 'header' must be known
+    (see res_variables).
+
+    Parameters
+    ----------
+    resfile : str | Path
+        results file name (with relative path w/o extension)
+    width : int
+        Record width in words.
+    dtype : str, optional
+        Word type (default: '<f4', little endian float). Integer words of
+        the same records are obtained with records.view('<i4').
+    header : int, optional
+        Number of bytes skipped at the start of the file (default: 0).
+    cwd : str | Path, optional
+        Directory of the results file (default: current working directory).
+
+    Returns
+    -------
+    numpy.memmap of shape (number of records, width). A trailing partial
+    record is ignored.
+
+    """
+
+    import numpy as np
+
+    path = in_dir(cwd, resfile + ".res")
+    word = np.dtype(dtype).itemsize
+    nrec = (os.path.getsize(path) - header) // (width * word)
+
+    return np.memmap(path, dtype=dtype, mode="r", offset=header, shape=(nrec, width))
+
+
+def res_series(records, start, step, column, count=None):
+    r"""Return time series of one record column (lazy view).
+
+    Parameters
+    ----------
+    records : numpy.memmap
+        Records as returned by res_records().
+    start : int
+        Record of the first time step.
+    step : int
+        Number of records per time step.
+    column : int
+        Word within the record.
+    count : int, optional
+        Number of time steps (default: all up to the end of the file).
+
+    Returns
+    -------
+    1D array view, no data are read before the values are used.
+
+    """
+
+    series = records[start::step, column]
+    if count is not None:
+        series = series[:count]
+
+    return series
+
+
+def res_variables(resfile, layout, cwd=None):
+    r"""Return zone variables of .res file as lazy arrays.
+
+    Parameters
+    ----------
+    resfile : str | Path
+        results file name (with relative path w/o extension)
+    layout : dict
+        Record layout of the result library (see Notes).
+    cwd : str | Path, optional
+        Directory of the results file (default: current working directory).
+
+    Returns
+    -------
+    Nested dict {zone: {variable: array}}, arrays being views of the
+    memory-mapped file (see res_series).
+
+    Notes
+    -----
+    The record layout depends on the ESP-r version, the model and the save
+    level of the simulation. It is not read from the library header, but
+    has to be passed in (e.g. determined once per model and save level by
+    comparing the records with a res extraction of the same library):
+
+        layout = {"width": 40,    # record width (words)
+                  "start": 12,    # record of first time step
+                  "step": 7,      # records per time step
+                  "count": 8760,  # time steps (optional)
+                  "zones": {"Wohnen": {"record": 0,  # record within time step
+                                       "vars": {"t_air": 0, "t_mrt": 2}}}}
+
+    A layout not fitting the file (a record or time step beyond its end, a
+    variable beyond the record width, a zone record beyond the time step)
+    raises ValueError. A layout fitting the file is not necessarily right,
+    check it against a res extraction.
+
+    Example usage.
+        v = res_variables("var01", layout, cwd=wd)
+        t_air = np.asarray(v["Wohnen"]["t_air"])
+
+    """
+
+    records = res_records(resfile, layout["width"], dtype=layout.get("dtype", "<f4"),
+                          header=layout.get("header", 0), cwd=cwd)
+
+    nrec, width = records.shape
+    count = layout.get("count")
+    last = layout["start"] + layout["step"] * ((count or 1) - 1)
+    for zone, z in layout["zones"].items():
+        if not 0 <= z["record"] < layout["step"]:
+            raise ValueError("Layout: record " + str(z["record"]) + " of zone " + zone
+                             + " is not within a time step of " + str(layout["step"])
+                             + " records.")
+        if last + z["record"] >= nrec:
+            raise ValueError("Layout: " + str(resfile) + ".res has " + str(nrec)
+                             + " records, too few for zone " + zone + ".")
+        for var, column in z["vars"].items():
+            if not 0 <= column < width:
+                raise ValueError("Layout: word " + str(column) + " of " + zone + " "
+                                 + var + " is beyond the record width " + str(width)
+                                 + ".")
+
+    variables = {}
+    for zone, z in layout["zones"].items():
+        variables[zone] = {}
+        for var, column in z["vars"].items():
+            variables[zone][var] = res_series(records, layout["start"] + z["record"],
+                                              layout["step"], column,
+                                              count=layout.get("count"))
+
+    return variables
@@ -0,0 +1,784 @@
+#!/usr/bin/env python3
+
+# Last changed: 18/10/2026
+# Status: development
+#
+# Module contains following functions for running ESP-r modules:
+#
+# def in_dir(cwd, name):
+#          Return path of file 'name' relative to working directory 'cwd'.
+# def run_espr(args, cmd, scratch, cwd=None):
+#          Run ESP-r module in text mode, write output to scratch file.
+# def in_session(args, cwd=None):
+#          Return open prj_session() collecting runs of 'args', if any.
+# def run_dialog(args, steps, scratch, cwd=None, timeout=30.0):
+#          Run ESP-r module in text mode, answering its prompts (expect-style).
+# def supervise(p, cmd, f, timeout=None, stall=None, loop=None):
+#          Feed commands to and read output of module, kill it if it hangs.
+# def classify_failure(kind, tail):
+#          Return failure dict of a killed module from its last output lines.
+# class EsprRunError(RuntimeError):
+#          ESP-r module killed by the watchdog.
+# def watchdog(timeout=None, stall=None, loop=None):
+#          Context manager supervising all ESP-r runs within.
+# def run_record(args, scratch, returncode, t0, usage=None, failure=None):
+#          Return record of an ESP-r run for the run log.
+# def run_label(label):
+#          Context manager labelling the runs logged within (e.g. variant).
+# def log_run(record, cwd=None):
+#          Append record of an ESP-r run to the run log.
+# def read_run_log(cwd=None):
+#          Return records of the run log.
+# def join_scripts(cmds):
+#          Join menu scripts into the script of one module session.
+# def prj_session(config, cwd=None, scratch=None):
+#          Context manager applying all prj edits within one prj session.
+import os
+import re
+import json
+import time
+import select
+import signal
+import selectors
+from collections import deque
+from subprocess import run, Popen, PIPE, CompletedProcess, TimeoutExpired
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+"""
+Module contains the functions used by espr_sim, espr_ms_sim and espr_res to
+run the ESP-r modules prj, bps and res in text mode.
+"""
+
+# Currently open prj_session(), if any.
+_session = ContextVar("prj_session", default=None)
+
+# Label of logged runs, see run_label().
+_label = ContextVar("run_label", default=None)
+
+# Run log (JSON lines) written to the working directory, None to disable.
+RUN_LOG = "esprsim_runs.jsonl"
+
+# Settings of the currently open watchdog(), if any.
+_watchdog = ContextVar("watchdog", default=None)
+
+# Maximum length (lines) of a repeated output block detected as loop, see supervise().
+LOOP_BLOCK = 60
+
+# Output patterns (lower case) by which failures of killed modules are classified.
+FAILURE_HINTS = {
+    "missing file": ("could not open", "not found", "does not exist", "no such file"),
+    "bad input": ("not a valid", "invalid", "out of range", "please try again"),
+    "crash": ("segmentation fault", "sigsegv", "backtrace", "floating point exception"),
+}
+
+
+def in_dir(cwd, name):
+    r"""Return path of file 'name' relative to working directory 'cwd'.
+
+    Parameters
+    ----------
+    cwd : str | Path | None
+        Working directory (model cfg directory). If None, the current
+        working directory of the Python process is used.
+    name : str | Path
+        File or directory name relative to 'cwd'.
+
+    Returns
+    -------
+    Path of 'name' as seen from the current working directory.
+
+    """
+
+    if cwd is None:
+        return name
+    return os.path.join(cwd, name)
+
+
+def run_espr(args, cmd, scratch, cwd=None):
+    r"""Run ESP-r module in text mode, write output to scratch file.
+
+    Parameters
+    ----------
+    args : list of str
+        Command line of the ESP-r module, e.g. ["prj", "-file", "x.cfg",
+        "-mode", "text"].
+    cmd : bytes
+        Menu commands fed to the module via stdin.
+    scratch : str
+        Scratch file name (relative to 'cwd') for the module's output.
+    cwd : str | Path, optional
+        Directory to run in (default: current working directory).
+
+    Returns
+    -------
+    subprocess.CompletedProcess of the run, None if the commands were
+    collected by an open prj_session().
+
+    Notes
+    -----
+    Wall time, CPU time, peak memory and block I/O of the module are
+    appended to the run log (see log_run). Within a watchdog() context, the
+    module is supervised and EsprRunError raised if it hangs.
+
+    """
+
+    session = in_session(args, cwd)
+    if session is not None:
+        session["args"] = args
+        session["cmds"].append(cmd)
+        return None
+
+    wd = _watchdog.get()
+
+    t0 = time.time()
+    failure = None
+    with open(in_dir(cwd, scratch), "wb") as f:  # creates scratch file
+        if not hasattr(os, "wait4"):  # no resource usage of child (Windows)
+            try:
+                p = run(args, input=cmd, stdout=f, cwd=cwd,
+                        timeout=None if wd is None else wd["timeout"])
+            except TimeoutExpired:
+                p = CompletedProcess(args, None)
+                failure = classify_failure("timeout", [])
+            log_run(run_record(args, scratch, p.returncode, t0, failure=failure), cwd=cwd)
+            if failure is not None:
+                raise EsprRunError(args, scratch, failure)
+            return p
+
+        # runs module (args), executes commands (cmd), writes scratch file (f)
+        if wd is None:
+            p = Popen(args, stdin=PIPE, stdout=f, cwd=cwd)
+            try:
+                p.stdin.write(cmd)
+                p.stdin.close()
+            except BrokenPipeError:
+                pass  # module exited before reading all commands
+        else:
+            # own process group, processes started by the module are killed, too
+            p = Popen(args, stdin=PIPE, stdout=PIPE, cwd=cwd, start_new_session=True)
+            failure = supervise(p, cmd, f, **wd)
+        _, status, usage = os.wait4(p.pid, 0)
+        p.returncode = os.waitstatus_to_exitcode(status)
+
+    log_run(run_record(args, scratch, p.returncode, t0, usage, failure), cwd=cwd)
+
+    if failure is not None:
+        raise EsprRunError(args, scratch, failure)
+
+    return CompletedProcess(args, p.returncode)
+
+
+def _repeats(lines, loop, block=LOOP_BLOCK):
+    r"""True if 'lines' end in 'loop' consecutive repetitions of a block."""
+
+    for n in range(1, block + 1):
+        if len(lines) < loop * n:
+            break
+        if all(lines[-i] == lines[-i - n] for i in range(1, (loop - 1) * n + 1)):
+            return True
+    return False
+
+
+def supervise(p, cmd, f, timeout=None, stall=None, loop=None):
+    r"""Feed commands to and read output of module 'p', kill it if it hangs.
+
+    Parameters
+    ----------
+    p : subprocess.Popen
+        Module started with stdin and stdout pipes.
+    cmd : bytes
+        Menu commands fed to the module via stdin.
+    f : file
+        Scratch file (binary) the output is written to.
+    timeout : float, optional
+        Maximum run time (s).
+    stall : float, optional
+        Maximum time without output (s).
+    loop : int, optional
+        Maximum number of consecutive repetitions of an output block (of up
+        to LOOP_BLOCK lines) after the module consumed all commands (the
+        module cycling through a menu or prompt at the end of its input).
+
+    Returns
+    -------
+    None if the module finished, failure dict (see classify_failure) if it
+    was killed.
+
+    Notes
+    -----
+    The input is kept open until the module has read all commands and
+    waits for more (/proc/<pid>/wchan, see run_dialog()), then it is
+    closed. Only output written after that counts for loop detection,
+    repeated output while the module works through its commands (e.g.
+    menus redrawn in a prj_session()) or computes (bps progress lines) does
+    not. Where /proc is not available, the input is closed as soon as all
+    commands are written.
+
+    """
+
+    sel = selectors.DefaultSelector()
+    os.set_blocking(p.stdout.fileno(), False)
+    sel.register(p.stdout, selectors.EVENT_READ)
+    if cmd:
+        os.set_blocking(p.stdin.fileno(), False)
+        sel.register(p.stdin, selectors.EVENT_WRITE)
+
+    pos = 0
+    fed = False  # module consumed all commands, input closed
+    partial = b""
+    tail = deque(maxlen=20)
+    recent = deque(maxlen=loop * LOOP_BLOCK if loop else 1)  # output lines once fed
+    kind = None
+    t0 = last = time.monotonic()
+
+    while kind is None:
+        now = time.monotonic()
+        if timeout is not None and now - t0 > timeout:
+            kind = "timeout"
+        elif stall is not None and now - last > stall:
+            kind = "stall"
+
+        if not fed and pos >= len(cmd) and _reads_input(p.pid) is not False:
+            p.stdin.close()  # module waits for input beyond the commands
+            fed = True
+
+        for key, _ in sel.select(1.0 if fed else 0.1) if kind is None else []:
+            if key.fileobj is p.stdin:
+                try:
+                    pos += os.write(p.stdin.fileno(), cmd[pos:pos + 65536])
+                except BrokenPipeError:
+                    pos = len(cmd)  # module exited before reading all commands
+                if pos >= len(cmd):
+                    sel.unregister(p.stdin)
+                continue
+
+            data = os.read(p.stdout.fileno(), 65536)
+            if not data:  # module closed its output, i.e. finished
+                sel.close()
+                if not p.stdin.closed:
+                    p.stdin.close()
+                p.stdout.close()
+                return None
+            f.write(data)
+            last = time.monotonic()
+
+            lines = (partial + data).split(b"\n")
+            partial = lines.pop()
+            tail.extend(lines)
+            if fed and loop is not None:
+                recent.extend(line for line in lines if line.strip())
+                if _repeats(list(recent), loop):
+                    kind = "loop"
+
+    sel.close()
+    try:
+        os.killpg(p.pid, signal.SIGKILL)
+    except OSError:  # already exited
+        pass
+    if not p.stdin.closed:
+        p.stdin.close()
+    p.stdout.close()
+
+    return classify_failure(kind, [line.decode("utf-8", "replace") for line in tail])
+
+
+def classify_failure(kind, tail):
+    r"""Return failure dict of a killed module from its last output lines.
+
+    Parameters
+    ----------
+    kind : str
+        'timeout', 'stall', 'loop' (see watchdog), 'prompt' or 'exit' (see
+        run_dialog).
+    tail : list of str
+        Last output lines of the module.
+
+    Returns
+    -------
+    Dict with keys 'kind', 'hint' (key of FAILURE_HINTS matching the
+    output, None if none matches) and 'tail'.
+
+    """
+
+    text = "\n".join(tail).lower()
+    hint = None
+    for name, patterns in FAILURE_HINTS.items():
+        if any(pat in text for pat in patterns):
+            hint = name
+            break
+
+    return {"kind": kind, "hint": hint, "tail": tail}
+
+
+class EsprRunError(RuntimeError):
+    r"""ESP-r module killed by the watchdog or failed dialog (see run_dialog()).
+
+    Attributes 'cmdline', 'scratch' and 'failure' (see classify_failure).
+    """
+
+    def __init__(self, args, scratch, failure):
+        self.cmdline = list(args)
+        self.scratch = scratch
+        self.failure = failure
+        super().__init__(os.path.basename(args[0]) + " killed (" + failure["kind"]
+                         + (", " + failure["hint"] if failure["hint"] else "")
+                         + "), see " + scratch)
+
+
+@contextmanager
+def watchdog(timeout=None, stall=None, loop=None):
+    r"""Context manager supervising all ESP-r runs within.
+
+    A run within the context is killed (with all processes it started) if
+    it exceeds 'timeout', produces no output for 'stall' seconds or repeats
+    an output block 'loop' times in a row after it consumed all commands (a
+    menu loop due to an unexpected prompt, see supervise()). EsprRunError is raised for a killed run.
+
+    Parameters
+    ----------
+    timeout : float, optional
+        Maximum run time of each module (s).
+    stall : float, optional
+        Maximum time without output (s). Note that bps may be silent for
+        long during a simulation.
+    loop : int, optional
+        Maximum consecutive repetitions of an output block, e.g. 50.
+
+    Notes
+    -----
+    Example usage.
+        with watchdog(timeout=7200, stall=900, loop=50):
+            set_ctl(cfg, "ctl_a", cwd=wd)
+            simulate(1, cfg, "var01", ..., cwd=wd)
+
+    """
+
+    token = _watchdog.set({"timeout": timeout, "stall": stall, "loop": loop})
+    try:
+        yield
+    finally:
+        _watchdog.reset(token)
+
+
+def in_session(args, cwd=None):
+    r"""Return open prj_session() collecting runs of 'args' in 'cwd', if any.
+
+    Parameters
+    ----------
+    args : list of str
+        Command line of the ESP-r module.
+    cwd : str | Path, optional
+        Directory to run in (default: current working directory).
+
+    Returns
+    -------
+    Session dict (see prj_session), None if runs are not collected.
+
+    """
+
+    session = _session.get()
+    if session is not None and args[0] == "prj" \
+            and args[2] == session["config"] + ".cfg" \
+            and os.path.abspath(cwd or ".") == session["cwd"]:
+        return session
+    return None
+
+
+def _reads_input(pid):
+    r"""True if process 'pid' (or a child) is blocked reading a pipe.
+
+    Returns None if this cannot be determined (no /proc/<pid>/wchan).
+    """
+
+    pids = [pid]
+    for q in pids:
+        try:
+            with open("/proc/%d/task/%d/children" % (q, q), "r") as f:
+                pids.extend(int(c) for c in f.read().split())
+        except OSError:
+            pass
+
+    def state(q):
+        with open("/proc/%d/stat" % q, "r") as f:
+            return f.read().rsplit(")", 1)[1].split()[0]
+
+    known = False
+    for q in pids:
+        try:
+            # wchan of a process woken up in between is '0', read until consistent
+            for _ in range(3):
+                s = state(q)
+                with open("/proc/%d/wchan" % q, "r") as f:
+                    wchan = f.read().strip()
+                if state(q) == s:
+                    break
+        except (OSError, IndexError):
+            continue
+        if s == "R":  # running, wchan is '0'
+            known = True
+            continue
+        if wchan in ("", "0"):  # hidden
+            continue
+        known = True
+        if "pipe_read" in wchan or wchan == "pipe_wait":
+            return True
+
+    return False if known else None
+
+
+def _answer(rules, buf):
+    r"""Return (found, answer) for the prompt furthest in output 'buf'.
+
+    'rules' maps prompt patterns to answers (None: end of a prompt loop).
+    """
+
+    found = [(ms[-1].start(), a) for ms, a in
+             ((list(re.finditer(r, buf)), a) for r, a in rules.items()) if ms]
+    if not found:
+        return False, None
+    return True, max(found, key=lambda x: x[0])[1]
+
+
+def run_dialog(args, steps, scratch, cwd=None, timeout=30.0):
+    r"""Run ESP-r module in text mode, answering its prompts (expect-style).
+
+    The module's output is read incrementally. Whenever the module waits
+    for input, the output since the previous answer is matched against the
+    prompt(s) of the current step, the match furthest in the output (the
+    prompt the module waits at) is answered. The number of questions may
+    therefore depend on the model, and an unexpected prompt stops the run.
+
+    Parameters
+    ----------
+    args : list of str
+        Command line of the ESP-r module.
+    steps : list of tuple
+        Dialog, each step one of
+            (None, text)            send 'text' without waiting,
+            (pattern, text)         wait for regex 'pattern' in the output,
+                                    then send 'text',
+            ({pattern: text}, end)  answer every prompt matching one of the
+                                    patterns until the module waits at
+                                    regex 'end' (e.g. the menu it returns
+                                    to, see espr_sim.MENU_PROMPT).
+    scratch : str
+        Scratch file name (relative to 'cwd') for the module's output.
+    cwd : str | Path, optional
+        Directory to run in (default: current working directory).
+    timeout : float, optional
+        Time (s) to wait for an expected prompt (default: 30). The module
+        may compute silently in between (e.g. prj rebuilding .con files).
+
+    Returns
+    -------
+    subprocess.CompletedProcess of the run.
+
+    Notes
+    -----
+    EsprRunError is raised if an expected prompt does not appear within
+    'timeout' (kind 'prompt') or the module exits before the dialog is
+    finished (kind 'exit'). Silence never ends a prompt loop, a loop
+    without 'end' raises ValueError. On Linux, prompts are only matched
+    while the module is blocked reading its input (/proc/<pid>/wchan), i.e.
+    after it has consumed the answers sent. The run is logged like those of
+    run_espr(). gfortran output buffering is switched off
+    (GFORTRAN_UNBUFFERED_ALL), so that prompts are seen as soon as they are
+    written.
+
+    Example usage.
+        steps = [(None, "m\nc\n"),
+                 ({APPLY_CON_PROMPT: "y\n"}, MENU_PROMPT),
+                 (None, "-\n-\n")]
+        run_dialog(["prj", "-file", cfg + ".cfg", "-mode", "text"], steps,
+                   cfg + "_dialog.scratch", cwd=wd)
+
+    """
+
+    for pattern, answer in steps:
+        if isinstance(pattern, dict) and answer is None:
+            raise ValueError("Prompt loop " + str(list(pattern)) + " has no end pattern.")
+
+    env = dict(os.environ, GFORTRAN_UNBUFFERED_ALL="y")
+
+    t0 = time.time()
+    failure = None
+    usage = None
+    with open(in_dir(cwd, scratch), "wb") as f:  # creates scratch file
+        p = Popen(args, stdin=PIPE, stdout=PIPE, cwd=cwd, env=env, start_new_session=True)
+        out = {"buf": "", "tail": deque(maxlen=20), "eof": False}
+
+        def read(wait):
+            # Read available output (waiting up to 'wait' s), False if none.
+            if out["eof"] or not select.select([p.stdout], [], [], wait)[0]:
+                return False
+            data = os.read(p.stdout.fileno(), 65536)
+            if not data:
+                out["eof"] = True
+                return False
+            f.write(data)
+            text = data.decode("utf-8", "replace")
+            out["buf"] += text
+            out["tail"].extend(text.splitlines())
+            return True
+
+        def send(text):
+            # Answer, forget output up to the answered prompt.
+            out["buf"] = ""
+            try:
+                p.stdin.write(text.encode("utf-8"))
+                p.stdin.flush()
+            except BrokenPipeError:
+                pass  # detected as 'exit' by the next step
+
+        for pattern, answer in steps:
+            if pattern is None:
+                send(answer)
+                continue
+
+            loop = isinstance(pattern, dict)
+            rules = dict(pattern) if loop else {pattern: answer}
+            if loop:
+                rules[answer] = None  # end of the loop
+            last = time.monotonic()
+            while failure is None:
+                if read(0.05):  # module is still writing
+                    last = time.monotonic()
+                    continue
+                if out["eof"]:
+                    failure = "exit"  # module quit before the dialog was finished
+                    break
+                if _reads_input(p.pid) is False:
+                    continue  # module computes silently, input not yet consumed
+                # Module waits for input, answer the prompt it waits at.
+                found, text = _answer(rules, out["buf"])
+                if found:
+                    if text is None:
+                        break  # loop finished
+                    send(text)
+                    last = time.monotonic()
+                    if not loop:
+                        break
+                elif time.monotonic() - last >= timeout:
+                    failure = "prompt"  # module waits at an unexpected prompt
+            if failure is not None:
+                break
+
+        if failure is None:
+            try:
+                p.stdin.close()
+            except BrokenPipeError:
+                pass
+            while read(timeout):
+                pass
+            if not out["eof"]:
+                failure = "prompt"  # module waits for further input
+        if failure is not None:
+            try:
+                os.killpg(p.pid, signal.SIGKILL)
+            except OSError:  # already exited
+                pass
+        p.stdout.close()
+
+        if hasattr(os, "wait4"):
+            _, status, usage = os.wait4(p.pid, 0)
+            p.returncode = os.waitstatus_to_exitcode(status)
+        else:
+            p.wait()
+
+    if failure is not None:
+        failure = classify_failure(failure, list(out["tail"]))
+    log_run(run_record(args, scratch, p.returncode, t0, usage, failure), cwd=cwd)
+
+    if failure is not None:
+        raise EsprRunError(args, scratch, failure)
+
+    return CompletedProcess(args, p.returncode)
+
+
+def run_record(args, scratch, returncode, t0, usage=None, failure=None):
+    r"""Return record of an ESP-r run for the run log.
+
+    Parameters
+    ----------
+    args : list of str
+        Command line of the ESP-r module.
+    scratch : str
+        Scratch file name.
+    returncode : int
+        Exit code of the module.
+    t0 : float
+        Start time of the run (time.time()).
+    usage : resource.struct_rusage, optional
+        Resource usage of the module (from os.wait4).
+    failure : dict, optional
+        Failure of a module killed by the watchdog (see classify_failure).
+
+    Returns
+    -------
+    Dict with keys 'label', 'module', 'args', 'scratch', 'returncode',
+    'start', 'wall', 'utime', 'stime' (s), 'maxrss' (kB), 'inblock' and
+    'oublock' (blocks of 512 bytes read / written) and 'failure' (kind and
+    hint, None if not killed).
+
+    """
+
+    record = {"label": _label.get(), "module": os.path.basename(args[0]),
+              "args": list(args[1:]), "scratch": scratch, "returncode": returncode,
+              "start": t0, "wall": time.time() - t0,
+              "utime": None, "stime": None, "maxrss": None,
+              "inblock": None, "oublock": None,
+              "failure": None if failure is None
+              else {"kind": failure["kind"], "hint": failure["hint"]}}
+
+    if usage is not None:
+        record.update(utime=usage.ru_utime, stime=usage.ru_stime,
+                      maxrss=usage.ru_maxrss, inblock=usage.ru_inblock,
+                      oublock=usage.ru_oublock)
+
+    return record
+
+
+@contextmanager
+def run_label(label):
+    r"""Context manager labelling the runs logged within (e.g. variant).
+
+    Parameters
+    ----------
+    label : str
+        Label written to the run log records, e.g. the variant name.
+
+    """
+
+    token = _label.set(label)
+    try:
+        yield
+    finally:
+        _label.reset(token)
+
+
+def log_run(record, cwd=None):
+    r"""Append record of an ESP-r run to the run log.
+
+    The run log RUN_LOG is a JSON lines file in the working directory, next
+    to the scratch files.
+
+    Parameters
+    ----------
+    record : dict
+        Record as returned by run_record().
+    cwd : str | Path, optional
+        Working directory (default: current working directory).
+
+    """
+
+    if RUN_LOG is None:
+        return
+
+    # One unbuffered write per record (O_APPEND), appends of concurrent
+    # processes do not interleave.
+    data = (json.dumps(record) + "\n").encode("utf-8")
+    fd = os.open(in_dir(cwd, RUN_LOG), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
+def read_run_log(cwd=None):
+    r"""Return records of the run log.
+
+    Parameters
+    ----------
+    cwd : str | Path, optional
+        Working directory (default: current working directory).
+
+    Returns
+    -------
+    List of dicts (see run_record), empty if there is no run log.
+
+    """
+
+    path = in_dir(cwd, RUN_LOG or "")
+    if RUN_LOG is None or not os.path.exists(path):
+        return []
+
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def join_scripts(cmds):
+    r"""Join menu scripts into the script of one module session.
+
+    Each script starts in the main menu of the module (prj, res) and ends
+    with the command "-" quitting the module. The quit command is dropped
+    from all but the last script.
+
+    Parameters
+    ----------
+    cmds : list of bytes
+        Menu scripts (e.g. the commands returned by set_ctl_script()).
+
+    Returns
+    -------
+    Byte-encoded commands for one prj session.
+
+    """
+
+    lines = []
+    for cmd in cmds:
+        script = cmd.decode("utf-8").rstrip("\n").split("\n")
+        if script[-1] != "-":
+            raise ValueError("Menu script does not end with quit command '-'.")
+        lines += script[:-1]
+
+    return ("\n".join(lines) + "\n-\n").encode("utf-8")
+
+
+@contextmanager
+def prj_session(config, cwd=None, scratch=None):
+    r"""Context manager applying all prj edits within one prj session.
+
+    Within the context, the prj runs of the set_* functions (and of
+    qa_report()) for model 'config' in 'cwd' are not started, their menu
+    scripts are collected instead. On leaving the context, all scripts are
+    run in one prj session, i.e. the model is loaded and saved once. If an
+    exception is raised within the context, prj is not run at all.
+
+    Parameters
+    ----------
+    config : str
+        Configuration file name without extension.
+    cwd : str | Path, optional
+        Model cfg directory to run in (default: current working directory).
+    scratch : str, optional
+        Scratch file name (default: '<config>_batch.scratch').
+
+    Notes
+    -----
+    Example usage.
+        with prj_session(cfg, cwd=wd):
+            set_ctl(cfg, "ctl_var01", cwd=wd)
+            set_lam(cfg, "a", "b", "0.04", cwd=wd)
+            set_abs_o(cfg, "a", "c", "0.6", cwd=wd)
+
+    Functions which do not run prj (e.g. set_clm()) or which evaluate model
+    files before building their script (set_con()) are executed immediately,
+    i.e. they see the model state before the collected edits are applied.
+
+    """
+
+    session = {"config": config, "cwd": os.path.abspath(cwd or "."),
+               "args": None, "cmds": []}
+
+    token = _session.set(session)
+    try:
+        yield session
+    finally:
+        _session.reset(token)
+
+    if session["cmds"]:
+        print("\tprj session       : " + str(len(session["cmds"])) + " edits in "
+              + config + ".cfg")
+        run_espr(session["args"], join_scripts(session["cmds"]),
+                 scratch or config + "_batch.scratch", cwd=cwd)
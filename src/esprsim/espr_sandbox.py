@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+
+# Last changed: 18/10/2026
+# Status: development
+#
+# Module contains following functions for per-variant ESP-r model sandboxes:
+#
+# def edit_files(edits):
+#          Collect model file patterns touched by the given edit functions.
+# def copy_file(src, dst):
+#          Copy file, as reflink if the file system supports it.
+# def link_file(src, dst):
+#          Hard link file, fall back to copying.
+# def make_sandbox(model, sandbox, edits=(), writable=(), cfg="cfg", link=True):
+#          Materialise a private copy of model tree 'model' in 'sandbox'.
+# def remove_sandbox(sandbox):
+#          Remove a sandbox tree.
+# def tmpfs_free(tmpfs):
+#          Return bytes available for files in tmpfs directory 'tmpfs'.
+# def tmpfs_sandbox(sandbox, tmpfs="/dev/shm", min_free=TMPFS_MIN_FREE):
+#          Copy sandbox to a working tree in tmpfs, unless memory is low.
+# def persist_sandbox(workdir, sandbox):
+#          Move files written in working tree 'workdir' to 'sandbox'.
+import os
+import shutil
+import hashlib
+from fnmatch import fnmatch
+
+from . import espr_run
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+"""
+Module contains functions to create private copies (sandboxes) of an ESP-r
+model tree, so that several variants can be edited and simulated at the same
+time. All espr_sim, espr_ms_sim and espr_res functions are then called with
+'cwd' set to the cfg directory of the sandbox.
+"""
+
+# Model files (relative to the model root) which are (re-)written by the
+# respective edit functions. These are copied into a sandbox, all other
+# files are hard linked.
+EDIT_FILES = {
+    "qa_report": (),
+    "simulate": (),
+    "set_ctl": ("cfg/*.cfg", "cfg/*.cnn", "ctl/*.ctl"),
+    "set_clm": ("cfg/*.cfg",),
+    "set_mgp": ("cfg/*.cfg", "cfg/*.cnn"),
+    "set_spm": ("cfg/*.cfg", "cfg/*.cnn", "dbs/*.spm"),
+    "set_afn": ("cfg/*.cfg", "nets/*.afn"),
+    "set_plant": ("cfg/*.cfg", "nets/*.pln"),
+    "set_obs_dim": ("cfg/*.cfg", "zones/*.obs", "zones/*.shd"),
+    "set_con": ("cfg/*.cfg", "cfg/*.cnn", "zones/*"),
+    "set_ctl_temp_setpt": ("cfg/*.cfg", "ctl/*.ctl"),
+    "set_corecon": ("cfg/*.cfg", "cfg/*.cnn", "zones/*"),
+    "set_htc": ("cfg/*.cfg", "cfg/*.cnn", "zones/*.htc"),
+    "set_lam_w6CFC": ("cfg/*.cfg", "dbs/*", "zones/*"),
+    "set_lam": ("cfg/*.cfg", "dbs/*", "zones/*"),
+    "set_abs_o": ("cfg/*.cfg", "dbs/*", "zones/*"),
+}
+
+# Model input files of the cfg directory, hard linked unless edited. All
+# other files there are written by runs (QA reports, extracted results, ...)
+# and copied, as ESP-r may rewrite them in place.
+CFG_INPUTS = ("*.cfg", "*.cnn")
+
+# Files of the cfg directory written by runs which are left out of a sandbox
+# (results libraries, scratch files, QA reports).
+RUN_OUTPUTS = ("*.res", "*.mfr", "*.plr", "*.scratch", "*.contents")
+
+# FICLONE ioctl request (Linux), used for copy-on-write copies (reflinks).
+FICLONE = 0x40049409
+
+# Free memory (bytes) required to place a working tree in tmpfs, covering
+# the scratch and result files written by the variants running at once.
+TMPFS_MIN_FREE = 2 * 2**30
+
+
+def edit_files(edits):
+    r"""Collect model file patterns touched by the given edit functions.
+
+    Parameters
+    ----------
+    edits : list of str
+        Names of edit functions (e.g. 'set_ctl', 'set_lam') which will be
+        applied to the sandbox.
+
+    Returns
+    -------
+    Tuple of file name patterns relative to the model root.
+
+    """
+
+    patterns = []
+    for e in edits:
+        if e not in EDIT_FILES:
+            raise ValueError("Unknown edit function '" + e + "', add it to EDIT_FILES.")
+        for p in EDIT_FILES[e]:
+            if p not in patterns:
+                patterns.append(p)
+    return tuple(patterns)
+
+
+def copy_file(src, dst):
+    r"""Copy file 'src' to 'dst', as reflink if the file system supports it.
+
+    Parameters
+    ----------
+    src : str | Path
+        Source file.
+    dst : str | Path
+        Destination file.
+
+    """
+
+    if fcntl is not None:
+        try:
+            with open(src, "rb") as fs, open(dst, "wb") as fd:
+                fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+            shutil.copystat(src, dst)
+            return
+        except OSError:
+            pass
+
+    shutil.copy2(src, dst)
+
+
+def link_file(src, dst):
+    r"""Hard link file 'src' to 'dst', fall back to copying across devices.
+
+    Parameters
+    ----------
+    src : str | Path
+        Source file.
+    dst : str | Path
+        Destination file.
+
+    """
+
+    try:
+        os.link(src, dst)
+    except OSError:
+        copy_file(src, dst)
+
+
+def make_sandbox(model, sandbox, edits=(), writable=(), cfg="cfg", link=True):
+    r"""Materialise a private copy of model tree 'model' in 'sandbox'.
+
+    Files matching the patterns of the edit functions in 'edits' or the
+    patterns in 'writable' are copied, all other files are hard linked
+    (unchanged files must not be written to in the sandbox). In the cfg
+    directory, only the model input files (CFG_INPUTS) are hard linked,
+    results, scratch files and QA reports of earlier runs (RUN_OUTPUTS) are
+    left out, and all other files are copied. Directories are always
+    created, so new files stay private to the sandbox. The contents of the
+    model's tmp directory are not copied.
+
+    Parameters
+    ----------
+    model : str | Path
+        Root directory of the ESP-r model (containing cfg, ctl, dbs, ...).
+    sandbox : str | Path
+        Root directory of the sandbox, must not exist (and should be located
+        outside the model tree).
+    edits : list of str, optional
+        Names of edit functions which will be applied to the sandbox.
+    writable : list of str, optional
+        Additional file name patterns (relative to the model root) to copy.
+    cfg : str, optional
+        Name of the cfg directory of the model (default: 'cfg').
+    link : bool, optional
+        If False, copy all files instead of hard linking (default: True).
+
+    Returns
+    -------
+    Path of the cfg directory in the sandbox, to be passed as 'cwd'.
+
+    Notes
+    -----
+    Example usage.
+        wd = make_sandbox("../", "/scratch/var01", edits=("set_ctl", "simulate"))
+        set_ctl(cfg, "ctl_var01", cwd=wd)
+        simulate(1, cfg, "var01", "4", "1", "1", "1", "31", "12", "7", cwd=wd)
+
+    """
+
+    model = os.path.abspath(model)
+    sandbox = os.path.abspath(sandbox)
+
+    print("\tSandbox           : " + sandbox)
+
+    patterns = edit_files(edits) + tuple(writable)
+
+    os.makedirs(sandbox)
+
+    for root, dirs, files in os.walk(model):
+        rel = os.path.relpath(root, model)
+        # Do not descend into the sandbox itself or into tmp.
+        dirs[:] = [d for d in dirs
+                   if os.path.join(root, d) != sandbox
+                   and not (rel == "." and d == "tmp")]
+
+        dest = os.path.join(sandbox, rel)
+        os.makedirs(dest, exist_ok=True)
+        in_cfg = os.path.normpath(rel) == os.path.normpath(cfg)
+
+        for f in files:
+            if f == espr_run.RUN_LOG:  # run log of the model, not of the sandbox
+                continue
+            if in_cfg and any(fnmatch(f, p) for p in RUN_OUTPUTS):
+                continue
+            name = os.path.normpath(os.path.join(rel, f)).replace(os.sep, "/")
+            src = os.path.join(root, f)
+            if (link is False or any(fnmatch(name, p) for p in patterns)
+                    or (in_cfg and not any(fnmatch(f, p) for p in CFG_INPUTS))):
+                copy_file(src, os.path.join(dest, f))
+            else:
+                link_file(src, os.path.join(dest, f))
+
+    os.makedirs(os.path.join(sandbox, "tmp"), exist_ok=True)
+
+    return os.path.join(sandbox, cfg)
+
+
+def remove_sandbox(sandbox):
+    r"""Remove a sandbox tree.
+
+    Parameters
+    ----------
+    sandbox : str | Path
+        Root directory of the sandbox.
+
+    """
+
+    if os.path.isdir(sandbox) is True:
+        shutil.rmtree(sandbox)
+
+
+def tmpfs_free(tmpfs):
+    r"""Return bytes available for files in tmpfs directory 'tmpfs'.
+
+    Files in tmpfs use memory, the minimum of the free space of the file
+    system and the available memory (MemAvailable, Linux) is returned.
+
+    Parameters
+    ----------
+    tmpfs : str | Path
+        Directory on a tmpfs file system, e.g. '/dev/shm'.
+
+    """
+
+    st = os.statvfs(tmpfs)
+    free = st.f_bavail * st.f_frsize
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    free = min(free, int(line.split()[1]) * 1024)
+                    break
+    except OSError:  # not Linux
+        pass
+    return free
+
+
+def tmpfs_sandbox(sandbox, tmpfs="/dev/shm", min_free=TMPFS_MIN_FREE):
+    r"""Copy sandbox to a working tree in tmpfs, unless memory is low.
+
+    ESP-r then writes scratch, tmp and result files to memory instead of
+    the (possibly network) storage of the sandbox. The working tree is
+    moved back with persist_sandbox() when the variant is finished. If less
+    than 'min_free' bytes are available (see tmpfs_free), or the copy does
+    not fit, the sandbox itself is used as working tree.
+
+    Parameters
+    ----------
+    sandbox : str | Path
+        Root directory of the sandbox (see make_sandbox).
+    tmpfs : str | Path, optional
+        Directory on a tmpfs file system (default: '/dev/shm').
+    min_free : int, optional
+        Free memory required in bytes (default: TMPFS_MIN_FREE).
+
+    Returns
+    -------
+    Root directory of the working tree, '<tmpfs>/esprsim-<hash>-<name>' or
+    'sandbox'.
+
+    Notes
+    -----
+    Example usage.
+        make_sandbox("../", "/nfs/study/var01", edits=("set_ctl", "simulate"))
+        work = tmpfs_sandbox("/nfs/study/var01")
+        wd = os.path.join(work, "cfg")
+        set_ctl(cfg, "ctl_var01", cwd=wd)
+        simulate(1, cfg, "var01", "60", "1", "1", "1", "31", "12", "7", cwd=wd)
+        move_files(1, "var01", cwd=wd)
+        persist_sandbox(work, "/nfs/study/var01")
+
+    """
+
+    sandbox = os.path.abspath(sandbox)
+    workdir = os.path.join(tmpfs, "esprsim-"
+                           + hashlib.sha1(sandbox.encode("utf-8")).hexdigest()[:12]
+                           + "-" + os.path.basename(sandbox))
+
+    free = tmpfs_free(tmpfs)
+    if free < min_free:
+        print("\tLow memory        : " + "%.1f" % (free / 2**30)
+              + " GiB free in " + str(tmpfs) + ", working in sandbox")
+        return sandbox
+
+    remove_sandbox(workdir)  # left over by an interrupted run
+    try:
+        # copy2 keeps modification times, see persist_sandbox()
+        shutil.copytree(sandbox, workdir, symlinks=True, copy_function=shutil.copy2)
+    except OSError as err:  # e.g. tmpfs full
+        remove_sandbox(workdir)
+        print("\tCopy to tmpfs     : " + str(err) + ", working in sandbox")
+        return sandbox
+
+    print("\tWorking tree      : " + workdir)
+
+    return workdir
+
+
+def persist_sandbox(workdir, sandbox):
+    r"""Move files written in working tree 'workdir' to 'sandbox'.
+
+    Files with the size and modification time of the sandbox file are
+    unchanged and skipped (so hard links of the sandbox to the base model
+    are kept), all other files are moved. Files and directories removed
+    from the working tree (e.g. results moved by move_files) are removed
+    from the sandbox, too. The working tree is removed.
+
+    Parameters
+    ----------
+    workdir : str | Path
+        Root directory of the working tree (see tmpfs_sandbox).
+    sandbox : str | Path
+        Root directory of the sandbox.
+
+    Returns
+    -------
+    Root directory of the sandbox.
+
+    """
+
+    workdir = os.path.abspath(workdir)
+    sandbox = os.path.abspath(sandbox)
+    if workdir == sandbox:
+        return sandbox
+
+    moved = 0
+    present = set()  # paths relative to the root in the working tree
+    for root, dirs, files in os.walk(workdir):
+        rel = os.path.relpath(root, workdir)
+        dest = os.path.join(sandbox, rel)
+        os.makedirs(dest, exist_ok=True)
+        present.update(os.path.normpath(os.path.join(rel, d)) for d in dirs)
+        for f in files:
+            present.add(os.path.normpath(os.path.join(rel, f)))
+            src = os.path.join(root, f)
+            dst = os.path.join(dest, f)
+            if os.path.lexists(dst):
+                a, b = os.lstat(src), os.lstat(dst)
+                if a.st_size == b.st_size and a.st_mtime_ns == b.st_mtime_ns:
+                    continue
+                os.remove(dst)  # never write through a hard link to the model
+            shutil.move(src, dst)
+            moved += 1
+
+    # The working tree was a copy of the sandbox, what is missing was removed.
+    removed = 0
+    for root, dirs, files in os.walk(sandbox, topdown=False):
+        rel = os.path.relpath(root, sandbox)
+        for name in files + [d for d in dirs if os.path.islink(os.path.join(root, d))]:
+            if os.path.normpath(os.path.join(rel, name)) not in present:
+                os.remove(os.path.join(root, name))  # removes the link only
+                removed += 1
+        if rel != "." and os.path.normpath(rel) not in present and not os.listdir(root):
+            os.rmdir(root)
+
+    remove_sandbox(workdir)
+
+    print("\tPersisted         : " + str(moved) + " files to " + sandbox
+          + " (" + str(removed) + " removed)")
+
+    return sandbox
@@ -25,17 +25,38 @@
 #            Switch a construction ...
 # 609: def set_ctl_temp_setpt()
 #            Set setpoint temperature for building domain control.
+#
+# All functions take an optional keyword 'cwd' (the model's cfg directory)
+# and default to the current working directory if it is not given. Functions
+# calling prj/bps have a companion <function>_script() returning arguments,
+# commands and scratch file name for run_espr() (see espr_run, espr_async).
+# set_clm() edits the .cfg in Python; set_ctl(), set_mgp() and
+# set_ctl_temp_setpt() do so with 'native=True' (see espr_files). simulate()
+# reuses cached results with 'cache=<directory>' (see espr_cache). set_con()
+# answers prj's confirmations as they appear (set_con_dialog(), see
+# espr_run.run_dialog).
 import os
 import shutil
 import glob
-from subprocess import run
+
+from .espr_run import in_dir, run_espr, run_dialog, in_session
+from .espr_files import cfg_set, cfg_set_gtp, ctl_set_setpoints, con_surfaces
+from .espr_cache import cache_key, cache_restore, cache_store
 
 """
 Module contains functions for ESP-r scripts and auxiliary functions for
 batch running of simulations.
 """
 
-def qa_report(config, variant):
+# Prompt of prj's global search & replace of constructions (regex).
+APPLY_CON_PROMPT = r"(?i)apply construction to .*\?"
+
+# Exit item of a prj menu ('- exit this menu', '- quit module', ...) at the
+# end of the output, i.e. prj waits in a menu (regex, ends a prompt loop of
+# run_dialog).
+MENU_PROMPT = r"(?im)^[ \t]*-[ \t]+(exit|quit)\b[^\n]*(\n[^\n?]*)?\Z"
+
+def qa_report(config, variant, cwd=None):
     r"""Create QA report.
 
     Parameters
@@ -44,11 +65,33 @@ def qa_report(config, variant):
         Configuration file name without extension.
     variant : str
         Variant name (ctl, con, mat)
+    cwd : str | Path, optional
+        Model cfg directory to run in (default: current working directory).
 
     """
 
     print("\tQA report         : " + variant + ".contents")
 
+    # Run prj, execute commands, write scratch file.
+    run_espr(*qa_report_script(config, variant), cwd=cwd)
+
+
+def qa_report_script(config, variant):
+    r"""Return prj arguments, commands and scratch file name for qa_report().
+
+    Parameters
+    ----------
+    config : str | Path
+        Configuration file name without extension.
+    variant : str
+        Variant name (ctl, con, mat)
+
+    Returns
+    -------
+    Tuple (args, cmd, scratch) to be passed to run_espr().
+
+    """
+
     # Creating QA report
     args = [
             "prj",
@@ -75,9 +118,7 @@ def qa_report(config, variant):
                 "-\n",  # exit Project Manager
                 encoding="utf-8")
 
-    f = open(variant + "_qa.scratch", "w")  # creates scratch file
-
-    run(args, input=cmd, stdout=f)  # runs prj (args), executes commands (cmd), writes scratch file (f)
+    return args, cmd, variant + "_qa.scratch"
 
 
 def list_dms(dms, variant):
@@ -167,7 +208,8 @@ def ts_dms(dms, BTSTEP, PTSTEP):
     return switcher.get(dms, "Error in dms - ts")
 
 
-def simulate(dms, config, variant, BTSTEP, PTSTEP, FD, FM, TD, TM, PP):
+def simulate(dms, config, variant, BTSTEP, PTSTEP, FD, FM, TD, TM, PP, cwd=None,
+             cache=None, hourly=False, save_level="*", save_filter="*"):
     r"""Function to run simulation for model with 'dms' domains involved based on
     configuration file 'config'.
 
@@ -184,9 +226,27 @@ def simulate(dms, config, variant, BTSTEP, PTSTEP, FD, FM, TD, TM, PP):
     [5]      building simulation time steps per hour
     [6]      plant time steps per building time step
     [7 to 10] start- and end dates for simulation period via dict
+    cwd : str | Path, optional
+        Model cfg directory to run in (default: current working directory).
+    cache : str | Path, optional
+        Result cache directory. If given, results of a previous simulation
+        with identical model inputs and arguments are restored from the
+        cache instead of running bps (see espr_cache).
+    hourly : bool, optional
+        Integrate results to hourly values (default: False, results per
+        building time step).
+    save_level : str, optional
+        Answer to the building save level prompt, e.g. "0" (summary) ... "6"
+        (default: "*", the save level of the model's simulation parameters).
+    save_filter : str | list of str, optional
+        Answer(s) to the prompt selecting the results saved at the chosen
+        level, e.g. ["a", "c", "*"] (default: "*", all results).
 
     Notes
     -----
+    Lower save levels, a filter and hourly integration shrink the .res file
+    (and bps I/O), but res can then only extract the results saved.
+
     Required output files depend on simulation mode.
     1 building only, .res
     2 building and afn, .res, .mfr
@@ -205,7 +265,78 @@ def simulate(dms, config, variant, BTSTEP, PTSTEP, FD, FM, TD, TM, PP):
         
     if ((dms == 3) | (dms == 4)) is True:
         print("\t                    " + BTSTEP + " building ts per hour and "
-              + PTSTEP*BTSTEP + " plant ts per hour.")
+              + str(int(PTSTEP)*int(BTSTEP)) + " plant ts per hour.")
+
+    if cache is not None:
+        key = cache_key(config, (dms, BTSTEP, PTSTEP, FD, FM, TD, TM, PP, hourly,
+                                 save_level, save_filter), cwd=cwd)
+        if cache_restore(cache, key, variant, cwd=cwd):
+            print("\tResults restored  : cache entry " + key[:12])
+            return
+
+    # run bps (args), execute commands (cmd), write scratch file
+    run_espr(*simulate_script(dms, config, variant, BTSTEP, PTSTEP, FD, FM, TD, TM, PP,
+                              hourly=hourly, save_level=save_level,
+                              save_filter=save_filter), cwd=cwd)
+
+    simulate_post(variant, cwd=cwd)
+
+    if cache is not None and os.path.exists(in_dir(cwd, variant + ".res")):
+        cache_store(cache, key, variant, cwd=cwd)
+
+
+def simulate_post(variant, cwd=None):
+    r"""Report bps CPU time and move results of 'variant' from ../tmp to cfg.
+
+    Parameters
+    ----------
+    variant : str
+        Simulation variant name.
+    cwd : str | Path, optional
+        Model cfg directory to run in (default: current working directory).
+
+    """
+
+    # Postprocessing
+    for line in open(in_dir(cwd, variant + "_bps.scratch")):
+        if "CPU time:" in line:
+            print("\n\t" + line)
+            # if "XML postprocessor cpu runtime" in line:
+            #     print(line)
+
+    for file in glob.glob(in_dir(cwd, "../tmp/" + variant + ".*")):
+        shutil.move(file, in_dir(cwd, './'))
+
+
+def simulate_script(dms, config, variant, BTSTEP, PTSTEP, FD, FM, TD, TM, PP,
+                    hourly=False, save_level="*", save_filter="*"):
+    r"""Return bps arguments, commands and scratch file name for simulate().
+
+    Parameters
+    ----------
+    dms : int
+        Mode key for domains in model.
+    config : str
+        Configuration file name without extension.
+    variant : str
+        Simulation variant name.
+    
+    [4]      number of days for start-up period duration
+    [5]      building simulation time steps per hour
+    [6]      plant time steps per building time step
+    [7 to 10] start- and end dates for simulation period via dict
+    hourly : bool, optional
+        Integrate results to hourly values (default: False).
+    save_level : str, optional
+        Building save level (default: "*", see simulate()).
+    save_filter : str | list of str, optional
+        Selection of saved results (default: "*", see simulate()).
+
+    Returns
+    -------
+    Tuple (args, cmd, scratch) to be passed to run_espr().
+
+    """
 
     # Running Simulation
     args = [
@@ -230,10 +361,13 @@ def simulate(dms, config, variant, BTSTEP, PTSTEP, FD, FM, TD, TM, PP):
 
     cmd4 = ts_dms(dms, BTSTEP, PTSTEP)
 
-    cmd5 = bytes("N\n"  # hourly results integration? [Y/N]
-                 "*\n"  # Save 3
-                 "*\n"  # Save 4
-                 "s\n"  # commence simulation
+    if isinstance(save_filter, str):
+        save_filter = [save_filter]
+
+    cmd5 = bytes(("Y" if hourly else "N") + "\n"  # hourly results integration? [Y/N]
+                 + str(save_level) + "\n"  # Save 3 (save level)
+                 + "".join(str(a) + "\n" for a in save_filter)  # Save 4 (results saved)
+                 + "s\n"  # commence simulation
                  "Y\n"  # use suggested control file [Y/N]
                  "Run:" + variant + "\n"  # result-set description
                  "Y\n"  # continue with simulation? [Y/N]
@@ -250,23 +384,10 @@ def simulate(dms, config, variant, BTSTEP, PTSTEP, FD, FM, TD, TM, PP):
     
     cmd = cmd.encode('utf-8')
 
-    f = open(variant + "_bps.scratch", "w")  # create scratch file
+    return args, cmd, variant + "_bps.scratch"
 
-    # run bps (args), execute commands (cmd), write scratch file (f)
-    run(args, input=cmd, stdout=f)
 
-    # Postprocessing
-    for line in open(variant + "_bps.scratch"):
-        if "CPU time:" in line:
-            print("\n\t" + line)
-            # if "XML postprocessor cpu runtime" in line:
-            #     print(line)
-
-    for file in glob.glob("../tmp/" + variant + ".*"):
-        shutil.move(file, './')
-
-
-def set_ctl(config, ctl_file):
+def set_ctl(config, ctl_file, cwd=None, native=False):
     r"""Function to set control file in .cfg of model.
 
     Parameters
@@ -275,11 +396,40 @@ def set_ctl(config, ctl_file):
         Configuration file name without extension.
     ctl_file : str
         Control file name without extension.
+    cwd : str | Path, optional
+        Model cfg directory to run in (default: current working directory).
+    native : bool, optional
+        If True, set the reference in .cfg directly instead of running prj
+        (see espr_files).
 
     """
 
     print("\tSet control file  : " + ctl_file + ".ctl")
 
+    if native is True:
+        cfg_set(in_dir(cwd, config + ".cfg"), "ctl", "../ctl/" + ctl_file + ".ctl")
+        return
+
+    # Run prj, execute commands, write scratch file.
+    run_espr(*set_ctl_script(config, ctl_file), cwd=cwd)
+
+
+def set_ctl_script(config, ctl_file):
+    r"""Return prj arguments, commands and scratch file name for set_ctl().
+
+    Parameters
+    ----------
+    config : str
+        Configuration file name without extension.
+    ctl_file : str
+        Control file name without extension.
+
+    Returns
+    -------
+    Tuple (args, cmd, scratch) to be passed to run_espr().
+
+    """
+
     # Setting control file
     args = [
             "prj",
@@ -299,12 +449,10 @@ def set_ctl(config, ctl_file):
                 "-\n", # exit Project Manager
                 encoding="utf-8")
 
-    f = open(config + "_set_" + ctl_file + ".scratch", "w")  # creates scratch file
-
-    run(args, input=cmd, stdout=f)  # runs prj (args), executes commands (cmd), writes scratch file (f)
+    return args, cmd, config + "_set_" + ctl_file + ".scratch"
 
 
-def set_clm(config, clm_file):
+def set_clm(config, clm_file, cwd=None):
     r"""Function to set climate file in .cfg of model.
 
     Parameters
@@ -313,6 +461,8 @@ def set_clm(config, clm_file):
         Configuration file name without extension.
     clm_file : str
         Climate file name *including* extension
+    cwd : str | Path, optional
+        Model cfg directory to run in (default: current working directory).
 
     """
 
@@ -325,21 +475,8 @@ def set_clm(config, clm_file):
 #            "-mode", "text",  # opens file in mode text
 #            ]
 
-        # Change climate file via sed ((hack due to bug in prj text mode))
-        
-    wd=os.getcwd() # must be <modelpath>/cfg <<check?>>
-    
-    cmd1='cp ' + config + '.cfg temp.cfg'
-
-    new_clm='*clm ../dbs/' + clm_file
-    
-    cmd2='sed \'s%\*clm ../dbs/.*%' + new_clm + '%\' temp.cfg > ' + config + '.cfg'
-        
-    cmd3='rm temp.cfg'
-
-    run(cmd1, shell=True, cwd=wd)
-    run(cmd2, shell=True, cwd=wd)
-    run(cmd3, shell=True, cwd=wd)
+    # Change climate file in .cfg directly (hack due to bug in prj text mode)
+    cfg_set(in_dir(cwd, config + ".cfg"), "clm", "../dbs/" + clm_file)
 
 #    cmd = bytes("b\n"  # db management
 #                "a\n"  # annual weather
@@ -358,7 +495,7 @@ def set_clm(config, clm_file):
 #    run(args, input=cmd, stdout=f)  # runs prj (args), executes commands (cmd), writes scratch file (f)
 
 
-def set_mgp(config, clm_file, gtp):
+def set_mgp(config, clm_file, gtp, cwd=None, native=False):
     r"""Function to set ground temperatures according to climate file.
 
     Parameters
@@ -377,6 +514,11 @@ def set_mgp(config, clm_file, gtp):
                                'JulDez' : "9.00  10.65  11.03  10.10   8.05   5.55"}},
            ... }
     }
+    cwd : str | Path, optional
+        Model cfg directory to run in (default: current working directory).
+    native : bool, optional
+        If True, write the profiles to .cfg directly instead of running prj
+        (see espr_files).
 
     Notes
     -----
@@ -388,6 +530,33 @@ def set_mgp(config, clm_file, gtp):
     print("\tSet ground temperature profiles to values corresponding to climate file "\
            + clm_file)
 
+    if native is True:
+        cfg_set_gtp(in_dir(cwd, config + ".cfg"), gtp)
+        return
+
+    # Run prj, execute commands, write scratch file.
+    run_espr(*set_mgp_script(config, clm_file, gtp), cwd=cwd)
+
+
+def set_mgp_script(config, clm_file, gtp):
+    r"""Return prj arguments, commands and scratch file name for set_mgp().
+
+    Parameters
+    ----------
+    config : str
+        Configuration file name without extension.
+    clm_file : str
+        Name of climate file, must be available as key in gtp.
+    gtp : Nested dict
+        Nested dict of available ground temperature profiles for climate 'clm_file' with
+        the following structure (the string keys *may not*(!) begin with whitespace!).
+
+    Returns
+    -------
+    Tuple (args, cmd, scratch) to be passed to run_espr().
+
+    """
+
     nprof=len(gtp)
 
     args = [
@@ -427,12 +596,10 @@ def set_mgp(config, clm_file, gtp):
 
     cmd = cmd.encode('utf-8')
 
-    f = open(config + "_set_mgp.scratch", "w")  # creates scratch file
+    return args, cmd, config + "_set_mgp.scratch"
 
-    run(args, input=cmd, stdout=f)  # runs prj (args), executes commands (cmd), writes scratch file (f)
 
-
-def set_spm(config, cnn_file, spm_file):
+def set_spm(config, cnn_file, spm_file, cwd=None):
     r"""Function to set special materials file.
 
     Parameters
@@ -443,11 +610,35 @@ def set_spm(config, cnn_file, spm_file):
         Connections file name without extension.
     spm_file : str
         Special materials file name without extension.
+    cwd : str | Path, optional
+        Model cfg directory to run in (default: current working directory).
 
     """
 
     print("\tSet spm file      : " + spm_file + ".spm")
 
+    # Run prj, execute commands, write scratch file.
+    run_espr(*set_spm_script(config, cnn_file, spm_file), cwd=cwd)
+
+
+def set_spm_script(config, cnn_file, spm_file):
+    r"""Return prj arguments, commands and scratch file name for set_spm().
+
+    Parameters
+    ----------
+    config : str
+        Configuration file name without extension.
+    cnn_file : str
+        Connections file name without extension.
+    spm_file : str
+        Special materials file name without extension.
+
+    Returns
+    -------
+    Tuple (args, cmd, scratch) to be passed to run_espr().
+
+    """
+
     # Setting SPM-file
     args = [
             "prj",
@@ -470,11 +661,10 @@ def set_spm(config, cnn_file, spm_file):
                 "-\n",  # exit Project Manager
                 encoding="utf-8")
 
-    f = open(config + "_set_" + spm_file + ".scratch", "w")  # creates scratch file
+    return args, cmd, config + "_set_" + spm_file + ".scratch"
 
-    run(args, input=cmd, stdout=f)  # runs prj (args), executes commands (cmd), writes scratch file (f)
 
-def set_afn(config, afn_file):
+def set_afn(config, afn_file, cwd=None):
     r"""Function to set air flow network file.
 
     Parameters
@@ -483,11 +673,33 @@ def set_afn(config, afn_file):
         Configuration file name without extension.
     afn_file : str
         Air flow network file name without extension.
+    cwd : str | Path, optional
+        Model cfg directory to run in (default: current working directory).
 
     """
 
     print("\tSet afn file      : " + afn_file + ".afn")
 
+    # Run prj, execute commands, write scratch file.
+    run_espr(*set_afn_script(config, afn_file), cwd=cwd)
+
+
+def set_afn_script(config, afn_file):
+    r"""Return prj arguments, commands and scratch file name for set_afn().
+
+    Parameters
+    ----------
+    config : str
+        Configuration file name without extension.
+    afn_file : str
+        Air flow network file name without extension.
+
+    Returns
+    -------
+    Tuple (args, cmd, scratch) to be passed to run_espr().
+
+    """
+
     # Setting AFN-file
     args = [
             "prj",
@@ -511,11 +723,10 @@ def set_afn(config, afn_file):
                 "-\n", # quit module
                 encoding="utf-8")
 
-    f = open(config + "_set_" + afn_file + ".scratch", "w")  # creates scratch file
+    return args, cmd, config + "_set_" + afn_file + ".scratch"
 
-    run(args, input=cmd, stdout=f)  # runs prj (args), executes commands (cmd), writes scratch file (f)
 
-def set_plant(config, plant, plant_db):
+def set_plant(config, plant, plant_db, cwd=None):
     r""" Script to change plant network file in .cfg.
 
     Parameters
@@ -526,6 +737,8 @@ def set_plant(config, plant, plant_db):
         Plant file name w/o extension.
     plant_db : str | Path
         Plant component database used (with path).
+    cwd : str | Path, optional
+        Model cfg directory to run in (default: current working directory).
 
     """
 
@@ -534,6 +747,28 @@ def set_plant(config, plant, plant_db):
 
     print("   In " + config + ", setting plant file to: " + plant + "... ")
 
+    # run prj (args), execute commands (cmd), write scratch file
+    run_espr(*set_plant_script(config, plant, plant_db), cwd=cwd)
+
+
+def set_plant_script(config, plant, plant_db):
+    r"""Return prj arguments, commands and scratch file name for set_plant().
+
+    Parameters
+    ----------
+    config : str
+        Configuration file name w/o extension.
+    plant : str
+        Plant file name w/o extension.
+    plant_db : str | Path
+        Plant component database used (with path).
+
+    Returns
+    -------
+    Tuple (args, cmd, scratch) to be passed to run_espr().
+
+    """
+
     args = [
             "prj",
             "-file", config + ".cfg",  # executable file
@@ -556,13 +791,10 @@ def set_plant(config, plant, plant_db):
                 "-\n",  # exit Project Manager
                 encoding="utf-8")
 
-    f = open(config + "_set_" + plant + ".scratch", "w")  # creates scratch file
-
-    # run prj (args), execute commands (cmd), write scratch file (f)
-    run(args, input=cmd, stdout=f)
+    return args, cmd, config + "_set_" + plant + ".scratch"
 
 
-def set_obs_dim(config, zone, obs, width, depth, height):
+def set_obs_dim(config, zone, obs, width, depth, height, cwd=None):
     r"""Set obstruction dimensions.
 
     Parameters
@@ -579,6 +811,8 @@ def set_obs_dim(config, zone, obs, width, depth, height):
         Depth of obstruction as string.
     height : str
         Height of obstruction as string.
+    cwd : str | Path, optional
+        Model cfg directory to run in (default: current working directory).
 
     """
 
@@ -586,6 +820,34 @@ def set_obs_dim(config, zone, obs, width, depth, height):
     print("\t\tObstruction" + obs + ", width, depth, height is " \
                             + width + ", " + depth + ", " + height + "m.")
 
+    # Run prj, execute commands, write scratch file.
+    run_espr(*set_obs_dim_script(config, zone, obs, width, depth, height), cwd=cwd)
+
+
+def set_obs_dim_script(config, zone, obs, width, depth, height):
+    r"""Return prj arguments, commands and scratch file name for set_obs_dim().
+
+    Parameters
+    ----------
+    config : str
+        Configuration file name (with relative path)
+    zone : str (tbc)
+        Zone name.
+    obs : int (tbc)
+        Obstruction entry
+    width : str
+        Width of obstruction as string.
+    depth : str
+        Depth of obstruction as string.
+    height : str
+        Height of obstruction as string.
+
+    Returns
+    -------
+    Tuple (args, cmd, scratch) to be passed to run_espr().
+
+    """
+
     # Setting lam for mat
     args = [
             "prj",
@@ -612,12 +874,11 @@ def set_obs_dim(config, zone, obs, width, depth, height):
                 "-\n", # quite module
                 encoding="utf-8")
 
-    f = open(config + "_set_" + zone + "_" + obs + "_obs.scratch", "w")  # creates scratch file
+    return args, cmd, config + "_set_" + zone + "_" + obs + "_obs.scratch"
 
-    run(args, input=cmd, stdout=f)  # runs prj (args), executes commands (cmd), writes scratch file (f)
 
-
-def set_con(config, cnn_file, old_con_str, old_class, old_con, new_class, new_con):
+def set_con(config, cnn_file, old_con_str, old_class, old_con, new_class, new_con,
+            cwd=None):
     r"""Function to change construction globally for all model zones.
 
     Parameters
@@ -636,6 +897,14 @@ def set_con(config, cnn_file, old_con_str, old_class, old_con, new_class, new_co
         New construction category, single character.
     new_con : str
         New construction entry, single character.
+    cwd : str | Path, optional
+        Model cfg directory to run in (default: current working directory).
+
+    Notes
+    -----
+    prj's confirmations are answered as they appear (see run_dialog). Within
+    a prj_session(), the confirmations are counted in the .geo files before
+    (see count_con).
 
     """
 
@@ -643,17 +912,109 @@ def set_con(config, cnn_file, old_con_str, old_class, old_con, new_class, new_co
     print("\t\tsearch for " + old_class + " / " + old_con)
     print("\t\treplace by " + new_class + " / " + new_con + " ... ", end='')
 
-    # Get number of .geo lines that contain construction "old_con_str"
-    # which corresponds to the number of changes to be accepted.
-    cmd='grep -c -w "' + old_con_str + '" ../zones/*.geo \
-             | cut -d ":" -f 2 \
-             | awk \'{c+=$1} END{print c+0}\''
+    dialog = set_con_dialog(config, cnn_file, old_class, old_con, new_class, new_con)
+
+    if in_session(dialog[0], cwd) is None:
+        # Run prj, answer its prompts, write scratch file.
+        run_dialog(*dialog, cwd=cwd)
+    else:
+        # Collected by prj_session(), number of changes counted in advance.
+        nc = count_con(old_con_str, cwd=cwd)
+        run_espr(*set_con_script(config, cnn_file, old_class, old_con, new_class, new_con,
+                                 nc), cwd=cwd)
+
+    print("done.")
+
+
+def count_con(old_con_str, cwd=None):
+    r"""Count surfaces in ../zones that use construction 'old_con_str'.
+
+    Parameters
+    ----------
+    old_con_str : str
+        Construction name.
+    cwd : str | Path, optional
+        Model cfg directory to run in (default: current working directory).
+
+    Returns
+    -------
+    Number of surfaces found, i.e. number of changes to be accepted by
+    set_con().
+
+    Notes
+    -----
+    The .geo files are parsed once and cached until they change (see
+    espr_files.con_index).
+
+    """
+
+    return len(con_surfaces(old_con_str, cwd=cwd))
+
+
+def set_con_dialog(config, cnn_file, old_class, old_con, new_class, new_con):
+    r"""Return prj arguments, dialog and scratch file name for set_con().
+
+    Parameters
+    ----------
+    config : str
+        Configuration file name without extension.
+    cnn_file : str
+        Connections file name without extension.
+    old_class : str
+        Old construction category, single character.
+    old_con : str
+        Old construction entry, single character.
+    new_class : str
+        New construction category, single character.
+    new_con : str
+        New construction entry, single character.
+
+    Returns
+    -------
+    Tuple (args, steps, scratch) to be passed to run_dialog().
+
+    """
+
+    args, cmd, scratch = set_con_script(config, cnn_file, old_class, old_con,
+                                        new_class, new_con, 0)
+    # Script without confirmations, these go before exiting menu and saving.
+    cmd = cmd.decode("utf-8")
+    split = cmd.index("-\n!\n")
+
+    steps = [(None, cmd[:split]),  # search & replace in all zones
+             ({APPLY_CON_PROMPT: "y\n"},  # apply construction to zone:con? [Y/N]
+              MENU_PROMPT),  # ... until back in the search & replace menu
+             (None, cmd[split:])]  # save model, quit
+
+    return args, steps, scratch
+
+
+def set_con_script(config, cnn_file, old_class, old_con, new_class, new_con, nc):
+    r"""Return prj arguments, commands and scratch file name for set_con().
+
+    Parameters
+    ----------
+    config : str
+        Configuration file name without extension.
+    cnn_file : str
+        Connections file name without extension.
+    old_class : str
+        Old construction category, single character.
+    old_con : str
+        Old construction entry, single character.
+    new_class : str
+        New construction category, single character.
+    new_con : str
+        New construction entry, single character.
+    nc : int
+        Number of changes to be accepted (see count_con()).
+
+    Returns
+    -------
+    Tuple (args, cmd, scratch) to be passed to run_espr().
+
+    """
 
-    wd=os.getcwd() # must be <modelpath>/cfg <<check?>>
-    
-    nc = run(cmd, shell=True, cwd=wd, capture_output=True).stdout.strip()
-    nc = nc.decode('utf-8')
-    
     # Changing construction
     args = [
             "prj",
@@ -678,7 +1039,7 @@ def set_con(config, cnn_file, old_con_str, old_class, old_con, new_class, new_co
                  encoding="utf-8")
 
     s = ''
-    for i in range(int(nc)):
+    for i in range(nc):
         s += cmd2.decode('utf-8')
     
     cmd2 = s.encode('utf-8')
@@ -697,14 +1058,11 @@ def set_con(config, cnn_file, old_con_str, old_class, old_con, new_class, new_co
 
     cmd = cmd.encode('utf-8')
 
-    f = open(config + "_set_roomcon_" + new_con + ".scratch", "w")  # creates scratch file
-
-    run(args, input=cmd, stdout=f)  # runs prj (args), executes commands (cmd), writes scratch file (f)
-
-    print("done.")
+    return args, cmd, config + "_set_roomcon_" + new_con + ".scratch"
 
 
-def set_ctl_temp_setpt(config, ctl_file, loop, h_setpoint, c_setpoint='99'):
+def set_ctl_temp_setpt(config, ctl_file, loop, h_setpoint, c_setpoint='99', cwd=None,
+                       native=False):
     """Function to change the setpoint temperature for building control.
 
     Parameters
@@ -719,6 +1077,11 @@ def set_ctl_temp_setpt(config, ctl_file, loop, h_setpoint, c_setpoint='99'):
         Heating setpoint temperature value as string
     c_setpoint : str (optional, default: '99')
         Cooling setpoint temperature value as string
+    cwd : str | Path, optional
+        Model cfg directory to run in (default: current working directory).
+    native : bool, optional
+        If True, edit the .ctl file directly instead of running prj (see
+        espr_files).
 
     """
 
@@ -726,7 +1089,39 @@ def set_ctl_temp_setpt(config, ctl_file, loop, h_setpoint, c_setpoint='99'):
     print("\t\theating to " + h_setpoint + " degC and for")
     print("\t\tcooling to " + c_setpoint + " degC")
     print("\t\tin control file " + ctl_file + ".ctl.")
+
+    if native is True:
+        ctl_set_setpoints(in_dir(cwd, "../ctl/" + ctl_file + ".ctl"), loop,
+                          h_setpoint, c_setpoint)
+        return
     
+    # Run prj (args), executes commands (cmd), writes scratch file.
+    run_espr(*set_ctl_temp_setpt_script(config, ctl_file, loop, h_setpoint, c_setpoint),
+             cwd=cwd)
+
+
+def set_ctl_temp_setpt_script(config, ctl_file, loop, h_setpoint, c_setpoint='99'):
+    r"""Return prj arguments, commands and scratch file name for set_ctl_temp_setpt().
+
+    Parameters
+    ----------
+    config : str
+         Configuration file name without extension.
+    ctl_file : str
+        Control file name w/o extension.
+    loop : int
+        Loop number to be edited (?)
+    h_setpoint : str
+        Heating setpoint temperature value as string
+    c_setpoint : str (optional, default: '99')
+        Cooling setpoint temperature value as string
+
+    Returns
+    -------
+    Tuple (args, cmd, scratch) to be passed to run_espr().
+
+    """
+
     # Set arguments w/ config file.
     args = [
             "prj",
@@ -757,12 +1152,8 @@ def set_ctl_temp_setpt(config, ctl_file, loop, h_setpoint, c_setpoint='99'):
                 "-\n"  # exit browse / edit / simulate
                 "-\n", # quite module (prj)
                 encoding="utf-8")
-    
-    # Create and open scratch file.
-    f = open(config + "_set_hc_setp" + ".scratch", "w")
-    
-    # Run prj (args), executes commands (cmd), writes scratch file (f).
-    run(args, input=cmd, stdout=f)
+
+    return args, cmd, config + "_set_hc_setp" + ".scratch"
 
 
 def list_of_files(path, ext):
@@ -788,7 +1179,7 @@ def list_of_files(path, ext):
     return (file_list)
 
 
-def remove_results(variant, run_clean=True):
+def remove_results(variant, run_clean=True, cwd=None):
     r"""Remove old results and/or contents files from the cfg-directory to avoid
     conflicts with "espr_sim.qa_report()" and "espr_sim.simulate()" or to avoid disc
     space issues for runs with many variants.
@@ -799,26 +1190,28 @@ def remove_results(variant, run_clean=True):
         Simulation variant of interest
     mode : str
         Toggle for 'clean-up' mode, i.e. removal of 
+    cwd : str | Path, optional
+        Model cfg directory to run in (default: current working directory).
 
     """
 
     if run_clean:
-        if os.path.exists("./" + variant + ".res"):
-                      os.remove("./" + variant + ".res")
-        if os.path.exists("./" + variant + ".mfr"):
-                      os.remove("./" + variant + ".mfr")
-        if os.path.exists("./" + variant + ".plr"):
-                      os.remove("./" + variant + ".plr")
-        if os.path.exists("./" + variant + ".contents"):
-            os.remove("./" + variant + ".contents")
+        if os.path.exists(in_dir(cwd, "./" + variant + ".res")):
+                      os.remove(in_dir(cwd, "./" + variant + ".res"))
+        if os.path.exists(in_dir(cwd, "./" + variant + ".mfr")):
+                      os.remove(in_dir(cwd, "./" + variant + ".mfr"))
+        if os.path.exists(in_dir(cwd, "./" + variant + ".plr")):
+                      os.remove(in_dir(cwd, "./" + variant + ".plr"))
+        if os.path.exists(in_dir(cwd, "./" + variant + ".contents")):
+            os.remove(in_dir(cwd, "./" + variant + ".contents"))
 
     if run_clean is False:
         # No space issue, only avoid qa_report issues.
-        if os.path.exists("./" + variant + ".contents"):
-            os.remove("./" + variant + ".contents")
+        if os.path.exists(in_dir(cwd, "./" + variant + ".contents")):
+            os.remove(in_dir(cwd, "./" + variant + ".contents"))
 
 
-def move_files(mode, variant):
+def move_files(mode, variant, cwd=None):
     r"""Rename H3K-output.csv to <variant>.csv, create subdirectories for
     current simulation set and move all corresponding files there.
     Also, do some cleanup.
@@ -829,42 +1222,47 @@ def move_files(mode, variant):
         Mode toggle for which files are to be moved.
     variant : str
         Simulation variant to be addressed.
+    cwd : str | Path, optional
+        Model cfg directory to run in (default: current working directory).
 
     """
 
+    vardir = in_dir(cwd, "./" + variant)
+    scrdir = in_dir(cwd, "./" + variant + "_scratchfiles")
+
     if (mode == 1) is True:
-        if os.path.isdir("./" + variant) is True:
-            shutil.rmtree("./" + variant)
-            os.mkdir("./" + variant)
+        if os.path.isdir(vardir) is True:
+            shutil.rmtree(vardir)
+            os.mkdir(vardir)
         else:
-            os.mkdir("./" + variant)
+            os.mkdir(vardir)
     
-        if os.path.isdir("./" + variant + "_scratchfiles") is True:
-            shutil.rmtree("./" + variant + "_scratchfiles")
-            os.mkdir("./" + variant + "_scratchfiles")
+        if os.path.isdir(scrdir) is True:
+            shutil.rmtree(scrdir)
+            os.mkdir(scrdir)
         else:
-            os.mkdir("./" + variant + "_scratchfiles")
+            os.mkdir(scrdir)
 
-    files = os.listdir(os.getcwd())
+    files = os.listdir(cwd or os.getcwd())
 
     for f in files:
         if f.startswith(variant + "."):
-            shutil.move(f, "./" + variant)
+            shutil.move(in_dir(cwd, f), vardir)
         elif f.endswith(".csv"):
-            os.rename(f, variant + ".csv")
-            shutil.move(variant + ".csv", "./" + variant)
+            os.rename(in_dir(cwd, f), in_dir(cwd, variant + ".csv"))
+            shutil.move(in_dir(cwd, variant + ".csv"), vardir)
         elif f.endswith(".dat"):
-            shutil.move(f, "./" + variant)
+            shutil.move(in_dir(cwd, f), vardir)
         elif f.endswith(".scratch"):
             if (mode == 1) is True:
-                shutil.move(f, "./" + variant + "_scratchfiles")
+                shutil.move(in_dir(cwd, f), scrdir)
             else:
-                shutil.move(f, "./" + variant + "_scratchfiles" + "/" + f + "2")
+                shutil.move(in_dir(cwd, f), scrdir + "/" + f + "2")
         # Cleanup.
         elif f.startswith("fort."):
-            os.remove(f)
+            os.remove(in_dir(cwd, f))
         elif f.startswith("graphic."):
-            os.remove(f)
+            os.remove(in_dir(cwd, f))
 
 #    if os.path.exists("./out.xml"):
 #        shutil.move("./out.xml", "./" + variant)
@@ -875,17 +1273,19 @@ def move_files(mode, variant):
 #    if os.path.exists("./out.dictionary"):
 #        shutil.move("./out.dictionary", "./" + variant)
 
-def move_clm_files(clm):
+def move_clm_files(clm, cwd=None):
     r"""Move climate file to subdirectory named 'clm_eval'.
 
     Parameters
     ----------
     clm : str | Path
         Climate file to be moved.
+    cwd : str | Path, optional
+        Model cfg directory to run in (default: current working directory).
 
     """
 
-    clmpath='./' + clm + '_eval'
+    clmpath = in_dir(cwd, './' + clm + '_eval')
 
     if os.path.isdir(clmpath) is True:
         shutil.rmtree(clmpath)
@@ -893,8 +1293,8 @@ def move_clm_files(clm):
     else:
         os.mkdir(clmpath)
 
-    files = os.listdir(os.getcwd())
+    files = os.listdir(cwd or os.getcwd())
 
     for f in files:
         if f.startswith(clm + "_"):
-            shutil.move(f, clmpath)
+            shutil.move(in_dir(cwd, f), clmpath)
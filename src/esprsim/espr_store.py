@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+
+# Last changed: 18/10/2026
+# Status: development
+#
+# Module contains following functions for a columnar store of variant results:
+#
+# def store_variant(store, variant, params=None, vardir=None, cwd=None):
+#          Convert extracted outputs of 'variant' into columns of the store.
+# def store_index(store):
+#          Return index of the store (variants, parameters, tables).
+# def store_variants(store, where=None):
+#          Return variants whose parameters match 'where'.
+# def store_load(store, variant, table, columns=None):
+#          Return (selected columns of) a table of a variant.
+# def store_query(store, table, column, where=None, agg=None):
+#          Return one column of a table for all matching variants.
+import os
+import json
+import glob
+import shutil
+import sqlite3
+from contextlib import contextmanager
+
+from .espr_run import in_dir
+from .espr_dat import read_dat
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+"""
+Module contains functions for a columnar store of the extracted outputs of
+simulation variants. Each .dat / .csv file of a variant (see move_files) is
+stored as a table, each column of a table as .npy file which is memory
+mapped when read:
+
+    <store>/index.db                    variants, parameters, tables (SQLite)
+    <store>/<variant>/<table>/c0000.npy first column, ...
+    <store>/<variant>/<table>/index.npy time index
+
+The table name is the file name without the variant name and extension,
+e.g. 'Wohnen_PMV_1.0_1.2_0.1' for 'var01_Wohnen_PMV_1.0_1.2_0.1.dat'.
+Storing a variant writes only its own row of the index, so campaigns with
+many variants and concurrent workers do not rewrite the index as a whole.
+
+Example usage.
+    store_variant("/data/study", "var01", {"ctl": "ctl_a", "lam": 0.04}, cwd=wd)
+    t_max = store_query("/data/study", "Wohnen_temp", "Wohnen db T",
+                        where={"ctl": "ctl_a"}, agg=np.max)
+"""
+
+INDEX = "index.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS variants (
+    variant  TEXT PRIMARY KEY,
+    params   TEXT NOT NULL,
+    tables   TEXT NOT NULL
+)
+"""
+
+
+def _index_open(store):
+    r"""Open (and create) the index database of the store."""
+
+    con = sqlite3.connect(os.path.join(store, INDEX), timeout=60)
+    con.execute("PRAGMA journal_mode=WAL")  # workers write concurrently
+    con.execute(_SCHEMA)
+
+    return con
+
+
+@contextmanager
+def _locked(store):
+    r"""Hold exclusive lock on the variant directories of the store (if supported)."""
+
+    os.makedirs(store, exist_ok=True)
+    with open(os.path.join(store, ".lock"), "w") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        yield
+
+
+def _table_name(variant, datfile):
+    r"""Return table name of output file 'datfile' of 'variant'."""
+
+    stem, ext = os.path.splitext(os.path.basename(datfile))
+    if stem.startswith(variant):
+        stem = stem[len(variant):]
+    return stem.lstrip("_") or ext.lstrip(".")
+
+
+def store_variant(store, variant, params=None, vardir=None, cwd=None):
+    r"""Convert extracted outputs of 'variant' into columns of the store.
+
+    Parameters
+    ----------
+    store : str | Path
+        Store directory.
+    variant : str
+        Simulation variant name.
+    params : dict, optional
+        Parameters of the variant (e.g. {"ctl": "ctl_a"}), used in queries.
+    vardir : str | Path, optional
+        Directory holding the outputs (default: '<cwd>/<variant>', see
+        move_files).
+    cwd : str | Path, optional
+        Model cfg directory (default: current working directory).
+
+    Returns
+    -------
+    List of table names stored.
+
+    """
+
+    import numpy as np
+    import pandas as pd
+
+    vardir = vardir or in_dir(cwd, variant)
+    files = sorted(glob.glob(os.path.join(vardir, "*.dat"))
+                   + glob.glob(os.path.join(vardir, "*.csv")))
+
+    # Columns are written to a temporary directory, replacing the variant as a whole.
+    tmp = os.path.join(store, "." + variant + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    tables = {}
+    for datfile in files:
+        table = _table_name(variant, datfile)
+        df = read_dat(datfile)
+        tdir = os.path.join(tmp, table)
+        os.makedirs(tdir)
+
+        columns = {}
+        for i, c in enumerate(df.columns):
+            name = "c%04d" % i
+            if isinstance(df[c].dtype, pd.CategoricalDtype):
+                np.save(os.path.join(tdir, name + ".npy"), df[c].cat.codes.to_numpy())
+                columns[c] = {"file": name, "categories": list(df[c].cat.categories)}
+            else:
+                np.save(os.path.join(tdir, name + ".npy"), df[c].to_numpy())
+                columns[c] = {"file": name}
+        np.save(os.path.join(tdir, "index.npy"), df.index.to_numpy())
+
+        tables[table] = {"rows": len(df), "index": df.index.name, "columns": columns}
+
+    with _locked(store):
+        shutil.rmtree(os.path.join(store, variant), ignore_errors=True)
+        if tables:
+            os.rename(tmp, os.path.join(store, variant))
+        con = _index_open(store)
+        with con:
+            con.execute("INSERT INTO variants (variant, params, tables) VALUES (?, ?, ?) "
+                        "ON CONFLICT(variant) DO UPDATE SET params = excluded.params, "
+                        "tables = excluded.tables",
+                        (variant, json.dumps(params or {}), json.dumps(tables)))
+        con.close()
+
+    print("\tStored            : " + variant + " (" + str(len(tables)) + " tables)")
+
+    return list(tables)
+
+
+def store_index(store):
+    r"""Return index of the store (variants, parameters, tables).
+
+    Parameters
+    ----------
+    store : str | Path
+        Store directory.
+
+    Returns
+    -------
+    Dict {variant: {"params": {...}, "tables": {table: {"rows": n,
+    "index": name, "columns": {column: {...}}}}}}.
+
+    """
+
+    return _index(store)
+
+
+def _index(store, variant=None):
+    r"""Return index of the store, of 'variant' only if given."""
+
+    if not os.path.exists(os.path.join(store, INDEX)):
+        return {}
+
+    con = _index_open(store)
+    if variant is None:
+        rows = con.execute("SELECT * FROM variants ORDER BY rowid").fetchall()
+    else:
+        rows = con.execute("SELECT * FROM variants WHERE variant = ?", (variant,)).fetchall()
+    con.close()
+
+    return {v: {"params": json.loads(p), "tables": json.loads(t)} for v, p, t in rows}
+
+
+def _match(index, where):
+    r"""Return variants of 'index' whose parameters match 'where'."""
+
+    if where is None:
+        return list(index)
+    if callable(where):
+        return [v for v in index if where(index[v]["params"])]
+    return [v for v in index
+            if all(index[v]["params"].get(k) == x for k, x in where.items())]
+
+
+def store_variants(store, where=None):
+    r"""Return variants whose parameters match 'where'.
+
+    Parameters
+    ----------
+    store : str | Path
+        Store directory.
+    where : dict | callable, optional
+        Parameter values to match (all variants if None), or function
+        called with the parameter dict returning True for matching variants.
+
+    Returns
+    -------
+    List of variant names.
+
+    """
+
+    return _match(store_index(store), where)
+
+
+def store_load(store, variant, table, columns=None):
+    r"""Return (selected columns of) a table of a variant.
+
+    Only the selected columns are read, memory mapped.
+
+    Parameters
+    ----------
+    store : str | Path
+        Store directory.
+    variant : str
+        Simulation variant name.
+    table : str
+        Table name.
+    columns : list of str, optional
+        Columns to read (default: all).
+
+    Returns
+    -------
+    DataFrame indexed by time.
+
+    """
+
+    return _load(store, variant, table, _index(store, variant)[variant]["tables"][table],
+                 columns)
+
+
+def _load(store, variant, table, meta, columns):
+    r"""Return columns of table as described by index entry 'meta'."""
+
+    import numpy as np
+    import pandas as pd
+
+    tdir = os.path.join(store, variant, table)
+
+    data = {}
+    for c in columns or meta["columns"]:
+        col = meta["columns"][c]
+        values = np.load(os.path.join(tdir, col["file"] + ".npy"), mmap_mode="r")
+        if "categories" in col:
+            values = pd.Categorical.from_codes(values, col["categories"])
+        data[c] = values
+
+    index = pd.Index(np.load(os.path.join(tdir, "index.npy"), mmap_mode="r"),
+                     name=meta["index"])
+
+    return pd.DataFrame(data, index=index, copy=False)
+
+
+def store_query(store, table, column, where=None, agg=None):
+    r"""Return one column of a table for all matching variants.
+
+    Parameters
+    ----------
+    store : str | Path
+        Store directory.
+    table : str
+        Table name.
+    column : str
+        Column name.
+    where : dict | callable, optional
+        Variant selection (see store_variants).
+    agg : callable, optional
+        Aggregation applied per variant (e.g. np.max).
+
+    Returns
+    -------
+    With 'agg': Series of aggregated values indexed by variant. Without:
+    dict {variant: Series}.
+
+    """
+
+    import pandas as pd
+
+    index = store_index(store)
+
+    result = {}
+    for variant in _match(index, where):
+        if table not in index[variant]["tables"]:
+            continue
+        series = _load(store, variant, table, index[variant]["tables"][table],
+                       [column])[column]
+        result[variant] = series if agg is None else agg(series.to_numpy())
+
+    if agg is not None:
+        return pd.Series(result, name=column, dtype=float)
+
+    return result
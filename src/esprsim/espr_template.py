@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+
+# Last changed: 18/10/2026
+# Status: development
+#
+# Module contains following functions for template-based generation of variants:
+#
+# def template_record(model, config, edits, template=None, probes=PROBES, cfg="cfg"):
+#          Record which model file tokens the parameters of 'edits' set.
+# def template_load(template):
+#          Load template written by template_record().
+# def template_files(template, values):
+#          Return model files of a variant, {file: lines}.
+# def template_variant(template, model, sandbox, values, edits=()):
+#          Create sandbox of a variant by patching the template files.
+import os
+import re
+import json
+import shutil
+import tempfile
+
+from .espr_files import read_file, write_file
+from .espr_sandbox import make_sandbox
+from .espr_cache import model_inputs, file_digest
+
+"""
+Module contains functions to generate model variants from a template
+instead of replaying prj edit sessions for every variant.
+
+A template is recorded once from a list of edits (as in campaign variant
+specifications, see espr_campaign) whose arguments contain parameters
+'{name}'. The edits are run in sandboxes with probe values for the
+parameters, the model files written are compared with each other: lines
+changed by the edits become template lines, the tokens changing with a
+parameter become its slots. A variant is then a sandbox of hard links to
+the base model with only the template files written, the slots filled with
+the variant's parameter values.
+
+Example usage.
+    edits = [("set_lam", (cfg, "a", "b", "{lam}")),
+             ("set_obs_dim", (cfg, "Wohnen", "a", "{w}", "1.0", "{h}"))]
+    template_record("../", cfg, edits, template="lam_obs.json")
+    for i, (lam, w, h) in enumerate(values):
+        wd = template_variant("lam_obs.json", "../", "/scratch/var%04d" % i,
+                              {"lam": lam, "w": w, "h": h})
+
+Parameters must enter the model files as written numbers (e.g.
+conductivities, absorptivities, dimensions, setpoints). Edits deriving
+other values from a parameter, or changing the structure of a file with it,
+cannot be templated; template_record() raises ValueError for these.
+"""
+
+# Probe values of the parameters (valid for conductivities, absorptivities,
+# dimensions and setpoints).
+PROBES = (0.3141, 0.7182)
+
+# Separators of the tokens of a model file line.
+_SEP = re.compile(r"([\s,]+)")
+
+# Loaded templates by path: (mtime, template).
+_templates = {}
+
+
+def _params(edits):
+    r"""Return names of the parameters '{name}' in 'edits', in order."""
+
+    names = []
+    for step in edits:
+        values = list(step[1]) + (list(step[2].values()) if len(step) > 2 else [])
+        for a in values:
+            m = re.fullmatch(r"\{(\w+)\}", a) if isinstance(a, str) else None
+            if m is not None and m.group(1) not in names:
+                names.append(m.group(1))
+    return names
+
+
+def _fill(edits, values):
+    r"""Return 'edits' with parameters replaced by 'values'."""
+
+    def fill(a):
+        m = re.fullmatch(r"\{(\w+)\}", a) if isinstance(a, str) else None
+        return a if m is None else str(values[m.group(1)])
+
+    filled = []
+    for step in edits:
+        s = (step[0], tuple(fill(a) for a in step[1]))
+        if len(step) > 2:
+            s += ({k: fill(a) for k, a in step[2].items()},)
+        filled.append(s)
+    return filled
+
+
+def _probe(model, root, config, edits, values, cfg):
+    r"""Run edits with parameter 'values', return changed files {name: lines}.
+
+    Deleted files are returned as None.
+    """
+
+    from .espr_campaign import call_steps
+
+    sandbox = os.path.join(root, "probe")
+    wd = make_sandbox(model, sandbox, edits=[e[0] for e in edits], cfg=cfg)
+    try:
+        call_steps(_fill(edits, values), wd)
+        base = {n: p for n, p in model_inputs(config, cwd=os.path.join(model, cfg))
+                if not os.path.isabs(n)}
+        new = {n: p for n, p in model_inputs(config, cwd=wd) if not os.path.isabs(n)}
+        changed = {n: read_file(p) for n, p in new.items()
+                   if n not in base or file_digest(p) != file_digest(base[n])}
+        changed.update({n: None for n in base if n not in new})
+    finally:
+        shutil.rmtree(sandbox, ignore_errors=True)
+
+    return changed
+
+
+def _slot_format(token, value):
+    r"""Return format of number 'token' written for 'value', None if it is not."""
+
+    try:
+        x = float(token)
+    except ValueError:
+        return None
+    if "." in token and "e" not in token.lower():
+        dec = len(token.split(".")[1])
+        if abs(x - value) <= 0.5 * 10**-dec + 1e-12:
+            return ".%df" % dec
+    elif abs(x - value) <= 1e-6 * abs(value):
+        return "g"
+    return None
+
+
+def template_record(model, config, edits, template=None, probes=PROBES, cfg="cfg"):
+    r"""Record which model file tokens the parameters of 'edits' set.
+
+    The edits are run 2 + (number of parameters) times in temporary
+    sandboxes next to the model: twice with all parameters set to the
+    first probe value (lines differing between these runs, e.g. dates, are
+    not slots), then once per parameter set to the second probe value.
+
+    Parameters
+    ----------
+    model : str | Path
+        Root directory of the ESP-r base model.
+    config : str
+        Configuration file name without extension.
+    edits : list of tuple
+        Edits as (function name, args[, kwargs]), see espr_campaign, with
+        parameters given as '{name}' arguments.
+    template : str | Path, optional
+        JSON file the template is written to.
+    probes : tuple of float, optional
+        Two probe values for the parameters (default: PROBES). They must be
+        valid for all edits and written distinguishable by prj.
+    cfg : str, optional
+        Name of the cfg directory of the model (default: 'cfg').
+
+    Returns
+    -------
+    Template dict with keys 'config', 'cfg', 'edits', 'params' and 'files'
+    ({file: {"lines": [...], "slots": [[line, token, param, format]]}}, or
+    {file: {"delete": True}} for files removed by the edits).
+
+    """
+
+    model = os.path.abspath(model)
+    names = _params(edits)
+    a = {n: probes[0] for n in names}
+
+    root = tempfile.mkdtemp(prefix=".esprsim_probe_", dir=os.path.dirname(model))
+    try:
+        run_a = _probe(model, root, config, edits, a, cfg)
+        run_a2 = _probe(model, root, config, edits, a, cfg)
+        run_b = {n: _probe(model, root, config, edits, dict(a, **{n: probes[1]}), cfg)
+                 for n in names}
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    files = {}
+    for name in sorted(set(run_a).union(*run_b.values())):
+        if name in run_a and run_a[name] is None:
+            files[name] = {"delete": True}
+            continue
+        lines = run_a.get(name) or read_file(os.path.join(model, name))
+        again = run_a2.get(name) or read_file(os.path.join(model, name))
+        volatile = {i for i, (x, y) in enumerate(zip(lines, again)) if x != y}
+
+        slots = []
+        for n in names:
+            other = run_b[n].get(name) or read_file(os.path.join(model, name))
+            if len(other) != len(lines):
+                raise ValueError(name + " changes structure with parameter " + n + ".")
+            for i, (x, y) in enumerate(zip(lines, other)):
+                if x == y or i in volatile:
+                    continue
+                tx, ty = _SEP.split(x), _SEP.split(y)
+                if len(tx) != len(ty):
+                    raise ValueError(name + " line " + str(i + 1)
+                                     + " changes structure with parameter " + n + ".")
+                for j, (u, v) in enumerate(zip(tx, ty)):
+                    if u == v:
+                        continue
+                    fmt = _slot_format(u, probes[0])
+                    if fmt is None or _slot_format(v, probes[1]) is None:
+                        raise ValueError(name + " line " + str(i + 1) + ": '" + u
+                                         + "' is derived from parameter " + n + ".")
+                    slots.append([i, j, n, fmt])
+
+        files[name] = {"lines": lines, "slots": sorted(slots)}
+
+    result = {"config": config, "cfg": cfg, "edits": [list(e) for e in edits],
+              "params": names, "files": files}
+
+    nslots = sum(len(f.get("slots", ())) for f in files.values())
+    print("\tTemplate          : " + str(len(names)) + " parameters, "
+          + str(len(files)) + " files, " + str(nslots) + " slots")
+
+    if template is not None:
+        write_file(template, [json.dumps(result, indent=1)])
+
+    return result
+
+
+def template_load(template):
+    r"""Load template written by template_record().
+
+    Templates are cached per process until the file changes.
+
+    Parameters
+    ----------
+    template : str | Path | dict
+        Template file (or template dict, returned as is).
+
+    Returns
+    -------
+    Template dict.
+
+    """
+
+    if isinstance(template, dict):
+        return template
+
+    mtime = os.stat(template).st_mtime_ns
+    cached = _templates.get(template)
+    if cached is None or cached[0] != mtime:
+        with open(template, "r") as f:
+            cached = (mtime, json.load(f))
+        _templates[template] = cached
+
+    return cached[1]
+
+
+def template_files(template, values):
+    r"""Return model files of a variant, {file: lines}.
+
+    Parameters
+    ----------
+    template : str | Path | dict
+        Template (file), see template_record().
+    values : dict
+        Parameter values {name: value}.
+
+    Returns
+    -------
+    Dict {file name relative to the model root: list of lines, None for
+    files to be deleted}.
+
+    """
+
+    template = template_load(template)
+    missing = [n for n in template["params"] if n not in values]
+    if missing:
+        raise ValueError("No value for template parameter(s) " + ", ".join(missing) + ".")
+
+    files = {}
+    for name, entry in template["files"].items():
+        if entry.get("delete", False):
+            files[name] = None
+            continue
+        lines = list(entry["lines"])
+        for i, j, n, fmt in entry["slots"]:
+            tokens = _SEP.split(lines[i])
+            tokens[j] = format(float(values[n]), fmt).rjust(len(tokens[j]))
+            lines[i] = "".join(tokens)
+        files[name] = lines
+
+    return files
+
+
+def template_variant(template, model, sandbox, values, edits=()):
+    r"""Create sandbox of a variant by patching the template files.
+
+    All files are hard linked to the base model (see make_sandbox), except
+    the template files, which are written with the variant's values.
+
+    Parameters
+    ----------
+    template : str | Path | dict
+        Template (file), see template_record().
+    model : str | Path
+        Root directory of the ESP-r base model the template was recorded on.
+    sandbox : str | Path
+        Sandbox directory to be created.
+    values : dict
+        Parameter values {name: value}.
+    edits : list of str, optional
+        Names of further edit functions applied to the sandbox (see
+        make_sandbox).
+
+    Returns
+    -------
+    Path of the cfg directory in the sandbox, to be passed as 'cwd'.
+
+    """
+
+    template = template_load(template)
+    files = template_files(template, values)
+
+    wd = make_sandbox(model, sandbox, edits=edits, cfg=template["cfg"])
+    root = os.path.dirname(wd)
+
+    for name, lines in files.items():
+        path = os.path.join(root, name)
+        if lines is None:
+            if os.path.exists(path):
+                os.remove(path)
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_file(path, lines)  # replaces hard link, base model is unchanged
+
+    return wd
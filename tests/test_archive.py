@@ -0,0 +1,116 @@
+import os
+import lzma
+
+import pytest
+
+from esprsim import espr_archive
+
+
+@pytest.fixture
+def results(tmp_path):
+    cwd = tmp_path / "cfg"
+    (cwd / "var01").mkdir(parents=True)
+    (cwd / "var01_scratchfiles").mkdir()
+    data = {"var01.res": os.urandom(2500) + bytes(3000),
+            "var01.mfr": b"mfr" * 100,
+            "scratch/var01_bps.scratch": b"bps output\n" * 20}
+    (cwd / "var01" / "var01.res").write_bytes(data["var01.res"])
+    (cwd / "var01.mfr").write_bytes(data["var01.mfr"])
+    (cwd / "var01_scratchfiles" / "var01_bps.scratch").write_bytes(
+        data["scratch/var01_bps.scratch"])
+    return cwd, data
+
+
+def test_archive_round_trip(tmp_path, results):
+    cwd, data = results
+
+    path = espr_archive.archive_variant(tmp_path / "archive", "var01", cwd=cwd, block=1000)
+
+    assert path == os.path.join(tmp_path / "archive", "var01.esa")
+    assert not (cwd / "var01" / "var01.res").exists()
+    assert not (cwd / "var01.mfr").exists()
+    assert not (cwd / "var01_scratchfiles").exists()
+
+    index = espr_archive.archive_index(path)
+    assert set(index) == set(data)
+    assert index["var01.res"]["size"] == 5500
+    assert [fr[2] for fr in index["var01.res"]["frames"]] == [1000] * 5 + [500]
+    for member, content in data.items():
+        assert espr_archive.archive_read(path, member) == content
+
+    dest = tmp_path / "restored"
+    dest.mkdir()
+    written = espr_archive.archive_extract(path, ["var01.res", "scratch/var01_bps.scratch"],
+                                           dest=dest)
+    assert sorted(os.path.basename(w) for w in written) == ["var01.res",
+                                                            "var01_bps.scratch"]
+    assert (dest / "var01.res").read_bytes() == data["var01.res"]
+    assert (dest / "var01_bps.scratch").read_bytes() == data["scratch/var01_bps.scratch"]
+
+
+def test_archive_partial_read(tmp_path, results, monkeypatch):
+    cwd, data = results
+    path = espr_archive.archive_variant(tmp_path / "archive", "var01", cwd=cwd,
+                                        remove=False, block=1000)
+    assert (cwd / "var01" / "var01.res").exists()
+
+    calls = []
+    decompress = lzma.decompress
+    monkeypatch.setattr(lzma, "decompress", lambda *a, **k: calls.append(1)
+                        or decompress(*a, **k))
+
+    # across the boundary of blocks 2 and 3: only these are decompressed
+    assert espr_archive.archive_read(path, "var01.res", 1900, 200) == \
+        data["var01.res"][1900:2100]
+    assert len(calls) == 2
+
+    assert espr_archive.archive_read(path, "var01.res", 5400) == data["var01.res"][5400:]
+    assert espr_archive.archive_read(path, "var01.res", 3000, 0) == b""
+    assert espr_archive.archive_read(path, "var01.res", 2000, 1000) == \
+        data["var01.res"][2000:3000]
+
+
+def test_archive_bad_file(tmp_path):
+    (tmp_path / "other.esa").write_bytes(b"not an archive" * 10)
+
+    with pytest.raises(ValueError):
+        espr_archive.archive_index(tmp_path / "other.esa")
+
+
+def test_archive_failure_leaves_no_tmp(tmp_path, results, monkeypatch):
+    cwd, data = results
+    compress = lzma.compress
+    calls = []
+
+    def failing(*args, **kwargs):
+        calls.append(1)
+        if len(calls) > 2:
+            raise OSError(28, "No space left on device")
+        return compress(*args, **kwargs)
+
+    monkeypatch.setattr(lzma, "compress", failing)
+    with pytest.raises(OSError):
+        espr_archive.archive_variant(tmp_path / "archive", "var01", cwd=cwd, block=1000)
+
+    assert os.listdir(tmp_path / "archive") == []
+    assert (cwd / "var01" / "var01.res").read_bytes() == data["var01.res"]
+
+
+def test_extract_failure_leaves_no_tmp(tmp_path, results, monkeypatch):
+    cwd, data = results
+    path = espr_archive.archive_variant(tmp_path / "archive", "var01", cwd=cwd, block=1000)
+    dest = tmp_path / "restored"
+    dest.mkdir()
+    archive_iter = espr_archive.archive_iter
+
+    def failing(path, member, *args, **kwargs):
+        for i, chunk in enumerate(archive_iter(path, member, *args, **kwargs)):
+            if i == 2:
+                raise lzma.LZMAError("Corrupt input data")
+            yield chunk
+
+    monkeypatch.setattr(espr_archive, "archive_iter", failing)
+    with pytest.raises(lzma.LZMAError):
+        espr_archive.archive_extract(path, ["var01.res"], dest=dest)
+
+    assert os.listdir(dest) == []
@@ -0,0 +1,147 @@
+import time
+import sys
+import asyncio
+
+import pytest
+
+from esprsim import espr_async, espr_cache
+
+
+def test_simulate_async_cache_does_not_block_loop(tmp_path, monkeypatch):
+    wd = tmp_path / "model" / "cfg"
+    wd.mkdir(parents=True)
+    (wd / "m.cfg").write_text("*root m\n")
+    args = (1, "m", "v1", "4", "1", "1", "1", "31", "12", "7")
+
+    # slow model hashing, e.g. large model on network storage
+    model_inputs = espr_cache.model_inputs
+
+    def slow_model_inputs(config, cwd=None, exclude=()):
+        time.sleep(0.3)
+        return model_inputs(config, cwd=cwd, exclude=exclude)
+
+    monkeypatch.setattr(espr_cache, "model_inputs", slow_model_inputs)
+
+    cache = tmp_path / "cache"
+    key = espr_cache.cache_key("m", args[:1] + args[3:] + (False, "*", "*"), cwd=wd)
+    (wd / "v0.res").write_bytes(b"results")
+    espr_cache.cache_store(cache, key, "v0", cwd=wd)
+
+    async def ticker():
+        ticks = 0
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+            yield ticks
+
+    async def main():
+        ticks = []
+
+        async def count():
+            async for n in ticker():
+                ticks.append(n)
+
+        counter = asyncio.create_task(count())
+        result = await espr_async.simulate_async(*args, cwd=wd, cache=cache)
+        counter.cancel()
+        return result, len(ticks)
+
+    result, ticks = asyncio.run(main())
+
+    assert result is None  # restored from cache
+    assert (wd / "v1.res").read_bytes() == b"results"
+    assert ticks >= 10  # event loop kept running while hashing
+
+
+# Fake prj: confirmations with silent computations in between, then its menu.
+FAKE_PRJ = """\
+import sys, time
+answers = []
+def ask(prompt):
+    sys.stdout.write(prompt)
+    sys.stdout.flush()
+    answers.append(sys.stdin.readline().strip())
+ask(" Search & replace\\n a zones\\n - exit this menu\\n")
+for zone in ("Wohnen", "Bad"):
+    time.sleep(0.3)
+    ask(" Apply construction to " + zone + ":wall? [Y/N]\\n")
+ask(" Composition\\n ! save model\\n - exit this menu\\n")
+open("answers.txt", "w").write(" ".join(answers))
+"""
+
+
+def test_run_dialog_async(tmp_path):
+    from esprsim.espr_sim import APPLY_CON_PROMPT, MENU_PROMPT
+
+    (tmp_path / "prj.py").write_text(FAKE_PRJ)
+    steps = [(None, "*\n"),
+             ({APPLY_CON_PROMPT: "y\n"}, MENU_PROMPT),
+             (None, "-\n")]
+
+    async def main():
+        ticks = 0
+
+        async def count():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        counter = asyncio.create_task(count())
+        p = await espr_async.run_dialog_async([sys.executable, "prj.py"], steps,
+                                              "prj.scratch", cwd=tmp_path, prompt_timeout=5)
+        counter.cancel()
+        return p, ticks
+
+    p, ticks = asyncio.run(main())
+
+    assert p.returncode == 0
+    assert (tmp_path / "answers.txt").read_text() == "* y y -"
+    assert ticks >= 30  # event loop kept running during the dialog
+
+
+def test_run_dialog_async_timeout(tmp_path):
+    (tmp_path / "prj.py").write_text("import time\nprint('working', flush=True)\n"
+                                     "time.sleep(30)\nopen('done.txt', 'w')\n")
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(espr_async.run_dialog_async([sys.executable, "prj.py"],
+                                                [(r"Apply construction", "y\n")],
+                                                "prj.scratch", cwd=tmp_path, timeout=0.5))
+    time.sleep(0.2)
+    assert not (tmp_path / "done.txt").exists()
+
+
+def test_dialog_edits_async(monkeypatch):
+    from esprsim import espr_sim, espr_ms_sim
+
+    calls = []
+
+    async def fake_dialog(args, steps, scratch, cwd=None, timeout=None):
+        calls.append((args, steps, scratch))
+
+    def no_count(*args, **kwargs):
+        raise AssertionError("count_con called")
+
+    monkeypatch.setattr(espr_async, "run_dialog_async", fake_dialog)
+    monkeypatch.setattr(espr_sim, "count_con", no_count)
+
+    async def main():
+        await espr_async.set_con_async("m", "m", "old", "a", "b", "c", "d")
+        await espr_async.set_corecon_async("m", "m", "a", "b", "c", "d")
+        await espr_async.set_lam_w6CFC_async("m", "a", "b", "0.04")
+
+    asyncio.run(main())
+
+    assert calls == [espr_sim.set_con_dialog("m", "m", "a", "b", "c", "d"),
+                     espr_ms_sim.set_corecon_dialog("m", "m", "a", "b", "c", "d"),
+                     espr_ms_sim.set_lam_w6CFC_dialog("m", "a", "b", "0.04")]
+
+
+def test_set_clm_async_timeout(monkeypatch):
+    from esprsim import espr_sim
+
+    monkeypatch.setattr(espr_sim, "set_clm", lambda *a, **k: time.sleep(1))
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(espr_async.set_clm_async("m", "x.clm", timeout=0.1))
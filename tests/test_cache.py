@@ -0,0 +1,131 @@
+import os
+
+import pytest
+
+from esprsim import espr_cache
+
+
+CFG = """\
+*CONFIGURATION4.0
+# ESP-r system configuration defined by file
+# m.cfg written by ESP-r version 13.3.17
+*date Mon Oct 18 10:00:00 2026  # latest file modification
+*root m
+*zon   1   # reference for Wohnen
+*geo ../zones/Wohnen.geo
+"""
+
+GEO = """\
+*Geometry 1.1,GEN,Wohnen  # tag version, format, zone name
+*date Mon Oct 18 10:00:00 2026  # latest file modification
+*vertex,0.0,0.0,0.0  #   1
+"""
+
+
+@pytest.fixture
+def model(tmp_path):
+    (tmp_path / "cfg").mkdir()
+    (tmp_path / "zones").mkdir()
+    (tmp_path / "tmp").mkdir()
+    (tmp_path / "cfg" / "m.cfg").write_text(CFG)
+    (tmp_path / "zones" / "Wohnen.geo").write_text(GEO)
+    return tmp_path / "cfg"
+
+
+def key(wd):
+    return espr_cache.cache_key("m", (1, "4", "1", "1", "1", "31", "12", "7"), cwd=wd)
+
+
+def test_model_inputs(model):
+    (model / "v1.res").write_text("res")
+    (model.parent / "tmp" / "v1.res").write_text("res")
+
+    names = [n for n, p in espr_cache.model_inputs("m", cwd=model)]
+
+    assert names == ["cfg/m.cfg", "zones/Wohnen.geo"]
+
+
+def test_cache_key_ignores_prj_date_lines(model):
+    k = key(model)
+
+    for f in (model / "m.cfg", model.parent / "zones" / "Wohnen.geo"):
+        f.write_text(f.read_text().replace("Mon Oct 18 10:00:00", "Tue Oct 19 11:30:12"))
+    (model / "m.cfg").write_text((model / "m.cfg").read_text().replace(
+        "version 13.3.17", "version 13.3.18"))
+
+    assert key(model) == k
+
+
+def test_cache_key_changes_with_contents(model):
+    k = key(model)
+
+    geo = model.parent / "zones" / "Wohnen.geo"
+    geo.write_text(geo.read_text().replace("*vertex,0.0", "*vertex,1.0"))
+    assert key(model) != k
+
+    assert espr_cache.cache_key("m", (1, "4", "1", "1", "1", "31", "12", "14"),
+                                cwd=model) != key(model)
+
+
+def test_cache_store_restore(model, tmp_path):
+    cache = tmp_path / "cache"
+    (model / "v1.res").write_bytes(b"results")
+    (model / "v1_bps.scratch").write_text("CPU time: 1s\n")
+    k = key(model)
+
+    espr_cache.cache_store(cache, k, "v1", cwd=model)
+    assert espr_cache.cache_restore(cache, k, "v2", cwd=model) is True
+
+    assert (model / "v2.res").read_bytes() == b"results"
+    assert (model / "v2_bps.scratch").read_text() == "CPU time: 1s\n"
+    assert espr_cache.cache_restore(cache, "0" * 64, "v3", cwd=model) is False
+
+
+def test_cache_restore_leaves_no_partial_results(model, tmp_path, monkeypatch):
+    cache = tmp_path / "cache"
+    (model / "v1.res").write_bytes(b"results")
+    (model / "v1.mfr").write_bytes(b"flows")
+    k = key(model)
+    espr_cache.cache_store(cache, k, "v1", cwd=model)
+
+    # entry evicted by another process while restoring
+    copy_file = espr_cache.copy_file
+
+    def evicting_copy(src, dst):
+        if src.endswith("mfr"):
+            raise FileNotFoundError(src)
+        copy_file(src, dst)
+
+    monkeypatch.setattr(espr_cache, "copy_file", evicting_copy)
+
+    assert espr_cache.cache_restore(cache, k, "v2", cwd=model) is False
+    assert sorted(f for f in os.listdir(model) if f.startswith("v2")) == []
+
+
+def test_cache_evict(model, tmp_path):
+    cache = tmp_path / "cache"
+    keys = []
+    for i in range(3):
+        (model / "v1.res").write_bytes(b"x" * 1000)
+        keys.append("%064x" % i)
+        espr_cache.cache_store(cache, keys[-1], "v1", cwd=model, max_size=2500)
+        os.utime(cache / keys[-1][:2] / keys[-1], (i, i))
+
+    assert not (cache / keys[0][:2] / keys[0]).exists()
+    assert (cache / keys[2][:2] / keys[2]).exists()
+
+
+def test_model_inputs_exclude(model):
+    db = model.parent / "campaign.db"
+    db.write_text("jobs")
+    (model.parent / "runs").mkdir()
+    (model.parent / "runs" / "v1.res").write_text("res")
+    (model.parent / "zones" / "esprsim_runs.jsonl").write_text("{}\n")
+    k = key(model)
+
+    names = [n for n, p in espr_cache.model_inputs("m", cwd=model,
+                                                    exclude=[db, model.parent / "runs"])]
+
+    assert names == ["cfg/m.cfg", "zones/Wohnen.geo"]
+    assert espr_cache.cache_key("m", (1, "4", "1", "1", "1", "31", "12", "7"), cwd=model,
+                                exclude=[db, model.parent / "runs"]) != k
@@ -0,0 +1,291 @@
+import numpy as np
+import pytest
+
+from esprsim import espr_campaign
+from esprsim.espr_dat import read_dat
+
+
+def spec(dms=1, FD="1", FM="1", TD="31", TM="1", BTSTEP="4", PTSTEP="1", PP="7"):
+    return {"variant": "var01",
+            "simulate": {"config": "test", "dms": dms, "BTSTEP": BTSTEP, "PTSTEP": PTSTEP,
+                         "FD": FD, "FM": FM, "TD": TD, "TM": TM, "PP": PP}}
+
+
+def test_split_period_months():
+    assert espr_campaign.split_period("15", "1", "10", "3") == [
+        ("15", "1", "31", "1"), ("1", "2", "28", "2"), ("1", "3", "10", "3")]
+    assert espr_campaign.split_period("3", "5", "9", "5") == [("3", "5", "9", "5")]
+
+
+def test_split_period_chunks():
+    assert espr_campaign.split_period("1", "1", "31", "12", 2) == [
+        ("1", "1", "1", "7"), ("2", "7", "31", "12")]
+    # not more chunks than days
+    assert espr_campaign.split_period("1", "1", "3", "1", 5) == [
+        ("1", "1", "1", "1"), ("2", "1", "2", "1"), ("3", "1", "3", "1")]
+
+    periods = espr_campaign.split_period("1", "1", "31", "12", 12)
+    days = [espr_campaign._day_of_year(TD, TM) - espr_campaign._day_of_year(FD, FM) + 1
+            for FD, FM, TD, TM in periods]
+    assert sum(days) == 365 and max(days) - min(days) <= 1
+
+
+def test_chunk_specs():
+    s = dict(spec(TM="3"), extract=[("res_PMV", ("var01", "Wohnen", "1.0"))])
+
+    chunks = espr_campaign.chunk_specs(s, warmup="2")
+
+    assert [c["variant"] for c in chunks] == ["var01_c01", "var01_c02", "var01_c03"]
+    assert chunks[1]["extract"] == [("res_PMV", ("var01_c02", "Wohnen", "1.0"))]
+    assert [c["simulate"]["PP"] for c in chunks] == ["7", "2", "2"]
+    assert (chunks[2]["simulate"]["FD"], chunks[2]["simulate"]["FM"]) == ("1", "3")
+    assert s["simulate"]["TM"] == "3"  # not modified
+
+
+def write_chunk(path, rows):
+    lines = ["#Wohnen PMV", "#Time\tPMV\tPPD"]
+    lines += ["%.4f\t%.3f\t%.3f" % row for row in rows]
+    path.write_text("\n".join(lines) + "\n")
+
+
+def test_stitch_dat(tmp_path):
+    write_chunk(tmp_path / "c01.dat", [(1.0, -0.5, 10.2), (1.5, -0.4, 8.3)])
+    write_chunk(tmp_path / "c02.dat", [(2.0, -0.2, 5.8)])
+    write_chunk(tmp_path / "c03.dat", [(2.5, 0.1, 5.2), (3.0, 0.3, 6.9)])
+
+    espr_campaign.stitch_dat([tmp_path / f for f in ("c01.dat", "c02.dat", "c03.dat")],
+                             tmp_path / "all.dat")
+
+    lines = (tmp_path / "all.dat").read_text().splitlines()
+    assert lines[:2] == ["#Wohnen PMV", "#Time\tPMV\tPPD"]
+    assert len(lines) == 2 + 5
+    df = read_dat(tmp_path / "all.dat")
+    np.testing.assert_allclose(df.index, [1.0, 1.5, 2.0, 2.5, 3.0])
+    np.testing.assert_allclose(df["PMV"], [-0.5, -0.4, -0.2, 0.1, 0.3], atol=1e-6)
+
+
+def test_config_zones(tmp_path):
+    (tmp_path / "cfg").mkdir()
+    (tmp_path / "cfg" / "test.cfg").write_text(
+        "*zon   1   # reference for Wohnen\n*geo ../zones/Wohnen.geo  # geometry\n*zend\n"
+        "*zon   2   # reference for Bad\n*geo ../zones/Bad.geo  # geometry\n*zend\n\n")
+    (tmp_path / "cfg" / "empty.cfg").write_text("*root empty\n")
+
+    assert espr_campaign.config_zones(tmp_path, "test") == 2
+    assert espr_campaign.config_zones(tmp_path, "empty") == 1
+
+
+def test_runtime_model(tmp_path):
+    # (31 days + 7 start-up days) * 24 h * 4 time steps * 2 zones
+    assert espr_campaign.runtime_work(spec(), 2) == 38 * 24 * 4 * 2
+    assert espr_campaign.runtime_work(spec(dms=3, PTSTEP="5"), 2) == 38 * 24 * 4 * 5 * 2
+
+    path = tmp_path / "runtime.json"
+    rtm = espr_campaign.runtime_load(path)
+    assert rtm == {}
+    w = espr_campaign.runtime_work(spec(), 2)
+    assert espr_campaign.runtime_estimate(rtm, spec(), 2) == \
+        espr_campaign.RUNTIME_PRIOR[1] * w
+
+    # time proportional to work: factor fitted exactly
+    espr_campaign.runtime_update(rtm, spec(), 2, 0.01 * w)
+    espr_campaign.runtime_update(rtm, spec(TM="3"), 2,
+                                 0.01 * espr_campaign.runtime_work(spec(TM="3"), 2))
+    assert rtm["1"]["n"] == 2
+    np.testing.assert_allclose(espr_campaign.runtime_estimate(rtm, spec(TM="6"), 1),
+                               0.01 * espr_campaign.runtime_work(spec(TM="6"), 1))
+    # other domain modes keep their prior
+    assert espr_campaign.runtime_estimate(rtm, spec(dms=2), 1) == \
+        espr_campaign.RUNTIME_PRIOR[2] * espr_campaign.runtime_work(spec(dms=2), 1)
+
+    import json
+    path.write_text(json.dumps(rtm))
+    assert espr_campaign.runtime_load(path) == rtm
+
+
+def test_boundary_report(tmp_path):
+    write_chunk(tmp_path / "c01.dat", [(1.0, -0.5, 10.0), (1.5, -0.4, 10.0), (2.0, -0.3, 10.0)])
+    write_chunk(tmp_path / "c02.dat", [(2.5, 0.7, 10.0), (3.0, 0.8, 10.0)])
+
+    report = espr_campaign.boundary_report([tmp_path / "c01.dat", tmp_path / "c02.dat"])
+
+    pmv = report[report["column"] == "PMV"].iloc[0]
+    assert pmv["boundary"] == 2.5
+    np.testing.assert_allclose([pmv["jump"], pmv["typical"], pmv["ratio"]],
+                               [1.0, 0.1, 10.0], rtol=1e-4)
+    ppd = report[report["column"] == "PPD"].iloc[0]
+    assert ppd["jump"] == 0.0 and ppd["ratio"] == 0.0
+
+
+def test_time_series_detection(tmp_path):
+    write_chunk(tmp_path / "c01.dat", [(1.0, -0.5, 10.2), (1.5, -0.4, 8.3)])
+    write_chunk(tmp_path / "c02.dat", [(2.0, -0.2, 5.8)])
+    write_chunk(tmp_path / "r01.dat", [(1.0, -0.5, 10.2)])  # time restarting
+    (tmp_path / "s01.dat").write_text("Zone,Heating,Cooling\nWohnen,10.5,0.0\n")
+
+    series = espr_campaign._time_series
+    assert series([tmp_path / "c01.dat", tmp_path / "c02.dat"])
+    assert not series([tmp_path / "c01.dat", tmp_path / "r01.dat"])
+    assert not series([tmp_path / "s01.dat", tmp_path / "s01.dat"])
+
+
+def test_sum_dat(tmp_path):
+    def summary(path, period, values):
+        path.write_text("Energy delivered, " + period + "\n"
+                        "Zone,Heating (kWh),Cooling (kWh),Hours\n"
+                        + "".join("%s,%s,%s,%d\n" % v for v in values))
+
+    summary(tmp_path / "c01.dat", "Jan", [("Wohnen", "100.5", "0.0", 744),
+                                          ("Bad", "20.25", "0.0", 744)])
+    summary(tmp_path / "c02.dat", "Feb", [("Wohnen", "80.0", "1.5", 672),
+                                          ("Bad", "15.0", "0.0", 672)])
+
+    espr_campaign.sum_dat([tmp_path / "c01.dat", tmp_path / "c02.dat"], tmp_path / "all.dat")
+
+    assert (tmp_path / "all.dat").read_text().splitlines() == [
+        "Energy delivered, Jan", "Zone,Heating (kWh),Cooling (kWh),Hours",
+        "Wohnen,180.5,1.5,1416", "Bad,35.25,0,1416"]
+
+    summary(tmp_path / "c03.dat", "Mar", [("Wohnen", "1.0", "0.0", 744)])
+    with pytest.raises(ValueError):
+        espr_campaign.sum_dat([tmp_path / "c01.dat", tmp_path / "c03.dat"],
+                              tmp_path / "all.dat")
+
+
+def test_jobs_done_ignores_campaign_files_in_model(tmp_path):
+    from esprsim.espr_jobs import job_state, jobs_status
+
+    (tmp_path / "cfg").mkdir()
+    (tmp_path / "cfg" / "test.cfg").write_text("*root test\n")
+    db = str(tmp_path / "campaign.db")
+    runs = tmp_path / "runs"
+    variants = [spec()]
+
+    assert espr_campaign._jobs_done(db, variants, tmp_path, "cfg", runs, None) == {}
+    job_state(db, "var01", "done", sandbox=str(runs / "var01"), time=1.0)
+    runs.mkdir()
+    (runs / espr_campaign.RUNTIME_MODEL).write_text("{}")
+
+    # written by the campaign, not changes of the base model
+    assert list(espr_campaign._jobs_done(db, variants, tmp_path, "cfg", runs, None)) == [0]
+
+    (tmp_path / "cfg" / "test.cfg").write_text("*root test2\n")
+    assert espr_campaign._jobs_done(db, variants, tmp_path, "cfg", runs, None) == {}
+    assert jobs_status(db)[0]["status"] == "pending"
+
+
+def test_runtime_estimate_orders_variants():
+    rtm = {}
+    short, long = spec(TM="1"), spec(dms=4, TM="12", BTSTEP="12")
+    assert espr_campaign.runtime_estimate(rtm, long, 2) > \
+        espr_campaign.runtime_estimate(rtm, short, 2)
+    # more zones, more work
+    assert espr_campaign.runtime_estimate(rtm, short, 4) == \
+        2 * espr_campaign.runtime_estimate(rtm, short, 2)
+
+    # measured factor of dms 4 far below its prior: order changes
+    espr_campaign.runtime_update(rtm, long, 2, 1e-9 * espr_campaign.runtime_work(long, 2))
+    assert espr_campaign.runtime_estimate(rtm, long, 2) < \
+        espr_campaign.runtime_estimate(rtm, short, 2)
+
+
+def run_order(tmp_path, monkeypatch, **kwargs):
+    from concurrent.futures import ThreadPoolExecutor
+
+    (tmp_path / "cfg").mkdir(exist_ok=True)
+    (tmp_path / "cfg" / "test.cfg").write_text("*root test\n")
+    order = []
+
+    def fake_run_variant(spec, model, sandbox_root, cfg, jobs):
+        order.append(spec["variant"])
+        return {"variant": spec["variant"], "status": "done", "error": None, "runs": []}
+
+    monkeypatch.setattr(espr_campaign, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(espr_campaign, "run_variant", fake_run_variant)
+
+    variants = [dict(spec(TM=str(m)), variant="m%02d" % m) for m in (1, 12, 6)]
+    status = espr_campaign.run_campaign(variants, tmp_path, tmp_path / "runs", workers=1,
+                                        **kwargs)
+    assert [s["variant"] for s in status] == ["m01", "m12", "m06"]
+    return order
+
+
+def test_run_campaign_schedule(tmp_path, monkeypatch):
+    assert run_order(tmp_path, monkeypatch) == ["m01", "m12", "m06"]
+    assert run_order(tmp_path, monkeypatch, schedule="ljf") == ["m12", "m06", "m01"]
+    with pytest.raises(ValueError):
+        run_order(tmp_path, monkeypatch, schedule="sjf")
+
+
+def fake_stages(monkeypatch, fail=None, crash=None):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    calls = []
+    lock = threading.Lock()
+
+    def stage(name):
+        def run(spec, status, cfg, jobs):
+            with lock:
+                calls.append((name, spec["variant"]))
+            if spec["variant"] == crash and name == "extract":
+                raise RuntimeError("worker died")
+            if spec["variant"] == fail and name == "simulate":
+                status["error"] = "RuntimeError: bps did not write " + spec["variant"] + ".res"
+            if name == "archive":
+                status["status"] = "done"
+            return status
+        return run
+
+    def edit(spec, model, sandbox_root, cfg, jobs):
+        return stage("edit")(spec, {"variant": spec["variant"], "status": "failed",
+                                    "error": None, "results": [], "time": 0.0, "runs": []},
+                             cfg, jobs)
+
+    monkeypatch.setattr(espr_campaign, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(espr_campaign, "variant_edit", edit)
+    for name in ("simulate", "extract", "archive"):
+        monkeypatch.setattr(espr_campaign, "variant_" + name, stage(name))
+    return calls
+
+
+def pipeline(tmp_path, n=6):
+    (tmp_path / "cfg").mkdir(exist_ok=True)
+    (tmp_path / "cfg" / "test.cfg").write_text("*root test\n")
+    variants = [dict(spec(), variant="v%d" % i) for i in range(n)]
+    return espr_campaign.run_pipeline(variants, tmp_path, tmp_path / "runs", workers=2,
+                                      edit_workers=1, extract_workers=1, queue=1)
+
+
+def test_run_pipeline_failure_propagation(tmp_path, monkeypatch):
+    calls = fake_stages(monkeypatch, fail="v2")
+
+    status = pipeline(tmp_path)
+
+    assert [s["variant"] for s in status] == ["v%d" % i for i in range(6)]
+    assert [s["status"] for s in status] == ["done", "done", "failed", "done", "done", "done"]
+    assert status[2]["error"] == "RuntimeError: bps did not write v2.res"
+    # a failed variant leaves the pipeline, later stages are not run for it
+    assert ("simulate", "v2") in calls
+    assert ("extract", "v2") not in calls and ("archive", "v2") not in calls
+    for name in ("edit", "simulate", "extract", "archive"):
+        assert len([c for c in calls if c[0] == name]) == (6 if name in ("edit",
+                                                                      "simulate") else 5)
+
+
+def test_run_pipeline_shutdown_on_worker_error(tmp_path, monkeypatch):
+    import time
+    import threading
+
+    calls = fake_stages(monkeypatch, crash="v1")
+    threads = threading.active_count()
+
+    with pytest.raises(RuntimeError, match="worker died"):
+        pipeline(tmp_path)
+
+    # all stage pools are shut down, no stage runs after the error
+    n = len(calls)
+    time.sleep(0.2)
+    assert len(calls) == n
+    assert threading.active_count() == threads
+    assert ("archive", "v1") not in calls
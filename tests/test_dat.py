@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from esprsim.espr_dat import dat_header, read_dat, iter_dat, dat_records
+
+
+# Layout of res time series exports: title lines, year in the period line.
+DAT = """\
+#Lib: var01.res: Results for var01
+#Period: Mon-01-Jan@00h07(2026) to Wed-31-Jan@23h52(2026)
+#Time\tWohnen db T\tZone
+ 1.00521\t20.50\tWohnen
+ 1.01563\t21.00\tBad
+ 1.50000\t22.50\tWohnen
+"""
+
+
+def test_dat_header(tmp_path):
+    (tmp_path / "a.dat").write_text(DAT)
+
+    h = dat_header("a.dat", cwd=tmp_path)
+
+    assert h["skip"] == 3
+    assert h["title"][0] == "#Lib: var01.res: Results for var01"
+    assert h["columns"] == ["Time", "Wohnen db T", "Zone"]
+    assert h["sep"] == "\t"
+    assert h["numeric"] == [True, True, False]
+    assert h["year"] == 2026
+
+
+def test_dat_header_without_names(tmp_path):
+    (tmp_path / "a.dat").write_text("# title\n1.0,2.0,3.0\n2.0,3.0,4.0\n")
+
+    h = dat_header(tmp_path / "a.dat")
+
+    assert h["columns"] == ["c0", "c1", "c2"] and h["sep"] == "," and h["year"] is None
+
+    (tmp_path / "b.dat").write_text("# title only\n")
+    with pytest.raises(ValueError):
+        dat_header(tmp_path / "b.dat")
+
+
+def test_read_dat_types_and_datetime_index(tmp_path):
+    (tmp_path / "a.dat").write_text(DAT)
+
+    df = read_dat("a.dat", cwd=tmp_path)
+
+    assert list(df.columns) == ["Wohnen db T", "Zone"]
+    assert df["Wohnen db T"].dtype == np.float32
+    assert isinstance(df["Zone"].dtype, pd.CategoricalDtype)
+    assert isinstance(df.index, pd.DatetimeIndex) and df.index.name == "Time"
+    assert list(df.index) == [pd.Timestamp("2026-01-01 00:07:30"),
+                              pd.Timestamp("2026-01-01 00:22:30"),
+                              pd.Timestamp("2026-01-01 12:00:00")]
+
+    df = read_dat("a.dat", dtype="float64", year=2030, cwd=tmp_path)
+    assert df["Wohnen db T"].dtype == np.float64
+    assert df.index[0].year == 2030
+
+
+def test_read_dat_without_year(tmp_path):
+    (tmp_path / "a.dat").write_text(DAT.replace("(2026)", ""))
+
+    df = read_dat("a.dat", cwd=tmp_path)
+
+    # index stays the decimal day of year
+    assert df.index.dtype == np.float64
+    np.testing.assert_allclose(df.index, [1.00521, 1.01563, 1.5])
+
+
+def test_read_dat_whitespace_delimited(tmp_path):
+    (tmp_path / "a.dat").write_text("# Time  PMV  PPD\n"
+                                    "   1.0   -0.50   10.2\n"
+                                    "   1.5   -0.40    8.3\n"
+                                    "   2.0    0.10    5.2\n")
+
+    df = read_dat("a.dat", cwd=tmp_path)
+
+    assert list(df.columns) == ["PMV", "PPD"]
+    np.testing.assert_allclose(df.index, [1.0, 1.5, 2.0])
+    np.testing.assert_allclose(df["PMV"], [-0.5, -0.4, 0.1], atol=1e-6)
+
+
+def test_read_dat_chunks_unite_categories(tmp_path):
+    (tmp_path / "a.dat").write_text(DAT)
+
+    chunks = list(iter_dat("a.dat", chunksize=2, cwd=tmp_path))
+    assert [len(c) for c in chunks] == [2, 1]
+
+    df = read_dat("a.dat", chunksize=1, cwd=tmp_path)
+    assert list(df["Zone"]) == ["Wohnen", "Bad", "Wohnen"]
+    assert sorted(df["Zone"].cat.categories) == ["Bad", "Wohnen"]
+
+    rec = dat_records("a.dat", cwd=tmp_path)
+    assert rec.dtype.names == ("Time", "Wohnen db T", "Zone")
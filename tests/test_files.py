@@ -0,0 +1,353 @@
+import os
+
+import pytest
+
+from esprsim import espr_files
+
+
+CFG = """\
+* CONFIGURATION4.0
+# ESRU system configuration defined by file
+# test.cfg
+*date Sat Oct 18 10:12:01 2026  # latest file modification 
+*root test
+*zonpth  ../zones                  # path to zones
+*netpth  ../nets                   # path to networks
+*ctlpth  ../ctl                    # path to controls
+*radpth  ../rad                    # path to radiance files
+*imgpth  ../images                 # path to project images
+*docpth  ../doc                    # path to project documents
+*dbspth  ../dbs                    # path to local databases
+*hvacpth ../hvac                   # path to hvac files
+*bcdpth  ../bcd                    # path to BCD files
+*indx    1 # Building only
+ 50.000    0.000   # Latitude & Longitude (diff from time meridian)
+      1   0.200   # Site exposure & ground reflectivity
+* DATABASES
+*stdmat  north_american.materialdb
+*stdmlc  ccht_constr.db1
+*stdopt  optics.db2
+*stdprs  pressc.db1
+*stdevn  profiles.db2.a
+*clm     ../dbs/base.clm
+*stdmscldb  mscomp.db1
+*stdpdb  plantc.db1
+*ctl  ../ctl/base.ctl
+*mgp      2   # number of monthly ground temperature profiles
+   0.47  -1.09  -0.77   0.52   4.75   8.58  11.64  13.28  12.93  10.78   7.29   3.59
+   3.12   1.53   1.18   1.66   4.06   6.64   9.00  10.65  11.03  10.10   8.05   5.55
+*year  2026 # assessment year
+# sim setup: no. sets startup zone_ts plant_ts save_lv @ each ts
+*sps    1   4   1   4   5   0
+   1   1  31  12  winter # period & name
+*sblr results.res
+*end_set
+*end_sps
+# Name and address of building
+*B-NAME not yet defined
+*B-ADDRESS not yet defined
+*B-CITY not yet defined
+*B-POSTCODE not yet defined
+# Contact information for building owner
+*O-NAME not yet defined
+*O-TELEPHONE not yet defined
+# Building zones and components
+*bld test # Building name
+   2  # no of zones
+*zon   1   # reference for Wohnen
+*opr ../zones/Wohnen.opr  # schedules
+*geo ../zones/Wohnen.geo  # geometry
+*con ../zones/Wohnen.con  # construction
+*zend 
+*zon   2   # reference for Bad
+*opr ../zones/Bad.opr  # schedules
+*geo ../zones/Bad.geo  # geometry
+*con ../zones/Bad.con  # construction
+*zend 
+*cnn test.cnn  # connections
+   0   # no fluid flow network
+"""
+
+CTL = """\
+*Control
+no overall control description supplied
+* Building
+no zone control description supplied
+   2  # No. of functions
+* Control function    1
+# senses the temperature of the current zone.
+    0    0    0    0  # sensor data
+# actuates air point of the current zone
+    0    0    0  # actuator data
+    1 # No. day types
+    1  365  # valid Mon-01-Jan - Mon-31-Dec
+     2  # No. of periods in day: weekdays
+    0    1   0.000  # ctl type, law (basic control), start @
+      7.  # No. of data items
+  2500.000 0.000 2500.000 0.000 20.000 24.000 0.000
+    0    1   6.000  # ctl type, law (basic control), start @
+      7.  # No. of data items
+  2500.000 0.000 2500.000 0.000 21.000 26.000 0.000
+* Control function    2
+# senses the temperature of the current zone.
+    0    0    0    0  # sensor data
+# actuates air point of the current zone
+    0    0    0  # actuator data
+    1 # No. day types
+    1  365  # valid Mon-01-Jan - Mon-31-Dec
+     1  # No. of periods in day: weekdays
+    0    1   0.000  # ctl type, law (basic control), start @
+      7.  # No. of data items
+  3000.000 0.000 3000.000 0.000 22.000
+  27.000 0.000
+# Function:Zone links
+ 1,2
+"""
+
+# Control file in the layout written by prj (ESP-r 13.3): all day types,
+# padded comment lines, a data line commented by the user. No prj is
+# available to the tests, regenerate the file with prj when changing it.
+CTL_PRJ = """\
+*Control
+Free floating & basic controller  
+* Building
+basic control: ideal heating to 20C and cooling to 24C  
+   1  # No. of functions
+* Control function    1
+# senses the temperature of the current zone.
+    0    0    0    0  # sensor data
+# actuates air point of the current zone
+    0    0    0  # actuator data
+    0 # all daytypes
+    1  365  # valid Sun-01-Jan - Sun-31-Dec
+     2  # No. of periods in day: all daytypes    
+    0    2   0.000  # ctl type, law (free floating), start @
+      0.  # No. of data items
+    0    1   7.000  # ctl type, law (basic control), start @
+      7.  # No. of data items
+  1000.000 0.000  1000.000 0.000   20.000 24.000 0.000  # heat/cool 1 kW, 20/24 C
+# Function:Zone links
+ 1,1,1
+"""
+
+GEO = """\
+*Geometry 1.1,GEN,{zone} # tag version, format, zone name
+*date Sat Oct 18 10:12:01 2026  # latest file modification 
+{zone} describes a zone
+# tag, X co-ord, Y co-ord, Z co-ord
+*vertex,0.00000,0.00000,0.00000  #   1
+*vertex,4.00000,0.00000,0.00000  #   2
+*vertex,4.00000,4.00000,0.00000  #   3
+*vertex,0.00000,4.00000,0.00000  #   4
+# tag, number of vertices followed by list of associated vert
+*edges,4,1,2,3,4  #  1
+# surf attributes:
+#  surf name, surf position VERT/CEIL/FLOR/SLOP/UNKN
+#  child of (surface name), useage (pair of tags) 
+#  construction name, optical name
+#  boundary condition tag followed by two data items
+*surf,{s1},VERT,-,WALL,-,extern_wall,OPAQUE,EXTERIOR,0,0  #   1 ||< external
+*surf,{s2},FLOR,-,-,-,floor_1,OPAQUE,GROUND,1,0  #   2 ||< ground profile  1
+*surf,{s3},VERT,-,WALL,-,extern_wall,OPAQUE,EXTERIOR,0,0  #   3 ||< external
+# 
+*base_list,1,2,    16.00,0  # zone base list
+"""
+
+
+@pytest.fixture
+def cfg(tmp_path):
+    path = tmp_path / "test.cfg"
+    path.write_text(CFG)
+    return path
+
+
+def changed(old, new):
+    r"""Return indices of lines differing between 'old' and 'new' (same length)."""
+
+    assert len(old) == len(new)
+    return [i for i, (a, b) in enumerate(zip(old, new)) if a != b]
+
+
+def test_cfg_get_set(cfg):
+    assert espr_files.cfg_get(cfg, "clm") == "../dbs/base.clm"
+    assert espr_files.cfg_get(cfg, "ctl") == "../ctl/base.ctl"
+    assert espr_files.cfg_get(cfg, "afn") is None
+
+    old = cfg.read_bytes().splitlines(keepends=True)
+    espr_files.cfg_set(cfg, "clm", "../dbs/other.clm")
+    new = cfg.read_bytes().splitlines(keepends=True)
+
+    i = old.index(b"*clm     ../dbs/base.clm\n")
+    assert changed(old, new) == [i]
+    assert new[i] == b"*clm     ../dbs/other.clm\n"
+    assert espr_files.cfg_get(cfg, "clm") == "../dbs/other.clm"
+
+    with pytest.raises(ValueError):
+        espr_files.cfg_set(cfg, "afn", "../nets/test.afn")
+
+
+def test_cfg_set_gtp_replace(cfg):
+    old = cfg.read_bytes().splitlines(keepends=True)
+    espr_files.cfg_set_gtp(cfg, {2: {"JanJun": "1 2 3 4 5 6", "JulDez": "7 8 9 10 11 12"}})
+    new = cfg.read_bytes().splitlines(keepends=True)
+
+    i = [j for j, line in enumerate(old) if line.startswith(b"*mgp")][0]
+    assert changed(old, new) == [i + 2]
+    assert new[i + 2].split() == [b"%.2f" % v for v in range(1, 13)]
+
+
+def test_cfg_set_gtp_append_sparse(cfg):
+    old = cfg.read_bytes().splitlines(keepends=True)
+    profile = {"JanJun": "1 2 3 4 5 6", "JulDez": "7 8 9 10 11 12"}
+    espr_files.cfg_set_gtp(cfg, {1: profile, 3: profile, 4: profile})
+    new = cfg.read_bytes().splitlines(keepends=True)
+
+    i = [j for j, line in enumerate(old) if line.startswith(b"*mgp")][0]
+    assert new[i] == b"*mgp      4   # number of monthly ground temperature profiles\n"
+    assert new[i + 1] == new[i + 3] == new[i + 4]
+    assert new[i + 1].split() == [b"%.2f" % v for v in range(1, 13)]
+    assert new[i + 2] == old[i + 2]
+    # Lines before and after the profiles are unchanged.
+    assert new[:i] == old[:i]
+    assert new[i + 5:] == old[i + 3:]
+
+
+def test_cfg_set_gtp_gap(cfg):
+    old = cfg.read_bytes()
+    profile = {"JanJun": "1 2 3 4 5 6", "JulDez": "7 8 9 10 11 12"}
+    with pytest.raises(ValueError):
+        espr_files.cfg_set_gtp(cfg, {4: profile})
+    with pytest.raises(ValueError):
+        espr_files.cfg_set_gtp(cfg, {1: {"JanJun": "1 2 3", "JulDez": "4 5 6"}})
+    assert cfg.read_bytes() == old
+
+
+def test_ctl_set_setpoints(tmp_path):
+    ctl = tmp_path / "base.ctl"
+    ctl.write_text(CTL)
+    old = ctl.read_bytes().splitlines(keepends=True)
+
+    espr_files.ctl_set_setpoints(ctl, 1, "19.5", "25", period=2)
+    new = ctl.read_bytes().splitlines(keepends=True)
+    i = old.index(b"  2500.000 0.000 2500.000 0.000 21.000 26.000 0.000\n")
+    assert changed(old, new) == [i]
+    assert new[i] == b"  2500.000 0.000 2500.000 0.000 19.500 25.000 0.000\n"
+
+    # Data items continued over two lines, function given by menu key.
+    espr_files.ctl_set_setpoints(ctl, "b", "18")
+    newer = ctl.read_bytes().splitlines(keepends=True)
+    i = old.index(b"  3000.000 0.000 3000.000 0.000 22.000\n")
+    assert changed(new, newer) == [i, i + 1]
+    assert newer[i] == b"  3000.000 0.000 3000.000 0.000 18.000\n"
+    assert newer[i + 1] == b"  99.000 0.000\n"
+
+    with pytest.raises(ValueError):
+        espr_files.ctl_set_setpoints(ctl, 3, "20")
+    with pytest.raises(ValueError):
+        espr_files.ctl_set_setpoints(ctl, 2, "20", period=2)
+
+
+def test_ctl_set_setpoints_keeps_layout(tmp_path):
+    ctl = tmp_path / "prj.ctl"
+    ctl.write_text(CTL_PRJ)
+    old = ctl.read_bytes().splitlines(keepends=True)
+
+    espr_files.ctl_set_setpoints(ctl, "a", "21", "26.5", period=2)
+    new = ctl.read_bytes().splitlines(keepends=True)
+
+    i = [j for j, line in enumerate(old) if line.startswith(b"  1000.000")][0]
+    assert changed(old, new) == [i]
+    assert new[i] == (b"  1000.000 0.000  1000.000 0.000   21.000 26.500 0.000"
+                      b"  # heat/cool 1 kW, 20/24 C\n")
+
+    with pytest.raises(ValueError):  # free floating period has no setpoints
+        espr_files.ctl_set_setpoints(ctl, 1, "21", period=1)
+
+
+def test_con_index(tmp_path):
+    zones = tmp_path / "zones"
+    zones.mkdir()
+    (tmp_path / "cfg").mkdir()
+    (zones / "Wohnen.geo").write_text(GEO.format(zone="Wohnen", s1="north", s2="floor",
+                                                 s3="south"))
+    (zones / "Bad.geo").write_text(GEO.format(zone="Bad", s1="east", s2="floor_b",
+                                              s3="west"))
+
+    index = espr_files.con_index(cwd=tmp_path / "cfg")
+
+    assert index == {"extern_wall": [("Bad", "east"), ("Bad", "west"),
+                                     ("Wohnen", "north"), ("Wohnen", "south")],
+                     "floor_1": [("Bad", "floor_b"), ("Wohnen", "floor")]}
+    assert espr_files.con_surfaces("floor_1", cwd=tmp_path / "cfg") == [
+        ("Bad", "floor_b"), ("Wohnen", "floor")]
+    assert espr_files.con_surfaces("door", cwd=tmp_path / "cfg") == []
+
+
+def write_geo(path, zone="Wohnen", s1="north", s2="floor", s3="south"):
+    path.write_text(GEO.format(zone=zone, s1=s1, s2=s2, s3=s3))
+
+
+def counting_open(monkeypatch):
+    opened = []
+
+    def counted(path, *args, **kwargs):
+        opened.append(str(path))
+        return open(path, *args, **kwargs)
+
+    monkeypatch.setattr(espr_files, "open", counted, raising=False)
+    return opened
+
+
+def test_geo_surfaces(tmp_path):
+    geo = tmp_path / "w.geo"
+    write_geo(geo)
+
+    assert espr_files.geo_surfaces(str(geo)) == (
+        "Wohnen", [("north", "extern_wall"), ("floor", "floor_1"), ("south", "extern_wall")])
+
+
+def test_geo_surfaces_cache(tmp_path, monkeypatch):
+    geo = str(tmp_path / "Wohnen.geo")
+    write_geo(tmp_path / "Wohnen.geo")
+    opened = counting_open(monkeypatch)
+
+    first = espr_files.geo_surfaces(geo)
+    assert espr_files.geo_surfaces(geo) == first
+    assert opened == [geo]  # parsed once
+
+    # rewritten in place, same size: new modification time
+    st = os.stat(geo)
+    write_geo(tmp_path / "Wohnen.geo", s1="nord")
+    os.utime(geo, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert espr_files.geo_surfaces(geo)[1][0] == ("nord", "extern_wall")
+    assert len(opened) == 2
+
+    # replaced by a new file (as prj and write_file do), same size and time
+    st = os.stat(geo)
+    lines = [line.replace("extern_wall", "intern_wall") if "*surf,south" in line else line
+             for line in espr_files.read_file(geo)]
+    espr_files.write_file(geo, lines)
+    os.utime(geo, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert os.stat(geo).st_size == st.st_size and os.stat(geo).st_ino != st.st_ino
+    assert espr_files.geo_surfaces(geo)[1][2] == ("south", "intern_wall")
+    assert len(opened) == 4  # read_file and the new parse
+
+
+def test_con_index_after_rewrite(tmp_path):
+    zones = tmp_path / "zones"
+    zones.mkdir()
+    (tmp_path / "cfg").mkdir()
+    write_geo(zones / "Wohnen.geo")
+    wd = tmp_path / "cfg"
+
+    assert espr_files.con_surfaces("extern_wall", cwd=wd) == [("Wohnen", "north"),
+                                                              ("Wohnen", "south")]
+
+    lines = espr_files.read_file(zones / "Wohnen.geo")
+    espr_files.write_file(zones / "Wohnen.geo",
+                          [line.replace("extern_wall", "extern_wall_ins") for line in lines])
+    write_geo(zones / "Bad.geo", zone="Bad", s1="east", s2="floor_b", s3="west")
+
+    assert espr_files.con_surfaces("extern_wall", cwd=wd) == [("Bad", "east"), ("Bad", "west")]
+    assert espr_files.con_surfaces("extern_wall_ins", cwd=wd) == [("Wohnen", "north"),
+                                                                  ("Wohnen", "south")]
@@ -0,0 +1,70 @@
+import pytest
+
+from esprsim import espr_jobs
+
+
+def spec(variant, ctl="ctl_a"):
+    return {"variant": variant, "edits": [["set_ctl", ["m", ctl]]],
+            "simulate": {"config": "m"}}
+
+
+def states(db):
+    return {j["variant"]: j["status"] for j in espr_jobs.jobs_status(db)}
+
+
+def test_job_states(tmp_path):
+    db = tmp_path / "jobs.db"
+    espr_jobs.jobs_add(db, [spec("v1"), spec("v2")])
+
+    espr_jobs.job_state(db, "v1", "simulating", sandbox="/s/v1", started=1.0)
+    espr_jobs.job_state(db, "v1", "done", results=["/s/v1/cfg/v1/a.dat"], time=2.0)
+    espr_jobs.job_state(db, "v2", "failed", error="bps did not write v2.res")
+
+    jobs = {j["variant"]: j for j in espr_jobs.jobs_status(db)}
+    assert jobs["v1"]["status"] == "done"
+    assert jobs["v1"]["results"] == ["/s/v1/cfg/v1/a.dat"]
+    assert jobs["v1"]["spec"] == spec("v1")
+    assert jobs["v2"]["error"] == "bps did not write v2.res"
+    assert espr_jobs.jobs_status(db, states=["failed"])[0]["variant"] == "v2"
+
+    summary = espr_jobs.jobs_summary(db)
+    assert summary["done"] == 1 and summary["failed"] == 1 and summary["pending"] == 0
+
+    with pytest.raises(ValueError):
+        espr_jobs.job_state(db, "v1", "finished")
+
+
+def test_jobs_add_keeps_state_of_unchanged_jobs(tmp_path):
+    db = tmp_path / "jobs.db"
+    espr_jobs.jobs_add(db, [spec("v1")], ["model-1"])
+    espr_jobs.job_state(db, "v1", "done")
+
+    assert espr_jobs.jobs_add(db, [spec("v1"), spec("v2")], ["model-1", "model-1"]) == []
+    assert states(db) == {"v1": "done", "v2": "pending"}
+
+
+def test_jobs_add_resets_changed_spec(tmp_path):
+    db = tmp_path / "jobs.db"
+    espr_jobs.jobs_add(db, [spec("v1"), spec("v2")])
+    espr_jobs.job_state(db, "v1", "done", results=["a.dat"], time=1.0)
+    espr_jobs.job_state(db, "v2", "done")
+
+    assert espr_jobs.jobs_add(db, [spec("v1", ctl="ctl_b"), spec("v2")]) == ["v1"]
+
+    jobs = {j["variant"]: j for j in espr_jobs.jobs_status(db)}
+    assert jobs["v1"]["status"] == "pending"
+    assert jobs["v1"]["spec"] == spec("v1", ctl="ctl_b")
+    assert jobs["v1"]["results"] == [] and jobs["v1"]["time"] is None
+    assert jobs["v2"]["status"] == "done"
+
+
+def test_jobs_add_resets_changed_model(tmp_path):
+    db = tmp_path / "jobs.db"
+    espr_jobs.jobs_add(db, [spec("v1")], ["model-1"])
+    espr_jobs.job_state(db, "v1", "done")
+
+    assert espr_jobs.jobs_add(db, [spec("v1")]) == []  # model not compared
+    assert states(db) == {"v1": "done"}
+    assert espr_jobs.jobs_add(db, [spec("v1")], ["model-2"]) == ["v1"]
+    assert states(db) == {"v1": "pending"}
+
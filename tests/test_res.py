@@ -0,0 +1,158 @@
+import os
+
+import pytest
+
+from esprsim import espr_res
+
+
+STUBS = os.path.join(os.path.dirname(__file__), os.pardir, "benchmarks", "stubs")
+
+
+def script_lines(cmd):
+    return cmd.decode("utf-8").rstrip("\n").split("\n")
+
+
+def test_res_batch_script_joins_extractions():
+    pmv = ("Wohnen", "1.0", "1.2", "0.1")
+    requests = [("PMV", pmv), ("supplied_energy", ()), ("PMV", ("Bad",) + pmv[1:])]
+
+    args, cmd, scratch = espr_res.res_batch_script("var01", requests)
+
+    _, p1, _ = espr_res.res_PMV_script("var01", *pmv)
+    _, e, _ = espr_res.res_supplied_energy_script("var01")
+    _, p2, _ = espr_res.res_PMV_script("var01", "Bad", *pmv[1:])
+
+    # res file confirmed once on start-up, every script back in the main
+    # menu before the next one, res quit once at the end
+    expected = (script_lines(p1)[:-1] + script_lines(e)[:-1]
+                + script_lines(p2)[1:-1] + ["-"])
+    assert script_lines(cmd) == expected
+    assert script_lines(cmd)[0] == ""
+    assert script_lines(cmd).count("") == 1
+    assert args == ["res", "-file", "var01.res", "-mode", "text"]
+    assert scratch == "var01_batch_res.scratch"
+
+
+def test_res_zone_metrics_script():
+    args, cmd, scratch = espr_res.res_zone_metrics_script("var01", "Wohnen")
+
+    lines = script_lines(cmd)
+    assert lines[:5] == ["", "c", "4", "Wohnen", "-"]
+    assert lines[5:7] == [">", "var01_Wohnen_db_mrt_rh.dat"]
+    # zone db T, MRT (temperatures sub-menu, exited each), zone RH
+    g = lines.index("g")
+    assert lines[g + 1:g + 8] == ["b", "a", "-", "b", "f", "-", "h"]
+    assert lines[-7:] == ["*", "a", "!", ">", "-", "-", "-"]
+    assert scratch == "var01_Wohnen_db_mrt_rh.dat_res.scratch"
+
+    with pytest.raises(ValueError):
+        espr_res.res_zone_metrics_script("var01", "Wohnen", ("db", "co2"))
+    with pytest.raises(ValueError):
+        espr_res.res_zone_metrics_script("var01", "Wohnen", ())
+
+
+def test_res_batch_script_zone_metrics():
+    pmv = ("1.0", "1.2", "0.1")
+    requests = [("zone_metrics", ("Wohnen",)), ("zone_metrics", ("Bad", ("db", "rh"))),
+                ("PMV", ("Wohnen",) + pmv), ("supplied_energy", ())]
+
+    _, cmd, _ = espr_res.res_batch_script("var01", requests)
+
+    parts = [espr_res.res_zone_metrics_script("var01", "Wohnen")[1],
+             espr_res.res_zone_metrics_script("var01", "Bad", ("db", "rh"))[1],
+             espr_res.res_PMV_script("var01", "Wohnen", *pmv)[1],
+             espr_res.res_supplied_energy_script("var01")[1]]
+    expected = script_lines(parts[0])[:-1]
+    for part in parts[1:]:
+        expected += script_lines(part.lstrip(b"\n"))[:-1]
+    assert script_lines(cmd) == expected + ["-"]
+    lines = script_lines(cmd)
+    assert lines.count("") == 1
+    assert lines.count("c") == 3 + 1  # time step reports per zone script, PMV comfort
+    # files opened with '>' (the flush '>' is followed by '-')
+    assert [y for x, y in zip(lines, lines[1:]) if x == ">" and y != "-"] == [
+        "var01_Wohnen_db_mrt_rh.dat", "var01_Bad_db_rh.dat",
+        "var01_Wohnen_PMV_1.0_1.2_0.1.dat", "var01en-deliv.dat"]
+
+
+def test_res_batch_script_unknown_request():
+    with pytest.raises(ValueError):
+        espr_res.res_batch_script("var01", [("PPD", ())])
+
+
+def test_res_batch_writes_all_files(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATH", os.path.abspath(STUBS) + os.pathsep + os.environ["PATH"])
+    monkeypatch.setenv("ESPRSIM_STUB_DAT_ROWS", "24")
+    (tmp_path / "var01.res").write_bytes(b"")
+
+    espr_res.res_batch("var01", [("PMV", ("Wohnen", "1.0", "1.2", "0.1")),
+                                 ("PMV", ("Bad", "1.0", "1.2", "0.1")),
+                                 ("supplied_energy", ())], cwd=tmp_path)
+
+    for f in ("var01_Wohnen_PMV_1.0_1.2_0.1.dat", "var01_Bad_PMV_1.0_1.2_0.1.dat",
+              "var01en-deliv.dat"):
+        assert len((tmp_path / f).read_text().splitlines()) == 3 + 24
+
+
+def test_res_variables(tmp_path):
+    import numpy as np
+
+    # 2 header records, 3 time steps of 2 records of 4 words
+    data = np.arange(2 * 4 + 3 * 2 * 4, dtype="<f4")
+    data.tofile(tmp_path / "var01.res")
+    layout = {"width": 4, "start": 2, "step": 2, "count": 3,
+              "zones": {"Wohnen": {"record": 0, "vars": {"t_air": 1}},
+                        "Bad": {"record": 1, "vars": {"t_air": 1, "t_mrt": 3}}}}
+
+    v = espr_res.res_variables("var01", layout, cwd=tmp_path)
+
+    np.testing.assert_array_equal(v["Wohnen"]["t_air"], [9, 17, 25])
+    np.testing.assert_array_equal(v["Bad"]["t_air"], [13, 21, 29])
+    np.testing.assert_array_equal(v["Bad"]["t_mrt"], [15, 23, 31])
+
+
+def test_pmv_ppd_iso7730():
+    import numpy as np
+
+    # ISO 7730:2005, Table D.1
+    pmv, ppd = espr_res.pmv_ppd([22.0, 27.0, 23.5], [22.0, 27.0, 25.5], 0.1, 60.0, 1.2, 0.5)
+
+    np.testing.assert_allclose(pmv, [-0.75, 0.77, -0.01], atol=0.01)
+    np.testing.assert_allclose(ppd, [17.0, 17.5, 5.0], atol=0.5)
+
+
+def test_pmv_grid():
+    import numpy as np
+
+    ta = np.array([20.0, 22.0, 24.0, 26.0])
+    tr = ta - 1.0
+    rh = np.full(4, 50.0)
+    occupied = np.array([True, True, False, True])
+
+    pmv, ppd = espr_res.pmv_grid(ta, tr, rh, [0.5, 1.0], [1.0, 1.2, 1.4], 0.1,
+                                 occupied=occupied)
+
+    assert pmv.shape == ppd.shape == (2, 3, 1, 4)
+    assert np.isnan(pmv[..., 2]).all() and np.isnan(ppd[..., 2]).all()
+    for i, clo in enumerate([0.5, 1.0]):
+        for j, met in enumerate([1.0, 1.2, 1.4]):
+            p, d = espr_res.pmv_ppd(ta[occupied], tr[occupied], 0.1, 50.0, met, clo)
+            # within the convergence of the clothing temperature iteration
+            np.testing.assert_allclose(pmv[i, j, 0, occupied], p, atol=1e-3)
+            np.testing.assert_allclose(ppd[i, j, 0, occupied], d, atol=0.05)
+    # warmer with more clothing and activity
+    assert (np.diff(pmv[..., occupied], axis=0) > 0).all()
+    assert (np.diff(pmv[..., occupied], axis=1) > 0).all()
+
+
+def test_res_variables_bad_layout(tmp_path):
+    import numpy as np
+
+    np.arange(2 * 4 + 3 * 2 * 4, dtype="<f4").tofile(tmp_path / "var01.res")
+    layout = {"width": 4, "start": 2, "step": 2, "count": 3,
+              "zones": {"Wohnen": {"record": 0, "vars": {"t_air": 1}}}}
+
+    for bad in ({"count": 4}, {"zones": {"Wohnen": {"record": 2, "vars": {}}}},
+                {"zones": {"Wohnen": {"record": 1, "vars": {"t_air": 4}}}}):
+        with pytest.raises(ValueError):
+            espr_res.res_variables("var01", dict(layout, **bad), cwd=tmp_path)
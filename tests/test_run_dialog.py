@@ -0,0 +1,84 @@
+import sys
+import textwrap
+
+import pytest
+
+from esprsim.espr_run import run_dialog, EsprRunError
+from esprsim.espr_sim import APPLY_CON_PROMPT, MENU_PROMPT
+
+
+# Fake prj: asks for confirmations with silent computations in between, then
+# returns to its menu. Answers are written to 'answers.txt'.
+FAKE_PRJ = textwrap.dedent("""\
+    import sys, time
+    answers = []
+    def ask(prompt):
+        sys.stdout.write(prompt)
+        sys.stdout.flush()
+        answers.append(sys.stdin.readline().strip())
+    ask(" Search & replace\\n a zones\\n ? help\\n - exit this menu\\n")
+    for zone in ("Wohnen", "Bad"):
+        time.sleep(0.6)  # e.g. rebuilding .con files
+        ask(" Apply construction to " + zone + ":wall? [Y/N]\\n")
+    time.sleep(0.6)
+    ask(" Composition\\n ! save model\\n - exit this menu\\n")
+    open("answers.txt", "w").write(" ".join(answers))
+    """)
+
+
+def fake_prj(tmp_path, script=FAKE_PRJ):
+    (tmp_path / "prj.py").write_text(script)
+    return [sys.executable, "prj.py"]
+
+
+def test_prompt_loop_waits_for_end(tmp_path):
+    steps = [(None, "*\n"),
+             ({APPLY_CON_PROMPT: "y\n"}, MENU_PROMPT),
+             (None, "-\n")]
+
+    run_dialog(fake_prj(tmp_path), steps, "prj.scratch", cwd=tmp_path, timeout=5)
+
+    assert (tmp_path / "answers.txt").read_text() == "* y y -"
+    assert "Apply construction to Bad" in (tmp_path / "prj.scratch").read_text()
+
+
+def test_prompt_loop_needs_end(tmp_path):
+    with pytest.raises(ValueError):
+        run_dialog(fake_prj(tmp_path), [({APPLY_CON_PROMPT: "y\n"}, None)],
+                   "prj.scratch", cwd=tmp_path)
+
+
+def test_unexpected_prompt_times_out(tmp_path):
+    steps = [(None, "*\n"),
+             ({r"(?i)delete zone .*\?": "n\n"}, MENU_PROMPT),
+             (None, "-\n")]
+
+    with pytest.raises(EsprRunError) as err:
+        run_dialog(fake_prj(tmp_path), steps, "prj.scratch", cwd=tmp_path, timeout=1)
+
+    assert err.value.failure["kind"] == "prompt"
+    assert not (tmp_path / "answers.txt").exists()
+
+
+def test_module_exit(tmp_path):
+    args = fake_prj(tmp_path, "print(' - exit this menu')\n")
+
+    with pytest.raises(EsprRunError) as err:
+        run_dialog(args, [(r"Apply construction", "y\n")], "prj.scratch", cwd=tmp_path)
+
+    assert err.value.failure["kind"] == "exit"
+
+
+def test_prompt_patterns():
+    import re
+    from esprsim.espr_ms_sim import CFC_PROMPT
+
+    status = " Updating Wohnen.cfc ... done\n"
+    prompt = status + " Wohnen.cfc has been updated.\n a) view  b) continue\n"
+    assert re.search(CFC_PROMPT, status) is None
+    assert re.search(CFC_PROMPT, prompt) is not None
+    assert re.search(CFC_PROMPT, prompt + " - exit this menu\n") is None
+
+    menu = " Composition\n ! save model\n - exit this menu\n"
+    assert re.search(MENU_PROMPT, menu) is not None
+    assert re.search(MENU_PROMPT, menu + " Apply construction to Bad:wall? [Y/N]\n") is None
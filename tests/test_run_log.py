@@ -0,0 +1,64 @@
+import os
+import sys
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from esprsim import espr_run
+from esprsim.espr_run import run_espr, run_label, run_record, log_run, read_run_log
+
+
+MODULE = [sys.executable, "-c", "import sys; sys.stdin.read(); print('done')"]
+
+
+def test_run_espr_logs_run(tmp_path):
+    with run_label("var01"):
+        run_espr(MODULE, b"a\n-\n", "m.scratch", cwd=tmp_path)
+    run_espr(MODULE, b"-\n", "m2.scratch", cwd=tmp_path)
+
+    records = read_run_log(cwd=tmp_path)
+
+    assert len(records) == 2
+    r = records[0]
+    assert r["label"] == "var01" and records[1]["label"] is None
+    assert r["module"] == os.path.basename(sys.executable)
+    assert r["args"] == MODULE[1:]
+    assert r["scratch"] == "m.scratch" and r["returncode"] == 0
+    assert r["wall"] >= 0 and r["start"] > 0
+    assert r["utime"] is not None and r["maxrss"] > 0
+    assert r["failure"] is None
+    assert (tmp_path / "m.scratch").read_text() == "done\n"
+
+
+def test_run_record_failure():
+    failure = {"kind": "stall", "hint": "bad input", "tail": ["Please try again"]}
+
+    r = run_record(["/opt/esru/bin/bps", "-mode", "text"], "v_bps.scratch", -9, 0.0,
+                   failure=failure)
+
+    assert r["module"] == "bps" and r["args"] == ["-mode", "text"]
+    assert r["failure"] == {"kind": "stall", "hint": "bad input"}
+    assert r["utime"] is None
+
+
+def test_run_log_disabled(tmp_path, monkeypatch):
+    monkeypatch.setattr(espr_run, "RUN_LOG", None)
+
+    log_run(run_record(["bps"], "x", 0, 0.0), cwd=tmp_path)
+
+    assert list(tmp_path.iterdir()) == [] and read_run_log(cwd=tmp_path) == []
+
+
+def append(cwd, worker, n):
+    # Records larger than the buffer of a file object.
+    for i in range(n):
+        log_run(run_record(["bps", "x" * 20000], "w%d_%d" % (worker, i), 0, 0.0), cwd=cwd)
+
+
+def test_concurrent_appends_stay_whole_lines(tmp_path):
+    with ProcessPoolExecutor(max_workers=8) as pool:
+        list(pool.map(append, [tmp_path] * 8, range(8), [50] * 8))
+
+    lines = (tmp_path / espr_run.RUN_LOG).read_text().splitlines()
+    assert len(lines) == 400
+    scratch = sorted(json.loads(line)["scratch"] for line in lines)
+    assert scratch == sorted("w%d_%d" % (w, i) for w in range(8) for i in range(50))
@@ -0,0 +1,127 @@
+import os
+
+import pytest
+
+from esprsim import espr_sandbox
+from esprsim.espr_sandbox import make_sandbox, tmpfs_sandbox, persist_sandbox
+
+
+def model_tree(tmp_path):
+    model = tmp_path / "model"
+    for name, text in (("cfg/m.cfg", "*root m\n"), ("cfg/m.cnn", "cnn\n"),
+                       ("cfg/v0.contents", "qa\n"), ("cfg/v0.res", "res\n"),
+                       ("cfg/m_set_ctl.scratch", "scratch\n"), ("cfg/v0_Wohnen.dat", "1,2\n"),
+                       ("ctl/m.ctl", "ctl\n"), ("zones/Wohnen.geo", "geo\n"),
+                       ("tmp/x", "tmp\n")):
+        (model / name).parent.mkdir(parents=True, exist_ok=True)
+        (model / name).write_text(text)
+    return model
+
+
+def test_make_sandbox_links_inputs_only(tmp_path):
+    model = model_tree(tmp_path)
+
+    wd = make_sandbox(model, tmp_path / "var01", edits=("set_ctl",))
+
+    def linked(name):
+        return os.stat(os.path.join(wd, "..", name)).st_ino == os.stat(model / name).st_ino
+
+    assert not linked("cfg/m.cfg")  # edited by set_ctl
+    assert linked("zones/Wohnen.geo")
+    assert not linked("cfg/v0_Wohnen.dat")  # written by runs, copied
+    for name in ("v0.contents", "v0.res", "m_set_ctl.scratch"):
+        assert not os.path.exists(os.path.join(wd, name))
+    assert os.listdir(os.path.join(wd, "..", "tmp")) == []
+
+    # A run rewriting a copied file in place leaves the base model unchanged.
+    with open(os.path.join(wd, "v0_Wohnen.dat"), "w") as f:
+        f.write("3,4\n")
+    assert (model / "cfg/v0_Wohnen.dat").read_text() == "1,2\n"
+
+
+def test_make_sandbox_links_cfg_inputs(tmp_path):
+    model = model_tree(tmp_path)
+
+    wd = make_sandbox(model, tmp_path / "var01", edits=("simulate",))
+
+    assert os.stat(os.path.join(wd, "m.cfg")).st_ino == os.stat(model / "cfg/m.cfg").st_ino
+    assert os.stat(os.path.join(wd, "m.cnn")).st_ino == os.stat(model / "cfg/m.cnn").st_ino
+
+
+@pytest.fixture
+def sandbox(tmp_path):
+    model = model_tree(tmp_path)
+    make_sandbox(model, tmp_path / "var01", edits=("simulate",))  # all inputs linked
+    (tmp_path / "shm").mkdir()
+    return model, tmp_path / "var01", tmp_path / "shm"
+
+
+def test_tmpfs_sandbox(sandbox):
+    model, box, shm = sandbox
+
+    work = tmpfs_sandbox(box, tmpfs=shm, min_free=0)
+
+    assert os.path.dirname(work) == str(shm) and work.endswith("-var01")
+    for name in ("cfg/m.cfg", "ctl/m.ctl", "zones/Wohnen.geo"):
+        a, b = os.stat(os.path.join(work, name)), os.stat(box / name)
+        assert a.st_ino != b.st_ino and a.st_mtime_ns == b.st_mtime_ns
+    # same working tree for the same sandbox, left-overs are replaced
+    (shm / os.path.basename(work) / "stale").write_text("x")
+    assert tmpfs_sandbox(box, tmpfs=shm, min_free=0) == work
+    assert not os.path.exists(os.path.join(work, "stale"))
+
+
+def test_tmpfs_sandbox_low_memory(sandbox, monkeypatch):
+    model, box, shm = sandbox
+    monkeypatch.setattr(espr_sandbox, "tmpfs_free", lambda tmpfs: 2**20)
+
+    assert tmpfs_sandbox(box, tmpfs=shm, min_free=2**30) == str(box)
+    assert os.listdir(shm) == []
+    # working in the sandbox, nothing to persist
+    assert persist_sandbox(box, box) == str(box)
+    assert (box / "cfg" / "m.cfg").exists()
+
+
+def test_tmpfs_sandbox_copy_fails(sandbox, monkeypatch):
+    model, box, shm = sandbox
+
+    def full(*args, **kwargs):
+        os.makedirs(args[1])
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(espr_sandbox.shutil, "copytree", full)
+
+    assert tmpfs_sandbox(box, tmpfs=shm, min_free=0) == str(box)
+    assert os.listdir(shm) == []
+
+
+def test_persist_sandbox(sandbox):
+    model, box, shm = sandbox
+    work = tmpfs_sandbox(box, tmpfs=shm, min_free=0)
+    cfg = os.path.join(work, "cfg")
+
+    # simulation writes results, move_files moves them, edits rewrite files
+    with open(os.path.join(cfg, "v1.res"), "w") as f:
+        f.write("results")
+    os.mkdir(os.path.join(cfg, "v1"))
+    os.rename(os.path.join(cfg, "v1.res"), os.path.join(cfg, "v1", "v1.res"))
+    os.rename(os.path.join(cfg, "v0_Wohnen.dat"), os.path.join(cfg, "v1", "v1_Wohnen.dat"))
+    with open(os.path.join(work, "ctl", "m.ctl"), "w") as f:
+        f.write("ctl edited\n")
+    os.remove(os.path.join(work, "zones", "Wohnen.geo"))
+    os.rmdir(os.path.join(work, "tmp"))
+
+    assert persist_sandbox(work, box) == str(box)
+
+    assert not os.path.exists(work)
+    assert (box / "cfg" / "v1" / "v1.res").read_text() == "results"
+    assert (box / "cfg" / "v1" / "v1_Wohnen.dat").read_text() == "1,2\n"
+    assert not (box / "cfg" / "v1.res").exists()
+    assert not (box / "cfg" / "v0_Wohnen.dat").exists()  # moved away
+    assert not (box / "zones" / "Wohnen.geo").exists()
+    assert not (box / "tmp").exists() and (box / "zones").is_dir()
+    assert (box / "ctl" / "m.ctl").read_text() == "ctl edited\n"
+    # unchanged files keep their hard links to the base model, which is unchanged
+    assert os.stat(box / "cfg" / "m.cnn").st_ino == os.stat(model / "cfg" / "m.cnn").st_ino
+    assert (model / "ctl" / "m.ctl").read_text() == "ctl\n"
+    assert (model / "zones" / "Wohnen.geo").read_text() == "geo\n"
@@ -0,0 +1,39 @@
+from esprsim import espr_sim
+
+
+def script(**kwargs):
+    args, cmd, scratch = espr_sim.simulate_script(1, "m", "var01", "4", "1", "1", "1", "31",
+                                                  "12", "7", **kwargs)
+    assert args == ["bps", "-file", "m.cfg", "-mode", "text"]
+    assert scratch == "var01_bps.scratch"
+    return cmd.decode("utf-8").split("\n")
+
+
+def test_simulate_script_defaults():
+    lines = script()
+
+    # model, simulate, results library, period, start-up, time steps
+    assert lines[:7] == ["", "c", "var01.res", "1 1", "31 12", "7", "4"]
+    # hourly integration, save level, filter, then the simulation is started
+    assert lines[7:11] == ["N", "*", "*", "s"]
+    assert lines[11:] == ["Y", "Run:var01", "Y", "Y", "-", "-", ""]
+
+
+def test_simulate_script_save_level_and_filter():
+    lines = script(hourly=True, save_level="2", save_filter=["a", "c", "*"])
+
+    assert lines[7:13] == ["Y", "2", "a", "c", "*", "s"]
+    assert lines[13:] == ["Y", "Run:var01", "Y", "Y", "-", "-", ""]
+
+    # single filter answer as str, level as int
+    assert script(save_level=0, save_filter="b")[7:11] == ["N", "0", "b", "s"]
+
+
+def test_simulate_script_plant_domains():
+    args, cmd, scratch = espr_sim.simulate_script(4, "m", "var01", "12", "5", "1", "1",
+                                                  "31", "1", "3", save_level="4")
+    lines = cmd.decode("utf-8").split("\n")
+
+    assert lines[2:5] == ["var01.res", "var01.mfr", "var01.plr"]
+    assert lines[5:10] == ["1 1", "31 1", "3", "12", "5"]
+    assert lines[10:14] == ["N", "4", "*", "s"]
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+from esprsim import espr_store
+
+
+def write_dat(vardir, variant, rows):
+    vardir.mkdir(parents=True, exist_ok=True)
+    lines = ["#Time\tWohnen db T\tZone"]
+    lines += ["%.4f\t%.2f\t%s" % row for row in rows]
+    (vardir / (variant + "_temp.dat")).write_text("\n".join(lines) + "\n")
+
+
+def make_store(tmp_path):
+    store = tmp_path / "store"
+    write_dat(tmp_path / "v1", "v1", [(1.0, 20.5, "Wohnen"), (1.5, 21.0, "Bad"),
+                                      (2.0, 22.5, "Wohnen")])
+    write_dat(tmp_path / "v2", "v2", [(1.0, 18.0, "Bad"), (1.5, 19.5, "Bad")])
+    espr_store.store_variant(store, "v1", {"ctl": "a"}, vardir=tmp_path / "v1")
+    espr_store.store_variant(store, "v2", {"ctl": "b"}, vardir=tmp_path / "v2")
+    return store
+
+
+def test_store_load_round_trip(tmp_path):
+    store = make_store(tmp_path)
+
+    index = espr_store.store_index(store)
+    assert index["v1"]["params"] == {"ctl": "a"}
+    assert index["v1"]["tables"]["temp"]["rows"] == 3
+    assert index["v2"]["tables"]["temp"]["rows"] == 2
+
+    df = espr_store.store_load(store, "v1", "temp")
+    assert len(df) == 3
+    assert df.index.name == "Time"
+    assert df["Wohnen db T"].dtype == np.float32
+    assert isinstance(df["Zone"].dtype, pd.CategoricalDtype)
+    assert list(df["Zone"]) == ["Wohnen", "Bad", "Wohnen"]
+    np.testing.assert_allclose(df["Wohnen db T"], [20.5, 21.0, 22.5])
+    np.testing.assert_allclose(df.index, [1.0, 1.5, 2.0])
+
+
+def test_store_load_columns(tmp_path):
+    store = make_store(tmp_path)
+
+    df = espr_store.store_load(store, "v2", "temp", columns=["Zone"])
+    assert list(df.columns) == ["Zone"]
+    assert list(df["Zone"].cat.categories) == ["Bad"]
+
+
+def test_store_query(tmp_path):
+    store = make_store(tmp_path)
+
+    series = espr_store.store_query(store, "temp", "Wohnen db T")
+    assert sorted(series) == ["v1", "v2"]
+    assert len(series["v1"]) == 3 and len(series["v2"]) == 2
+
+    t_max = espr_store.store_query(store, "temp", "Wohnen db T", agg=np.max)
+    assert t_max.dtype == np.float64
+    assert t_max.to_dict() == {"v1": 22.5, "v2": 19.5}
+
+    only_b = espr_store.store_query(store, "temp", "Wohnen db T", where={"ctl": "b"},
+                                    agg=np.max)
+    assert list(only_b.index) == ["v2"]
+
+
+def test_store_variant_replaces_variant(tmp_path):
+    store = make_store(tmp_path)
+    write_dat(tmp_path / "v1", "v1", [(1.0, 30.0, "Bad")])
+
+    espr_store.store_variant(store, "v1", {"ctl": "c"}, vardir=tmp_path / "v1")
+
+    assert espr_store.store_variants(store, {"ctl": "c"}) == ["v1"]
+    assert len(espr_store.store_load(store, "v1", "temp")) == 1
+
+
+def store_one(store, tmp_path, variant):
+    write_dat(tmp_path / variant, variant, [(1.0, 20.0, "Wohnen")])
+    return espr_store.store_variant(store, variant, {"n": variant},
+                                    vardir=tmp_path / variant)
+
+
+def test_store_variant_concurrent(tmp_path):
+    from concurrent.futures import ProcessPoolExecutor
+
+    store = tmp_path / "store"
+    variants = ["v%02d" % i for i in range(16)]
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        list(pool.map(store_one, [store] * 16, [tmp_path] * 16, variants))
+
+    index = espr_store.store_index(store)
+    assert sorted(index) == variants
+    assert all(index[v]["params"] == {"n": v} for v in variants)
+
+
+def test_store_query_reads_index_once(tmp_path, monkeypatch):
+    store = make_store(tmp_path)
+    calls = []
+    index = espr_store._index
+
+    def counted(store, variant=None):
+        calls.append(variant)
+        return index(store, variant)
+
+    monkeypatch.setattr(espr_store, "_index", counted)
+
+    espr_store.store_query(store, "temp", "Wohnen db T", where={"ctl": "a"})
+    assert calls == [None]
+
+    calls.clear()
+    espr_store.store_load(store, "v2", "temp")
+    assert calls == ["v2"]  # one row of the index only
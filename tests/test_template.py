@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+from esprsim import espr_template
+
+
+CFG = """\
+* CONFIGURATION4.0
+*date Sat Oct 18 10:12:01 2026  # latest file modification 
+*root test
+*zonpth  ../zones                  # path to zones
+*ctl  ../ctl/base.ctl
+*bld test # Building name
+   1  # no of zones
+*zon   1   # reference for Wohnen
+*geo ../zones/Wohnen.geo  # geometry
+*zend 
+"""
+
+CTL = """\
+*Control
+no overall control description supplied
+* Building
+no zone control description supplied
+   1  # No. of functions
+* Control function    1
+# senses the temperature of the current zone.
+    0    0    0    0  # sensor data
+# actuates air point of the current zone
+    0    0    0  # actuator data
+    1 # No. day types
+    1  365  # valid Mon-01-Jan - Mon-31-Dec
+     1  # No. of periods in day: weekdays
+    0    1   0.000  # ctl type, law (basic control), start @
+      7.  # No. of data items
+  2500.000 0.000 2500.000 0.000 20.000 24.000 0.000
+# Function:Zone links
+ 1
+"""
+
+EDITS = [("set_ctl_temp_setpt", ("test", "base", 1, "{heat}", "{cool}"), {"native": True})]
+
+
+@pytest.fixture
+def model(tmp_path):
+    root = tmp_path / "model"
+    for d in ("cfg", "ctl", "zones"):
+        (root / d).mkdir(parents=True)
+    (root / "cfg" / "test.cfg").write_text(CFG)
+    (root / "ctl" / "base.ctl").write_text(CTL)
+    (root / "zones" / "Wohnen.geo").write_text("*Geometry 1.1,GEN,Wohnen\n")
+    return root
+
+
+def test_template_record(tmp_path, model):
+    path = tmp_path / "setpoints.json"
+
+    template = espr_template.template_record(model, "test", EDITS, template=path)
+
+    assert template["params"] == ["heat", "cool"]
+    assert list(template["files"]) == ["ctl/base.ctl"]
+    i = CTL.splitlines().index("  2500.000 0.000 2500.000 0.000 20.000 24.000 0.000")
+    assert sorted((s[0], s[2], s[3]) for s in template["files"]["ctl/base.ctl"]["slots"]) \
+        == [(i, "cool", ".3f"), (i, "heat", ".3f")]
+    saved = json.loads(path.read_text())
+    assert saved["params"] == template["params"] and saved["files"] == template["files"]
+    # base model and probe sandboxes are left as they were
+    assert (model / "ctl" / "base.ctl").read_text() == CTL
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["model", "setpoints.json"]
+
+
+def test_template_files(tmp_path, model):
+    path = tmp_path / "setpoints.json"
+    espr_template.template_record(model, "test", EDITS, template=path)
+
+    files = espr_template.template_files(path, {"heat": 21.5, "cool": "26"})
+
+    lines = files["ctl/base.ctl"]
+    assert "".join(lines) == CTL.replace("20.000 24.000", "21.500 26.000")
+    assert espr_template.template_load(path) is espr_template.template_load(path)
+
+    with pytest.raises(ValueError):
+        espr_template.template_files(path, {"heat": 21.5})
+
+
+def test_template_variant(tmp_path, model):
+    template = espr_template.template_record(model, "test", EDITS)
+
+    wd = espr_template.template_variant(template, model, tmp_path / "var01",
+                                        {"heat": 19, "cool": 27})
+
+    ctl = tmp_path / "var01" / "ctl" / "base.ctl"
+    assert ctl.read_text() == CTL.replace("20.000 24.000", "19.000 27.000")
+    assert (model / "ctl" / "base.ctl").read_text() == CTL
+    assert (tmp_path / "var01" / "cfg" / "test.cfg").samefile(model / "cfg" / "test.cfg")
+    assert str(wd) == str(tmp_path / "var01" / "cfg")
@@ -0,0 +1,80 @@
+import sys
+import textwrap
+
+import pytest
+
+from esprsim.espr_run import run_espr, watchdog, EsprRunError
+
+
+# Fake module: redraws its menu for every command read, quits at 'q'. At the
+# end of its input, it redraws the menu forever (as ESP-r menus do).
+MENU_MODULE = textwrap.dedent("""\
+    import sys
+    MENU = " Options\\n a zones\\n b nets\\n ? help\\n - exit this menu\\n"
+    while True:
+        sys.stdout.write(MENU)
+        sys.stdout.flush()
+        line = sys.stdin.readline()
+        if line.strip() == "q":
+            break
+    """)
+
+# Fake bps: reads its two commands, then writes identical progress lines.
+PROGRESS_MODULE = textwrap.dedent("""\
+    import sys, time
+    sys.stdin.readline()
+    sys.stdin.readline()
+    for i in range(300):
+        print(" Simulation still running ...", flush=True)
+        time.sleep(0.002)
+    """)
+
+
+def module(tmp_path, script):
+    (tmp_path / "module.py").write_text(script)
+    return [sys.executable, "module.py"]
+
+
+def run(tmp_path, script, cmd, **wd):
+    with watchdog(**wd):
+        return run_espr(module(tmp_path, script), cmd, "module.scratch", cwd=tmp_path)
+
+
+def test_repeated_menus_while_fed(tmp_path):
+    p = run(tmp_path, MENU_MODULE, b"a\n" * 200 + b"q\n", timeout=30, loop=20)
+
+    assert p.returncode == 0
+    assert (tmp_path / "module.scratch").read_text().count(" Options") == 201
+
+
+def test_repeated_progress_lines(tmp_path):
+    p = run(tmp_path, PROGRESS_MODULE, b"1\n2\n", timeout=30, loop=20)
+
+    assert p.returncode == 0
+
+
+def test_loop_at_end_of_input(tmp_path):
+    with pytest.raises(EsprRunError) as err:
+        run(tmp_path, MENU_MODULE, b"a\n" * 5, timeout=30, loop=20)
+
+    assert err.value.failure["kind"] == "loop"
+    assert " - exit this menu" in err.value.failure["tail"]
+
+
+def test_timeout(tmp_path):
+    script = "import time\nwhile True:\n    print('step', flush=True)\n    time.sleep(0.05)\n"
+
+    with pytest.raises(EsprRunError) as err:
+        run(tmp_path, script, b"", timeout=1, loop=20)
+
+    assert err.value.failure["kind"] == "timeout"
+
+
+def test_stall(tmp_path):
+    script = "import time\nprint('started', flush=True)\ntime.sleep(60)\n"
+
+    with pytest.raises(EsprRunError) as err:
+        run(tmp_path, script, b"x\n", timeout=30, stall=0.5)
+
+    assert err.value.failure["kind"] == "stall"
+    assert err.value.failure["tail"] == ["started"]